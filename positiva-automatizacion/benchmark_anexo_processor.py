@@ -0,0 +1,83 @@
+"""
+Benchmark de extracción de servicios del ANEXO 1 (motor vectorizado vs fila a fila)
+"""
+import random
+import time
+
+import pandas as pd
+
+from modules.consolidador_t25.anexo_processor import AnexoProcessor
+
+
+def generar_anexo(total_filas=50000, sedes=5, semilla=0):
+    """Genera un ANEXO 1 sintético en formato POSITIVA como DataFrame"""
+    rnd = random.Random(semilla)
+    filas = [
+        ['ANEXO 1 PACTADO DEL PRESTADOR', '', '', '', '', '', '', ''],
+        ['', '', '', '', '', '', '', '']
+    ]
+    por_sede = total_filas // sedes
+
+    for s in range(sedes):
+        filas.append(['DEPARTAMENTO', 'MUNICIPIO', 'CODIGO DE HABILITACIÓN', 'SEDE', 'NOMBRE', '', '', ''])
+        filas.append(['ANTIOQUIA', 'MEDELLIN', str(500010000 + s), float(s + 1), f'SEDE {s + 1}', '', '', ''])
+        filas.append(['ITEM', 'CODIGO CUPS', 'CODIGO HOMOLOGO', 'DESCRIPCION', 'TARIFA', 'MANUAL TARIFARIO', 'PORCENTAJE', 'OBSERVACIONES'])
+
+        for i in range(por_sede):
+            filas.append([
+                float(i + 1),
+                str(rnd.randint(100000, 999999)),
+                '' if rnd.random() < 0.5 else f'H{rnd.randint(1, 999)}',
+                f'PROCEDIMIENTO {rnd.randint(1, 5000)}',
+                float(rnd.randint(1000, 900000)),
+                rnd.choice(['SOAT', 'ISS 2001', 'PROPIO']),
+                rnd.choice(['', '-10%', '+5%']),
+                ''
+            ])
+
+        filas.append(['', 'TOTAL', '', '', '', '', '', ''])
+
+    return pd.DataFrame(filas)
+
+
+def medir(funcion, repeticiones=3):
+    """Retorna el mejor tiempo de varias ejecuciones y el último resultado"""
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def main():
+    print("="*70)
+    print("BENCHMARK EXTRACCIÓN ANEXO 1")
+    print("="*70)
+
+    processor = AnexoProcessor()
+    df = generar_anexo()
+    print(f"\n📄 Filas: {len(df):,}")
+
+    # Referencia: recorrido con iterrows (una Serie por fila, acceso por celda) y la misma lógica fila a fila
+    t_fila, r_fila = medir(
+        lambda: processor.extraer_servicios_de_filas(row for _, row in df.iterrows()),
+        repeticiones=1
+    )
+    t_vector, r_vector = medir(lambda: processor.extraer_servicios_de_anexo(df))
+
+    print(f"⏱️  iterrows + fila a fila: {t_fila:.3f} s")
+    print(f"⏱️  Vectorizado:           {t_vector:.3f} s")
+    print(f"🚀 Aceleración: {t_fila / t_vector:.1f}x")
+    print(f"📊 Servicios: {r_vector['total_servicios']:,} en {r_vector['total_sedes']} sedes")
+
+    if r_fila == r_vector:
+        print("✅ Resultados idénticos")
+    else:
+        print("❌ Los resultados difieren")
+
+
+if __name__ == "__main__":
+    main()
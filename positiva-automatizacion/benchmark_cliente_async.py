@@ -0,0 +1,151 @@
+"""
+Benchmark del cliente GoAnywhere con hilos (paramiko + pool de canales)
+frente al cliente asíncrono (asyncssh)
+
+Levanta el servidor SFTP local de tests/servidor_sftp.py con latencia,
+genera un árbol de carpetas de contratos con anexos y compara:
+  1. Listar todas las carpetas de contratos
+  2. Descargar todos los anexos
+
+El cliente con hilos usa un hilo por operación en vuelo; el asíncrono
+mantiene todas las operaciones en vuelo desde el hilo del event loop.
+Si asyncssh no está instalado solo se mide el cliente con hilos.
+
+Uso: python benchmark_cliente_async.py [latencia_ms] [carpetas] [anexos_por_carpeta] [kb_por_anexo]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark_descargas_sftp import hash_archivo
+from modules.consolidador_t25.goanywhere import GoAnywhereWebClient
+from modules.consolidador_t25.goanywhere_async import ASYNCSSH_AVAILABLE, GoAnywhereAsyncClient
+from tests.servidor_sftp import USUARIO, CLAVE, iniciar_servidor, iniciar_proxy_latencia
+
+
+def generar_arbol(raiz, carpetas, anexos, kb):
+    """Crea carpetas de contrato con TARIFAS y anexos aleatorios"""
+    rutas_carpetas = []
+    rutas_anexos = []
+    for numero in range(carpetas):
+        carpeta = f'/CONTRATO {numero}-2024 PRESTADOR {numero}/TARIFAS'
+        os.makedirs(os.path.join(raiz, carpeta.lstrip('/')))
+        rutas_carpetas.append(carpeta)
+        for anexo in range(anexos):
+            ruta = f'{carpeta}/ANEXO 1 ACTA {anexo + 1}.bin'
+            with open(os.path.join(raiz, ruta.lstrip('/')), 'wb') as f:
+                f.write(os.urandom(kb * 1024))
+            rutas_anexos.append(ruta)
+    return rutas_carpetas, rutas_anexos
+
+
+def destino(carpeta_local, ruta_remota):
+    """Ruta local plana para un anexo remoto"""
+    return os.path.join(carpeta_local, ruta_remota.strip('/').replace('/', '__'))
+
+
+def medir_hilos(puerto, carpetas, anexos, carpeta_local, hilos):
+    """Cliente con hilos: un hilo por operación en vuelo sobre el pool de canales"""
+    cliente = GoAnywhereWebClient('127.0.0.1', puerto, USUARIO, tamano_pool=hilos)
+    conexion = cliente.connect(CLAVE)
+    if not conexion['success']:
+        raise RuntimeError(conexion['error'])
+
+    pico_hilos = threading.active_count()
+    try:
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            inicio = time.perf_counter()
+            listados = list(ejecutor.map(cliente.list_directory, carpetas))
+            t_listar = time.perf_counter() - inicio
+            pico_hilos = max(pico_hilos, threading.active_count())
+
+            inicio = time.perf_counter()
+            descargas = list(ejecutor.map(lambda ruta: cliente.download_file(ruta, destino(carpeta_local, ruta)), anexos))
+            t_descargar = time.perf_counter() - inicio
+            pico_hilos = max(pico_hilos, threading.active_count())
+    finally:
+        cliente.disconnect()
+
+    errores = sum(not r['success'] for r in listados + descargas)
+    return t_listar, t_descargar, errores, pico_hilos
+
+
+async def medir_async(puerto, carpetas, anexos, carpeta_local):
+    """Cliente asíncrono: todas las operaciones en vuelo desde el event loop"""
+    cliente = GoAnywhereAsyncClient('127.0.0.1', puerto, USUARIO)
+    conexion = await cliente.connect(CLAVE)
+    if not conexion['success']:
+        raise RuntimeError(conexion['error'])
+
+    pico_hilos = threading.active_count()
+    try:
+        inicio = time.perf_counter()
+        listados = await cliente.listar_varios(carpetas)
+        t_listar = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        descargas = await cliente.descargar_varios([(ruta, destino(carpeta_local, ruta)) for ruta in anexos])
+        t_descargar = time.perf_counter() - inicio
+        pico_hilos = max(pico_hilos, threading.active_count())
+    finally:
+        await cliente.disconnect()
+
+    errores = sum(not r['success'] for r in listados + descargas)
+    return t_listar, t_descargar, errores, pico_hilos
+
+
+def main():
+    latencia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 40
+    total_carpetas = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    anexos_por_carpeta = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    kb_por_anexo = int(sys.argv[4]) if len(sys.argv) > 4 else 64
+    hilos = 16
+
+    print("="*70)
+    print("BENCHMARK CLIENTE CON HILOS VS ASÍNCRONO")
+    print("="*70)
+    print(f"\n🌐 Latencia ida y vuelta: {latencia_ms:.0f} ms")
+    print(f"📁 {total_carpetas} carpetas, {anexos_por_carpeta} anexos de {kb_por_anexo} KB por carpeta")
+
+    with tempfile.TemporaryDirectory() as raiz, tempfile.TemporaryDirectory() as local:
+        carpetas, anexos = generar_arbol(raiz, total_carpetas, anexos_por_carpeta, kb_por_anexo)
+        puerto = iniciar_proxy_latencia(iniciar_servidor(raiz).puerto, latencia_ms)
+        total_mb = len(anexos) * kb_por_anexo / 1024
+
+        local_hilos = os.path.join(local, 'hilos')
+        os.makedirs(local_hilos)
+        t_listar, t_descargar, errores, pico = medir_hilos(puerto, carpetas, anexos, local_hilos, hilos)
+
+        print(f"\n🧵 Con hilos ({hilos} hilos, pool de {hilos} canales)")
+        print(f"⏱️  Listar:    {t_listar:.2f} s ({len(carpetas) / t_listar:,.0f} carpetas/s)")
+        print(f"⏱️  Descargar: {t_descargar:.2f} s ({total_mb / t_descargar:,.1f} MB/s)")
+        print(f"   Errores: {errores}, hilos del proceso (pico, incluye el servidor local): {pico}")
+
+        if not ASYNCSSH_AVAILABLE:
+            print("\n⚠️  asyncssh no está instalado: se omite el cliente asíncrono (pip install asyncssh)")
+            return
+
+        local_async = os.path.join(local, 'async')
+        os.makedirs(local_async)
+        a_listar, a_descargar, a_errores, a_pico = asyncio.run(medir_async(puerto, carpetas, anexos, local_async))
+
+        print(f"\n⚡ Asíncrono ({GoAnywhereAsyncClient.CONEXIONES} conexiones, "
+              f"hasta {GoAnywhereAsyncClient.MAX_EN_VUELO} operaciones en vuelo)")
+        print(f"⏱️  Listar:    {a_listar:.2f} s ({len(carpetas) / a_listar:,.0f} carpetas/s)")
+        print(f"⏱️  Descargar: {a_descargar:.2f} s ({total_mb / a_descargar:,.1f} MB/s)")
+        print(f"   Errores: {a_errores}, hilos del proceso (pico, incluye el servidor local): {a_pico}")
+
+        iguales = all(
+            hash_archivo(destino(local_hilos, ruta)) == hash_archivo(destino(local_async, ruta))
+            for ruta in anexos
+        )
+        print(f"\n✅ Contenido idéntico: {iguales}")
+        print(f"🚀 Aceleración listar: {t_listar / a_listar:.1f}x, descargar: {t_descargar / a_descargar:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
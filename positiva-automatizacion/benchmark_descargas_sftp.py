@@ -0,0 +1,155 @@
+"""
+Benchmark de descargas SFTP (sftp.get secuencial vs descarga con pipelining
+y descargas anticipadas de GoAnywhereWebClient)
+
+Levanta el servidor SFTP local de tests/servidor_sftp.py detrás de un
+proxy que agrega latencia de red, genera anexos sintéticos y compara:
+  1. Un archivo grande: sftp.get con la ventana por defecto vs download_file
+  2. Una carpeta de actas: descargar y procesar uno por uno vs procesar
+     mientras se descargan los siguientes (descargar_anticipado)
+
+Uso: python benchmark_descargas_sftp.py [latencia_ms] [anexos] [mb_archivo_grande]
+"""
+import hashlib
+import io
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+import paramiko
+
+from modules.consolidador_t25.anexo_processor import AnexoProcessor
+from modules.consolidador_t25.goanywhere import GoAnywhereWebClient
+from tests.servidor_sftp import USUARIO, CLAVE, iniciar_servidor, iniciar_proxy_latencia, generar_anexo
+
+
+def hash_archivo(ruta):
+    """SHA-256 de un archivo local"""
+    with open(ruta, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def procesar(processor, ruta):
+    """Procesa un anexo sin imprimir el detalle"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return processor.procesar_archivo_completo(ruta)
+
+
+def descarga_actual_grande(puerto, remoto, local):
+    """Ruta anterior: canal con ventana por defecto y sftp.get"""
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    ssh.connect('127.0.0.1', port=puerto, username=USUARIO, password=CLAVE, allow_agent=False, look_for_keys=False)
+    try:
+        sftp = ssh.open_sftp()
+        inicio = time.perf_counter()
+        sftp.get(remoto, local)
+        return time.perf_counter() - inicio
+    finally:
+        ssh.close()
+
+
+def actas_actual(puerto, nombres, carpeta_local, processor):
+    """Ruta anterior: cada acta se descarga con sftp.get y luego se procesa"""
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    ssh.connect('127.0.0.1', port=puerto, username=USUARIO, password=CLAVE, allow_agent=False, look_for_keys=False)
+    try:
+        sftp = ssh.open_sftp()
+        sftp.chdir('/ACTAS')
+        inicio = time.perf_counter()
+        servicios = 0
+        for nombre in nombres:
+            ruta_local = os.path.join(carpeta_local, nombre)
+            sftp.get(nombre, ruta_local)
+            servicios += procesar(processor, ruta_local)['total_servicios']
+        return time.perf_counter() - inicio, servicios
+    finally:
+        ssh.close()
+
+
+def actas_anticipadas(cliente, nombres, carpeta_local, processor):
+    """Ruta nueva: se procesa cada acta mientras se descargan las siguientes"""
+    inicio = time.perf_counter()
+    futuros = [
+        (nombre, cliente.descargar_anticipado(f'/ACTAS/{nombre}', os.path.join(carpeta_local, nombre)))
+        for nombre in nombres
+    ]
+    servicios = 0
+    for nombre, futuro in futuros:
+        descarga = futuro.result()
+        if not descarga['success']:
+            raise RuntimeError(descarga['error'])
+        servicios += procesar(processor, descarga['ruta_local'])['total_servicios']
+    return time.perf_counter() - inicio, servicios
+
+
+def main():
+    latencia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 40
+    total_anexos = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    mb_grande = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    print("="*70)
+    print("BENCHMARK DESCARGAS SFTP")
+    print("="*70)
+    print(f"\n🌐 Latencia ida y vuelta: {latencia_ms:.0f} ms")
+
+    processor = AnexoProcessor()
+
+    with tempfile.TemporaryDirectory() as raiz, tempfile.TemporaryDirectory() as local:
+        os.makedirs(os.path.join(raiz, 'ACTAS'))
+        nombres = []
+        for numero in range(1, total_anexos + 1):
+            nombre = f'ANEXO 1 ACTA {numero}.csv'
+            generar_anexo(os.path.join(raiz, 'ACTAS', nombre), 1500, numero)
+            nombres.append(nombre)
+
+        grande = os.path.join(raiz, 'grande.bin')
+        with open(grande, 'wb') as f:
+            f.write(os.urandom(mb_grande * 1024 * 1024))
+
+        puerto = iniciar_proxy_latencia(iniciar_servidor(raiz).puerto, latencia_ms)
+
+        cliente = GoAnywhereWebClient('127.0.0.1', puerto, USUARIO)
+        conexion = cliente.connect(CLAVE)
+        if not conexion['success']:
+            raise RuntimeError(conexion['error'])
+
+        # 1. Archivo grande
+        print(f"\n📦 Archivo grande: {mb_grande} MB")
+        ruta_actual = os.path.join(local, 'grande_actual.bin')
+        t_actual = descarga_actual_grande(puerto, '/grande.bin', ruta_actual)
+
+        ruta_nueva = os.path.join(local, 'grande_nuevo.bin')
+        descarga = cliente.download_file('/grande.bin', ruta_nueva)
+        if not descarga['success']:
+            raise RuntimeError(descarga['error'])
+        t_nuevo = descarga['segundos']
+
+        iguales = hash_archivo(ruta_actual) == hash_archivo(ruta_nueva) == hash_archivo(grande)
+        print(f"⏱️  sftp.get:      {t_actual:.2f} s, {mb_grande / t_actual:,.1f} MB/s")
+        print(f"⏱️  download_file: {t_nuevo:.2f} s, {descarga['bytes_por_segundo'] / 1024 / 1024:,.1f} MB/s")
+        print(f"✅ Contenido idéntico: {iguales}")
+        print(f"🚀 Aceleración: {t_actual / t_nuevo:.1f}x")
+
+        # 2. Carpeta de actas (descargar + procesar)
+        tamano_anexo = os.path.getsize(os.path.join(raiz, 'ACTAS', nombres[0]))
+        print(f"\n📄 Actas: {total_anexos} anexos de {tamano_anexo / 1024:,.0f} KB")
+
+        os.makedirs(os.path.join(local, 'actual'))
+        os.makedirs(os.path.join(local, 'nuevo'))
+        t_actual, servicios_actual = actas_actual(puerto, nombres, os.path.join(local, 'actual'), processor)
+        t_nuevo, servicios_nuevo = actas_anticipadas(cliente, nombres, os.path.join(local, 'nuevo'), processor)
+
+        print(f"⏱️  Secuencial:          {t_actual:.2f} s ({servicios_actual:,} servicios)")
+        print(f"⏱️  Con anticipadas:     {t_nuevo:.2f} s ({servicios_nuevo:,} servicios)")
+        print(f"🚀 Aceleración: {t_actual / t_nuevo:.1f}x")
+        print(f"\n🔌 Pool: {cliente.metricas_pool()}")
+
+        cliente.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark de exportación a Excel (escritor streaming vs escritura celda a celda)
+
+Cada escritor corre en un proceso aparte para medir su pico de memoria (RSS).
+Uso: python benchmark_exportacion_excel.py [registros]
+"""
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from openpyxl import Workbook
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+
+
+COLUMNAS = [
+    'codigo_cups',
+    'codigo_homologo_manual',
+    'descripcion_del_cups',
+    'tarifa_unitaria_en_pesos',
+    'manual_tarifario',
+    'porcentaje_manual_tarifario',
+    'observaciones',
+    'codigo_de_habilitacion',
+    'fecha_acuerdo'
+]
+
+
+def generar_consolidado(total, semilla=0):
+    """Genera registros sintéticos con la forma del consolidado ANEXO 1"""
+    rnd = random.Random(semilla)
+    return [
+        {
+            'codigo_cups': str(rnd.randint(100000, 999999)),
+            'codigo_homologo_manual': '' if rnd.random() < 0.5 else f'H{rnd.randint(1, 999)}',
+            'descripcion_del_cups': f'PROCEDIMIENTO QUIRURGICO {rnd.randint(1, 5000)}',
+            'tarifa_unitaria_en_pesos': float(rnd.randint(1000, 900000)),
+            'manual_tarifario': rnd.choice(['SOAT', 'ISS 2001', 'PROPIO']),
+            'porcentaje_manual_tarifario': rnd.choice([None, 0.1, 25.0]),
+            'observaciones': '',
+            'codigo_de_habilitacion': f'{500010000 + i % 7}-01',
+            'fecha_acuerdo': '2024-01-15'
+        }
+        for i in range(total)
+    ]
+
+
+def escritor_celda_a_celda(consolidado, output_path):
+    """Referencia: libro normal con objetos de estilo nuevos por cada celda"""
+    wb = Workbook()
+    ws = wb.active
+    borde = Border(
+        left=Side(style='thin', color="000000"),
+        right=Side(style='thin', color="000000"),
+        top=Side(style='thin', color="000000"),
+        bottom=Side(style='thin', color="000000")
+    )
+
+    ws.merge_cells('A1:H1')
+    ws['A1'].value = 'ANEXO 1 PACTADO DEL PRESTADOR'
+    ws['A1'].fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    ws['A1'].font = Font(color="FFFFFF", bold=True, size=11, name="Calibri")
+    ws['I1'].value = 'INFO ACTA O ACUERDO'
+
+    for col_idx, nombre in enumerate(COLUMNAS, 1):
+        ws.cell(row=2, column=col_idx).value = nombre
+
+    for row_idx, registro in enumerate(consolidado, 3):
+        for col_idx, col_name in enumerate(COLUMNAS, 1):
+            cell = ws.cell(row=row_idx, column=col_idx)
+            cell.value = registro[col_name]
+            cell.border = borde
+            if col_idx == 3:
+                cell.alignment = Alignment(horizontal="left", vertical="center")
+            elif col_idx in [4, 6]:
+                cell.alignment = Alignment(horizontal="right", vertical="center")
+            else:
+                cell.alignment = Alignment(horizontal="center", vertical="center")
+            if col_idx == 4 and cell.value:
+                cell.number_format = '#,##0.00'
+
+    wb.save(output_path)
+
+
+def escritor_streaming(consolidado, output_path):
+    """Escritor actual del consolidador ANEXO 1 (ExcelStreamWriter)"""
+    from modules.consolidador.logic import generar_excel_consolidado
+    generar_excel_consolidado({'consolidado': consolidado}, output_path)
+
+
+def _medir_en_proceso(nombre_escritor, total, output_path, cola):
+    """Genera los datos, ejecuta el escritor y reporta tiempo y pico de RSS"""
+    import io
+    import contextlib
+
+    consolidado = generar_consolidado(total)
+    escritor = globals()[nombre_escritor]
+
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        escritor(consolidado, output_path)
+    duracion = time.perf_counter() - inicio
+
+    # ru_maxrss está en KB en Linux
+    cola.put((duracion, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def medir(nombre_escritor, total, output_path):
+    """Ejecuta un escritor en un proceso nuevo y retorna (segundos, MB de pico)"""
+    contexto = multiprocessing.get_context('spawn')
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=_medir_en_proceso, args=(nombre_escritor, total, output_path, cola))
+    proceso.start()
+    resultado = cola.get()
+    proceso.join()
+    return resultado
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    print("="*70)
+    print("BENCHMARK EXPORTACIÓN EXCEL")
+    print("="*70)
+    print(f"\n📄 Registros: {total:,} x {len(COLUMNAS)} columnas")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        resultados = {}
+        for nombre in ['escritor_celda_a_celda', 'escritor_streaming']:
+            ruta = os.path.join(carpeta, f'{nombre}.xlsx')
+            duracion, pico_mb = medir(nombre, total, ruta)
+            resultados[nombre] = (duracion, pico_mb)
+            print(f"⏱️  {nombre}: {duracion:.2f} s, {total / duracion:,.0f} filas/s, "
+                  f"pico RSS {pico_mb:,.0f} MB, {os.path.getsize(ruta):,} bytes")
+
+    t_celda, rss_celda = resultados['escritor_celda_a_celda']
+    t_stream, rss_stream = resultados['escritor_streaming']
+    print(f"\n🚀 Aceleración: {t_celda / t_stream:.1f}x")
+    print(f"💾 Memoria: {rss_celda:,.0f} MB -> {rss_stream:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
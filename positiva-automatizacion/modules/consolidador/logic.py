@@ -4,6 +4,7 @@ VERSIÓN MEJORADA - Búsqueda flexible de hojas
 """
 import pandas as pd
 import os
+import re
 import time
 from datetime import datetime
 
@@ -16,8 +17,14 @@ except ImportError as e:
     PYXLSB_AVAILABLE = False
     print("⚠️  pyxlsb no disponible - Solo se podrán procesar archivos XLSX", flush=True)
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from utils.excel_export import ExcelStreamWriter
+from utils.columnar_export import escribir_columnar
+
+# Marcador de inicio de sede (se busca sobre el texto en mayúsculas de la fila)
+PATRON_HABILITACION = re.compile('CODIGO DE HABILITACIÓN|CÓDIGO DE HABILITACIÓN|CODIGO DE HABILITACION')
+
+# Separador entre celdas del texto normalizado (evita coincidencias entre celdas)
+SEPARADOR_CELDAS = '\x00'
 
 
 def buscar_hoja_servicios(hojas):
@@ -61,12 +68,37 @@ def buscar_hoja_servicios(hojas):
     return None
 
 
+def _filas_xlsb(filepath, hoja_target):
+    """
+    Recorre las filas de una hoja XLSB sin cargarlas todas en memoria
+    
+    El libro se abre al empezar a iterar y se cierra al terminar
+    """
+    with open_workbook(filepath) as wb:
+        with wb.get_sheet(hoja_target) as sheet:
+            for row in sheet.rows():
+                yield [cell.v for cell in row]
+
+
+def _con_siguiente(filas):
+    """Empareja cada fila con la siguiente (None para la última)"""
+    filas = iter(filas)
+    actual = next(filas, None)
+    while actual is not None:
+        siguiente = next(filas, None)
+        yield actual, siguiente
+        actual = siguiente
+
+
 def leer_archivo_excel(filepath):
     """
-    Lee archivo XLSB o XLSX y retorna datos
+    Lee archivo XLSB o XLSX y retorna sus filas
+    
+    En XLSB las filas se leen en streaming a medida que se consumen;
+    en XLSX se leen con pandas y se entregan una a una
     
     Returns:
-        tuple: (data, hoja_nombre, formato)
+        tuple: (filas, hoja_nombre, formato) donde filas es un iterador de listas
     """
     extension = filepath.rsplit('.', 1)[1].lower()
     
@@ -86,14 +118,8 @@ def leer_archivo_excel(filepath):
                 print(f"   ❌ No se encontró hoja de servicios", flush=True)
                 print(f"   Hojas disponibles: {', '.join(hojas)}", flush=True)
                 return None, None, 'xlsb'
-            
-            # Leer datos
-            data = []
-            with wb.get_sheet(hoja_target) as sheet:
-                for row in sheet.rows():
-                    data.append([cell.v for cell in row])
-            
-            return data, hoja_target, 'xlsb'
+        
+        return _filas_xlsb(filepath, hoja_target), hoja_target, 'xlsb'
     
     elif extension == 'xlsx':
         print(f"   Formato: XLSX (usando pandas)", flush=True)
@@ -118,9 +144,9 @@ def leer_archivo_excel(filepath):
                 header=None,
                 engine='openpyxl'  # Motor más robusto
             )
-            data = df.values.tolist()
+            filas = (fila.tolist() for fila in df.values)
             
-            return data, hoja_target, 'xlsx'
+            return filas, hoja_target, 'xlsx'
             
         except Exception as e:
             print(f"   ❌ Error leyendo XLSX: {str(e)}", flush=True)
@@ -135,8 +161,8 @@ def leer_archivo_excel(filepath):
                     return None, None, 'xlsx'
                 
                 df = pd.read_excel(filepath, sheet_name=hoja_target, header=None)
-                data = df.values.tolist()
-                return data, hoja_target, 'xlsx'
+                filas = (fila.tolist() for fila in df.values)
+                return filas, hoja_target, 'xlsx'
             except Exception as e2:
                 print(f"   ❌ Error en reintento: {str(e2)}", flush=True)
                 raise e2
@@ -179,38 +205,36 @@ def procesar_anexo1_xlsb(filepath, fecha_acuerdo=None):
         
         # Leer archivo (XLSB o XLSX)
         print(f"\n📖 Abriendo archivo...", flush=True)
-        data, hoja_target, formato = leer_archivo_excel(filepath)
+        filas, hoja_target, formato = leer_archivo_excel(filepath)
         
-        if data is None:
+        if filas is None:
             return {
                 'success': False,
                 'error': 'No se encontró la hoja de servicios. Debe contener "SERV" en el nombre.'
             }
         
         print(f"✓ Hoja: '{hoja_target}'", flush=True)
-        print(f"✓ Total filas: {len(data):,}", flush=True)
         
-        # Procesar sedes y servicios
+        # Procesar sedes y servicios en una sola pasada; la fila siguiente
+        # se lee por anticipado porque trae los datos de la sede
         print(f"\n🏢 Extrayendo sedes y servicios...", flush=True)
         sedes = []
         sede_actual = None
         servicios_actuales = []
         en_seccion_servicios = False
+        total_filas = 0
         
-        for idx, row in enumerate(data):
+        for row, siguiente_fila in _con_siguiente(filas):
+            total_filas += 1
+            
             if not row:
                 continue
             
-            # Detectar inicio de nueva sede
-            es_nueva_sede = False
-            for cell in row:
-                if cell and isinstance(cell, str):
-                    texto = cell.upper()
-                    if 'CODIGO DE HABILITACIÓN' in texto or 'CÓDIGO DE HABILITACIÓN' in texto or 'CODIGO DE HABILITACION' in texto:
-                        es_nueva_sede = True
-                        break
+            # Texto normalizado de la fila: solo celdas de texto, en mayúsculas
+            texto_fila = SEPARADOR_CELDAS.join([cell for cell in row if cell and isinstance(cell, str)]).upper()
             
-            if es_nueva_sede:
+            # Detectar inicio de nueva sede
+            if PATRON_HABILITACION.search(texto_fila):
                 # Guardar sede anterior
                 if sede_actual and servicios_actuales:
                     sedes.append({
@@ -223,8 +247,8 @@ def procesar_anexo1_xlsb(filepath, fecha_acuerdo=None):
                 servicios_actuales = []
                 en_seccion_servicios = False
                 
-                if idx + 1 < len(data):
-                    sede_row = data[idx + 1]
+                if siguiente_fila is not None:
+                    sede_row = siguiente_fila
                     if sede_row and len(sede_row) > 4:
                         codigo_hab = str(sede_row[2]).strip() if sede_row[2] else ""
                         numero_sede = sede_row[3]
@@ -249,18 +273,15 @@ def procesar_anexo1_xlsb(filepath, fecha_acuerdo=None):
                 
                 continue
             
-            # Detectar encabezado de servicios (ITEM, CODIGO CUPS, etc.)
+            # Detectar encabezado de servicios: celda con ITEM y "CODIGO" o "CUPS" en la columna B
             if not en_seccion_servicios:
-                for cell in row:
-                    if cell and isinstance(cell, str):
-                        texto = cell.upper()
-                        if 'ITEM' in texto and ('CODIGO' in texto or idx + 1 < len(data)):
-                            # Verificar si la siguiente columna tiene "CODIGO" o "CUPS"
-                            if len(row) > 1 and row[1]:
-                                siguiente = str(row[1]).upper()
-                                if 'CODIGO' in siguiente or 'CUPS' in siguiente:
-                                    en_seccion_servicios = True
-                                    break
+                if 'ITEM' in texto_fila and len(row) > 1 and row[1]:
+                    siguiente = str(row[1]).upper()
+                    if 'CODIGO' in siguiente or 'CUPS' in siguiente:
+                        # En la última fila la celda ITEM debe decir también CODIGO
+                        en_seccion_servicios = siguiente_fila is not None or any(
+                            'ITEM' in texto and 'CODIGO' in texto for texto in texto_fila.split(SEPARADOR_CELDAS)
+                        )
                 
                 if en_seccion_servicios:
                     continue
@@ -318,6 +339,7 @@ def procesar_anexo1_xlsb(filepath, fecha_acuerdo=None):
             })
             print(f"   ✓ {sede_actual['codigo']}: {len(servicios_actuales)} servicios", flush=True)
         
+        print(f"✓ Total filas: {total_filas:,}", flush=True)
         print(f"\n✓ Sedes procesadas: {len(sedes)}", flush=True)
         
         if not sedes:
@@ -394,9 +416,23 @@ def procesar_anexo1_xlsb(filepath, fecha_acuerdo=None):
         }
 
 
-def generar_excel_consolidado(resultado, output_path):
+def _valor_numerico(valor):
+    """Convierte a float los valores numéricos del consolidado (vacío -> None)"""
+    if valor is None or valor == "":
+        return None
+    try:
+        return float(valor)
+    except:
+        return valor
+
+
+def generar_excel_consolidado(resultado, output_path, formato='xlsx'):
     """
-    Genera Excel con formato POSITIVA
+    Genera Excel con formato POSITIVA, o el consolidado en CSV comprimido
+    o Parquet según el formato pedido
+    
+    Escribe en streaming con estilos con nombre compartidos, de modo que
+    la memoria no crece con la cantidad de registros
     """
     try:
         consolidado = resultado['consolidado']
@@ -404,47 +440,6 @@ def generar_excel_consolidado(resultado, output_path):
         if not consolidado:
             return False
         
-        print(f"\n💾 Generando Excel...", flush=True)
-        print(f"   Registros: {len(consolidado):,}", flush=True)
-        
-        # Crear workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Hoja1"
-        
-        # Estilos
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True, size=11, name="Calibri")
-        header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        
-        subheader_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        subheader_font = Font(bold=True, size=10, name="Calibri")
-        subheader_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        
-        thin_border = Border(
-            left=Side(style='thin', color="000000"),
-            right=Side(style='thin', color="000000"),
-            top=Side(style='thin', color="000000"),
-            bottom=Side(style='thin', color="000000")
-        )
-        
-        # Fila 1: Encabezado principal
-        ws.merge_cells('A1:H1')
-        cell_a1 = ws['A1']
-        cell_a1.value = 'ANEXO 1 PACTADO DEL PRESTADOR'
-        cell_a1.fill = header_fill
-        cell_a1.font = header_font
-        cell_a1.alignment = header_align
-        cell_a1.border = thin_border
-        
-        cell_i1 = ws['I1']
-        cell_i1.value = 'INFO ACTA O ACUERDO'
-        cell_i1.fill = header_fill
-        cell_i1.font = header_font
-        cell_i1.alignment = header_align
-        cell_i1.border = thin_border
-        
-        # Fila 2: Nombres de columnas
         columnas = [
             'codigo_cups',
             'codigo_homologo_manual',
@@ -457,73 +452,78 @@ def generar_excel_consolidado(resultado, output_path):
             'fecha_acuerdo'
         ]
         
-        for col_idx, nombre in enumerate(columnas, 1):
-            cell = ws.cell(row=2, column=col_idx)
-            cell.value = nombre
-            cell.fill = subheader_fill
-            cell.font = subheader_font
-            cell.alignment = subheader_align
-            cell.border = thin_border
+        # Formatos columnares: sin estilos, fila a fila
+        if formato != 'xlsx':
+            print(f"\n💾 Generando {formato}...", flush=True)
+            print(f"   Registros: {len(consolidado):,}", flush=True)
+            
+            filas = ([registro[col_name] for col_name in columnas] for registro in consolidado)
+            escribir_columnar(filas, columnas, output_path, formato)
+            
+            size = os.path.getsize(output_path)
+            print(f"✓ Guardado: {size:,} bytes ({size/1024:.2f} KB)", flush=True)
+            return True
+        
+        print(f"\n💾 Generando Excel...", flush=True)
+        print(f"   Registros: {len(consolidado):,}", flush=True)
+        
+        escritor = ExcelStreamWriter(
+            output_path,
+            "Hoja1",
+            anchos={'A': 12, 'B': 22, 'C': 55, 'D': 20, 'E': 18, 'F': 28, 'G': 25, 'H': 22, 'I': 18}
+        )
+        
+        # Altura de encabezados
+        escritor.alto_fila(1, 25)
+        escritor.alto_fila(2, 30)
+        
+        # Fila 1: Encabezado principal
+        escritor.combinar('A1:H1')
+        escritor.agregar_fila(
+            ['ANEXO 1 PACTADO DEL PRESTADOR'] + [None] * 7 + ['INFO ACTA O ACUERDO'],
+            ['positiva_titulo'] + [None] * 7 + ['positiva_titulo']
+        )
+        
+        # Fila 2: Nombres de columnas
+        escritor.agregar_fila(columnas, ['positiva_subtitulo'] * len(columnas))
+        
+        # Estilo por columna: centrado, descripción a la izquierda y números a la derecha
+        estilos_columnas = [
+            'positiva_centro',
+            'positiva_centro',
+            'positiva_izquierda',
+            'positiva_derecha',
+            'positiva_centro',
+            'positiva_derecha',
+            'positiva_centro',
+            'positiva_centro',
+            'positiva_centro'
+        ]
         
         # Datos (desde fila 3)
         for row_idx, registro in enumerate(consolidado, 3):
-            for col_idx, col_name in enumerate(columnas, 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                valor = registro[col_name]
-                
-                # Manejar valores numéricos
-                if col_name in ['tarifa_unitaria_en_pesos', 'porcentaje_manual_tarifario']:
-                    if valor is not None and valor != "":
-                        try:
-                            cell.value = float(valor)
-                        except:
-                            cell.value = valor
-                    else:
-                        cell.value = None
+            fila = [registro[col_name] for col_name in columnas]
+            estilos = estilos_columnas.copy()
+            
+            # Valores numéricos y su formato
+            tarifa = fila[3] = _valor_numerico(fila[3])
+            porcentaje = fila[5] = _valor_numerico(fila[5])
+            
+            if tarifa:
+                estilos[3] = 'positiva_moneda'
+            if porcentaje:
+                if isinstance(porcentaje, float) and porcentaje <= 1:
+                    estilos[5] = 'positiva_porcentaje'
                 else:
-                    cell.value = valor
-                
-                cell.border = thin_border
-                
-                # Alineación
-                if col_idx in [1, 2, 5, 7, 8, 9]:  # Centrado
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-                elif col_idx == 3:  # Descripción izquierda
-                    cell.alignment = Alignment(horizontal="left", vertical="center")
-                else:  # Números derecha
-                    cell.alignment = Alignment(horizontal="right", vertical="center")
-                
-                # Formato numérico
-                if col_idx == 4 and cell.value:
-                    cell.number_format = '#,##0.00'
-                elif col_idx == 6 and cell.value:
-                    if isinstance(cell.value, float) and cell.value <= 1:
-                        cell.number_format = '0.00%'
-                    else:
-                        cell.number_format = '#,##0.00'
+                    estilos[5] = 'positiva_moneda'
             
-            if row_idx % 100 == 0:
+            escritor.agregar_fila(fila, estilos)
+            
+            if row_idx % 10000 == 0:
                 print(f"   {row_idx - 2:,} registros escritos...", flush=True)
         
-        # Anchos de columna
-        ws.column_dimensions['A'].width = 12
-        ws.column_dimensions['B'].width = 22
-        ws.column_dimensions['C'].width = 55
-        ws.column_dimensions['D'].width = 20
-        ws.column_dimensions['E'].width = 18
-        ws.column_dimensions['F'].width = 28
-        ws.column_dimensions['G'].width = 25
-        ws.column_dimensions['H'].width = 22
-        ws.column_dimensions['I'].width = 18
-        
-        # Altura de encabezados
-        ws.row_dimensions[1].height = 25
-        ws.row_dimensions[2].height = 30
-        
         # Guardar
-        wb.save(output_path)
-        
-        size = os.path.getsize(output_path)
+        size = escritor.guardar()
         print(f"✓ Guardado: {size:,} bytes ({size/1024:.2f} KB)", flush=True)
         
         return True
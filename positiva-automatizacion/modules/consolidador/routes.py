@@ -6,6 +6,7 @@ from werkzeug.utils import secure_filename
 from datetime import datetime
 from .logic import procesar_anexo1_xlsb, generar_excel_consolidado
 from utils.stats import stats_manager
+from utils.columnar_export import FORMATOS_SALIDA, normalizar_formato, formatos_disponibles, mimetype_de_archivo
 
 # Crear Blueprint
 consolidador_bp = Blueprint('consolidador', __name__)
@@ -59,6 +60,14 @@ def upload_file():
         if fecha_acuerdo and fecha_acuerdo.strip() == '':
             fecha_acuerdo = None
         
+        # Formato de salida (opcional): xlsx, csv.gz o parquet
+        formato = normalizar_formato(request.form.get('formato'))
+        if formato is None:
+            return jsonify({
+                'success': False,
+                'error': f'Formato de salida no válido. Disponibles: {", ".join(formatos_disponibles())}'
+            }), 400
+        
         # Guardar archivo
         filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -80,10 +89,10 @@ def upload_file():
             }), 500
         
         # Generar archivo de salida
-        output_filename = f"CONSOLIDADO_ANEXO1_{timestamp}.xlsx"
+        output_filename = f"CONSOLIDADO_ANEXO1_{timestamp}{FORMATOS_SALIDA[formato]['extension']}"
         output_path = os.path.join(current_app.config['OUTPUT_FOLDER'], output_filename)
         
-        if generar_excel_consolidado(resultado, output_path):
+        if generar_excel_consolidado(resultado, output_path, formato):
             # Eliminar archivo de entrada
             if os.path.exists(filepath):
                 os.remove(filepath)
@@ -256,7 +265,7 @@ def download_file(filename):
             file_path,
             as_attachment=True,
             download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            mimetype=mimetype_de_archivo(filename)
         )
     
     except Exception as e:
@@ -0,0 +1,336 @@
+"""
+Caché de resultados de AnexoProcessor indexada por contenido del archivo
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .anexo_processor import AnexoProcessor
+
+
+class ParsedAnexoCache:
+    """
+    Guarda sedes_info ya extraído de cada ANEXO 1 en formato columnar
+    (npz de numpy sin pickle), indexado por hash del contenido + versión del parser
+    """
+
+    CACHE_FOLDER = 'temp/consolidador_t25/cache_parseo'
+
+    # Tamaño máximo de la caché en bytes (500 MB)
+    MAX_BYTES = 500 * 1024 * 1024
+
+    # Campos de texto de cada servicio (tal como los produce AnexoProcessor)
+    CAMPOS_TEXTO = [
+        'codigo_cups',
+        'codigo_homologo',
+        'descripcion',
+        'tarifario',
+        'tarifa_segun_tarifario',
+        'observaciones'
+    ]
+
+    def __init__(self, carpeta: str = None, max_bytes: int = None):
+        """
+        Inicializa la caché
+
+        Args:
+            carpeta: Carpeta de la caché (por defecto CACHE_FOLDER)
+            max_bytes: Tamaño máximo antes de desalojar (por defecto MAX_BYTES)
+        """
+        self.carpeta = carpeta or self.CACHE_FOLDER
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        os.makedirs(self.carpeta, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # Entradas en disco (ruta -> bytes), de la usada hace más tiempo a la
+        # más reciente, y su total: se actualizan al leer y guardar, así el
+        # desalojo no recorre la carpeta
+        self._entradas = self._escanear()
+        self._total_bytes = sum(self._entradas.values())
+
+    def _escanear(self) -> 'OrderedDict[str, int]':
+        """Entradas existentes en la carpeta, ordenadas por fecha de último uso"""
+        entradas = []
+        for entrada in os.scandir(self.carpeta):
+            if entrada.name.endswith('.npz') and '.tmp' not in entrada.name:
+                info = entrada.stat()
+                entradas.append((info.st_mtime, entrada.path, info.st_size))
+
+        return OrderedDict((ruta, tamano) for _, ruta, tamano in sorted(entradas))
+
+    @staticmethod
+    def hash_archivo(ruta_archivo: Union[str, BinaryIO]) -> str:
+        """SHA-256 del contenido de un archivo (ruta o archivo abierto, que queda al inicio)"""
+        sha = hashlib.sha256()
+
+        if isinstance(ruta_archivo, (str, os.PathLike)):
+            with open(ruta_archivo, 'rb') as f:
+                for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                    sha.update(bloque)
+        else:
+            ruta_archivo.seek(0)
+            for bloque in iter(lambda: ruta_archivo.read(1024 * 1024), b''):
+                sha.update(bloque)
+            ruta_archivo.seek(0)
+
+        return sha.hexdigest()
+
+    def _ruta(self, hash_contenido: str) -> str:
+        """Ruta de la entrada para un hash de contenido y la versión actual del parser"""
+        return os.path.join(self.carpeta, f"{hash_contenido}_v{AnexoProcessor.VERSION_PARSER}.npz")
+
+    def procesar(
+        self,
+        ruta_archivo: Union[str, BinaryIO],
+        processor: AnexoProcessor,
+        nombre_archivo: str = None
+    ) -> Dict[str, any]:
+        """
+        Retorna el resultado de procesar_archivo_completo desde la caché o,
+        si no está, procesa el archivo y guarda el resultado
+
+        Args:
+            ruta_archivo: Ruta local del archivo ANEXO 1 o archivo binario abierto
+            processor: Procesador a usar cuando no hay entrada en caché
+            nombre_archivo: Nombre del archivo (obligatorio si es un archivo abierto sin nombre)
+
+        Returns:
+            Mismo Dict que AnexoProcessor.procesar_archivo_completo
+        """
+        nombre_archivo = AnexoProcessor._nombre_origen(ruta_archivo, nombre_archivo)
+        hash_contenido, resultado = self.buscar(ruta_archivo, nombre_archivo)
+        if resultado is not None:
+            return resultado
+
+        resultado = processor.procesar_archivo_completo(ruta_archivo, nombre_archivo)
+        self.guardar_resultado(hash_contenido, resultado, nombre_archivo)
+
+        return resultado
+
+    def buscar(self, ruta_archivo: Union[str, BinaryIO], nombre_archivo: str) -> Tuple[str, Optional[Dict[str, any]]]:
+        """
+        Busca el resultado de un archivo sin procesarlo (cuenta como hit o miss)
+
+        Args:
+            ruta_archivo: Ruta local del archivo ANEXO 1 o archivo binario abierto
+            nombre_archivo: Nombre del archivo
+
+        Returns:
+            Tupla (hash del contenido, resultado en caché o None)
+        """
+        hash_contenido = self.hash_archivo(ruta_archivo)
+        ruta_cache = self._ruta(hash_contenido)
+
+        if os.path.exists(ruta_cache):
+            try:
+                resultado = self._cargar(ruta_cache, nombre_archivo)
+                os.utime(ruta_cache)
+                with self._lock:
+                    self.hits += 1
+                    if ruta_cache in self._entradas:
+                        self._entradas.move_to_end(ruta_cache)
+                return hash_contenido, resultado
+            except Exception as e:
+                print(f"Entrada de caché de parseo inválida ({nombre_archivo}): {e}")
+
+        with self._lock:
+            self.misses += 1
+
+        return hash_contenido, None
+
+    def guardar_resultado(self, hash_contenido: str, resultado: Dict[str, any], nombre_archivo: str):
+        """
+        Guarda el resultado de procesar un archivo (los fallidos no se guardan)
+
+        Args:
+            hash_contenido: Hash retornado por buscar
+            resultado: Resultado de procesar_archivo_completo
+            nombre_archivo: Nombre del archivo (para mensajes)
+        """
+        if not resultado['success']:
+            return
+
+        try:
+            self._guardar(self._ruta(hash_contenido), resultado)
+        except Exception as e:
+            print(f"No se pudo guardar en caché de parseo ({nombre_archivo}): {e}")
+
+    def _guardar(self, ruta_cache: str, resultado: Dict[str, any]):
+        """
+        Serializa el resultado en columnas: una fila por servicio con el
+        índice de su sede, y los datos de sedes y validación como JSON
+        """
+        sedes = []
+        sede_idx = []
+        columnas = {campo: [] for campo in self.CAMPOS_TEXTO}
+        tarifa_tipo = []
+        tarifa_num = []
+        tarifa_txt = []
+
+        for idx, sede_data in enumerate(resultado['sedes_info']):
+            sedes.append(sede_data['sede'])
+
+            for servicio in sede_data['servicios']:
+                sede_idx.append(idx)
+                for campo in self.CAMPOS_TEXTO:
+                    columnas[campo].append(servicio[campo])
+
+                tipo, numero, texto = self._codificar_tarifa(servicio['tarifa_unitaria'])
+                tarifa_tipo.append(tipo)
+                tarifa_num.append(numero)
+                tarifa_txt.append(texto)
+
+        meta = {
+            'sedes': sedes,
+            'total_sedes': resultado['total_sedes'],
+            'total_servicios': resultado['total_servicios'],
+            'extension': resultado.get('extension'),
+            'validacion': {k: v for k, v in resultado.get('validacion', {}).items() if k != 'mensaje'}
+        }
+
+        arreglos = {
+            'meta': np.array(json.dumps(meta, ensure_ascii=False, default=str)),
+            'sede_idx': np.array(sede_idx, dtype=np.int32),
+            'tarifa_tipo': np.array(tarifa_tipo, dtype='U1'),
+            'tarifa_num': np.array(tarifa_num, dtype=np.float64),
+            'tarifa_txt': np.array(tarifa_txt, dtype=str)
+        }
+        for campo in self.CAMPOS_TEXTO:
+            arreglos[campo] = np.array(columnas[campo], dtype=str)
+
+        # Temporal propio de cada hilo: dos workers pueden guardar el mismo anexo a la vez
+        temporal = f"{ruta_cache}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporal, 'wb') as f:
+                np.savez_compressed(f, **arreglos)
+            os.replace(temporal, ruta_cache)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+        tamano = os.path.getsize(ruta_cache)
+        with self._lock:
+            self._total_bytes += tamano - self._entradas.pop(ruta_cache, 0)
+            self._entradas[ruta_cache] = tamano
+            self._desalojar()
+
+    def _cargar(self, ruta_cache: str, nombre_archivo: str) -> Dict[str, any]:
+        """Reconstruye el resultado de procesar_archivo_completo desde la caché"""
+        with np.load(ruta_cache, allow_pickle=False) as datos:
+            meta = json.loads(str(datos['meta']))
+            sede_idx = datos['sede_idx'].tolist()
+            tarifa_tipo = datos['tarifa_tipo'].tolist()
+            tarifa_num = datos['tarifa_num'].tolist()
+            tarifa_txt = datos['tarifa_txt'].tolist()
+            columnas = {campo: datos[campo].tolist() for campo in self.CAMPOS_TEXTO}
+
+        sedes_info = [{'sede': sede, 'servicios': []} for sede in meta['sedes']]
+
+        for fila, idx in enumerate(sede_idx):
+            servicio = {'codigo_cups': columnas['codigo_cups'][fila]}
+            servicio['codigo_homologo'] = columnas['codigo_homologo'][fila]
+            servicio['descripcion'] = columnas['descripcion'][fila]
+            servicio['tarifa_unitaria'] = self._decodificar_tarifa(tarifa_tipo[fila], tarifa_num[fila], tarifa_txt[fila])
+            servicio['tarifario'] = columnas['tarifario'][fila]
+            servicio['tarifa_segun_tarifario'] = columnas['tarifa_segun_tarifario'][fila]
+            servicio['observaciones'] = columnas['observaciones'][fila]
+            sedes_info[idx]['servicios'].append(servicio)
+
+        validacion = dict(meta['validacion'])
+        validacion['mensaje'] = f"✅ Formato POSITIVA válido: {nombre_archivo}"
+
+        return {
+            'success': True,
+            'nombre_archivo': nombre_archivo,
+            'extension': meta['extension'],
+            'validacion': validacion,
+            'sedes_info': sedes_info,
+            'total_sedes': meta['total_sedes'],
+            'total_servicios': meta['total_servicios'],
+            'desde_cache': True
+        }
+
+    @staticmethod
+    def _codificar_tarifa(valor) -> tuple:
+        """
+        Codifica la tarifa en (tipo, número, texto)
+
+        Tipos: 'i' entero, 'f' decimal, 'b' booleano, 's' texto, 'n' None,
+        't' pd.Timestamp y 'd' datetime (en ISO 8601)
+
+        Raises:
+            ValueError: Si la tarifa es de otro tipo; ese resultado no se guarda
+        """
+        if valor is None:
+            return 'n', 0.0, ''
+        if isinstance(valor, (bool, np.bool_)):
+            return 'b', float(valor), ''
+        if isinstance(valor, (int, np.integer)):
+            return 'i', float(valor), ''
+        if isinstance(valor, (float, np.floating)):
+            return 'f', float(valor), ''
+        if isinstance(valor, str):
+            return 's', 0.0, valor
+        # pd.Timestamp hereda de datetime: se revisa primero
+        if isinstance(valor, pd.Timestamp):
+            return 't', 0.0, valor.isoformat()
+        if isinstance(valor, datetime):
+            return 'd', 0.0, valor.isoformat()
+        raise ValueError(f"Tarifa de tipo no soportado en caché: {type(valor).__name__}")
+
+    @staticmethod
+    def _decodificar_tarifa(tipo: str, numero: float, texto: str):
+        """Operación inversa de _codificar_tarifa"""
+        if tipo == 'i':
+            return int(numero)
+        if tipo == 'f':
+            return numero
+        if tipo == 'b':
+            return bool(numero)
+        if tipo == 'n':
+            return None
+        if tipo == 't':
+            return pd.Timestamp(texto)
+        if tipo == 'd':
+            return datetime.fromisoformat(texto)
+        return texto
+
+    def _desalojar(self):
+        """
+        Elimina las entradas usadas hace más tiempo hasta quedar bajo el
+        límite, sin tocar la recién guardada (llamar con el lock tomado)
+        """
+        while self._total_bytes > self.max_bytes and len(self._entradas) > 1:
+            ruta, tamano = self._entradas.popitem(last=False)
+            self._total_bytes -= tamano
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    def estadisticas(self) -> Dict[str, any]:
+        """
+        Estadísticas de uso de la caché desde que se creó la instancia
+
+        Returns:
+            Dict con hits, misses y tasa de aciertos
+        """
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'tasa_aciertos': round(self.hits * 100 / consultas, 1) if consultas else 0.0
+            }
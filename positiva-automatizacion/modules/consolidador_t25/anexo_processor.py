@@ -3,14 +3,42 @@ Procesador de archivos ANEXO 1 en múltiples formatos - CORREGIDO
 """
 
 import os
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple
+from itertools import chain, islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 import re
 
+# Operaciones elemento a elemento sobre arreglos de objetos (motor vectorizado)
+_a_texto = np.frompyfunc(str, 1, 1)
+_sin_espacios = np.frompyfunc(str.strip, 1, 1)
+_mayusculas = np.frompyfunc(str.upper, 1, 1)
+
+
+def _contiene(textos: np.ndarray, patron: re.Pattern) -> np.ndarray:
+    """Máscara booleana de los textos donde aparece el patrón"""
+    return np.frompyfunc(patron.search, 1, 1)(textos).astype(bool)
+
+
 class AnexoProcessor:
     """Procesa archivos ANEXO 1 en múltiples formatos de Excel"""
     
+    # Versión de la extracción; incrementarla al cambiar la salida de
+    # procesar_archivo_completo invalida la caché de parseo
+    VERSION_PARSER = 2
+    
+    # Filas iniciales donde se valida el formato POSITIVA
+    FILAS_VALIDACION = 15
+    
+    # Patrones del motor vectorizado (mismas palabras clave que el recorrido fila a fila)
+    PATRON_HABILITACION = re.compile('CODIGO DE HABILITACIÓN|CÓDIGO DE HABILITACIÓN|CODIGO DE HABILITACION')
+    PATRON_ENCABEZADO_SERVICIOS = re.compile('CODIGO CUPS|CÓDIGO CUPS|CODIGO_CUPS|ITEM')
+    PATRON_NO_SERVICIO = re.compile('CODIGO|CUPS|DESCRIPCION|TARIFA|MANUAL|TOTAL|ITEM')
+    
+    # Textos que int() acepta como entero
+    PATRON_ENTERO = re.compile(r'[+-]?\d+(?:_\d+)*')
+    
     # Extensiones de Excel soportadas con prioridad
     EXTENSIONES_EXCEL = {
         '.xlsb': 1,  # Binario (prioridad más alta)
@@ -209,20 +237,49 @@ class AnexoProcessor:
         
         return otrosi_encontrados
     
-    def leer_archivo_excel(self, ruta_archivo: str, hoja: str = None) -> Optional[pd.DataFrame]:
+    @staticmethod
+    def _nombre_origen(origen: Union[str, BinaryIO], nombre_archivo: str = None) -> str:
+        """Nombre del archivo a leer: el indicado o el de la ruta/archivo abierto"""
+        if nombre_archivo:
+            return nombre_archivo
+        if isinstance(origen, (str, os.PathLike)):
+            return os.path.basename(origen)
+        
+        # Un buffer en memoria no tiene nombre (y un temporal tiene un descriptor numérico)
+        nombre = getattr(origen, 'name', None)
+        return os.path.basename(nombre) if isinstance(nombre, str) else ''
+    
+    @staticmethod
+    def _rebobinar(origen: Union[str, BinaryIO]):
+        """Vuelve al inicio un archivo abierto (las rutas no cambian)"""
+        if not isinstance(origen, (str, os.PathLike)) and hasattr(origen, 'seek'):
+            origen.seek(0)
+    
+    def leer_archivo_excel(
+        self,
+        ruta_archivo: Union[str, BinaryIO],
+        hoja: str = None,
+        nombre_archivo: str = None
+    ) -> Optional[pd.DataFrame]:
         """
         Lee cualquier formato de Excel y retorna DataFrame
         
         Args:
-            ruta_archivo: Ruta completa del archivo
+            ruta_archivo: Ruta completa del archivo o archivo binario abierto
+                (por ejemplo el buffer de GoAnywhereWebClient.descargar_en_memoria)
             hoja: Nombre de la hoja a leer (opcional)
+            nombre_archivo: Nombre del archivo, para reconocer el formato de un
+                archivo abierto (por defecto el de la ruta)
             
         Returns:
             DataFrame con los datos o None si falla
         """
-        extension = os.path.splitext(ruta_archivo)[1].lower()
+        nombre_archivo = self._nombre_origen(ruta_archivo, nombre_archivo)
+        extension = os.path.splitext(nombre_archivo)[1].lower()
         
         try:
+            self._rebobinar(ruta_archivo)
+            
             if extension == '.xlsb':
                 return self._leer_xlsb(ruta_archivo, hoja)
             
@@ -252,52 +309,71 @@ class AnexoProcessor:
                 return pd.read_excel(ruta_archivo, header=None)
         
         except Exception as e:
-            print(f"❌ Error leyendo {ruta_archivo}: {e}")
+            print(f"❌ Error leyendo {nombre_archivo}: {e}")
             return None
     
-    def _leer_xlsb(self, ruta_archivo: str, hoja_objetivo: str = None) -> Optional[pd.DataFrame]:
+    def _seleccionar_hoja_xlsb(self, wb, hoja_objetivo: str = None) -> Optional[str]:
         """
-        Lee archivo XLSB específicamente
+        Elige la hoja de tarifas de un libro XLSB abierto
         
         Args:
-            ruta_archivo: Ruta del archivo XLSB
+            wb: Libro abierto con pyxlsb
             hoja_objetivo: Nombre de la hoja a leer (opcional)
+        
+        Returns:
+            Nombre de la hoja o None si el libro no tiene hojas
+        """
+        # Si se especifica hoja, usarla
+        if hoja_objetivo and hoja_objetivo in wb.sheets:
+            return hoja_objetivo
+        
+        # Buscar hoja de tarifas
+        for sheet_name in wb.sheets:
+            nombre_upper = sheet_name.upper()
+            if 'TARIFA' in nombre_upper and 'SERV' in nombre_upper:
+                return sheet_name
+        
+        # Usar primera hoja
+        return wb.sheets[0] if wb.sheets else None
+    
+    def _iterar_filas_xlsb(self, ruta_archivo: Union[str, BinaryIO], hoja_objetivo: str = None) -> Iterator[list]:
+        """
+        Recorre las filas de la hoja de tarifas de un XLSB sin cargarlas todas
+        
+        Args:
+            ruta_archivo: Ruta del archivo XLSB o archivo binario abierto
+            hoja_objetivo: Nombre de la hoja a leer (opcional)
+        
+        Yields:
+            Lista de valores de cada fila (celdas vacías como '')
+        """
+        from pyxlsb import open_workbook
+        
+        self._rebobinar(ruta_archivo)
+        
+        with open_workbook(ruta_archivo) as wb:
+            hoja_tarifas = self._seleccionar_hoja_xlsb(wb, hoja_objetivo)
             
+            if not hoja_tarifas:
+                raise ValueError('El libro no tiene hojas')
+            
+            with wb.get_sheet(hoja_tarifas) as sheet:
+                for row in sheet.rows():
+                    yield [item.v if item.v is not None else '' for item in row]
+    
+    def _leer_xlsb(self, ruta_archivo: Union[str, BinaryIO], hoja_objetivo: str = None) -> Optional[pd.DataFrame]:
+        """
+        Lee archivo XLSB específicamente
+        
+        Args:
+            ruta_archivo: Ruta del archivo XLSB o archivo binario abierto
+            hoja_objetivo: Nombre de la hoja a leer (opcional)
+        
         Returns:
             DataFrame con los datos
         """
         try:
-            from pyxlsb import open_workbook
-            
-            with open_workbook(ruta_archivo) as wb:
-                # Si se especifica hoja, usarla
-                if hoja_objetivo and hoja_objetivo in wb.sheets:
-                    hoja_tarifas = hoja_objetivo
-                else:
-                    # Buscar hoja de tarifas
-                    hoja_tarifas = None
-                    for sheet_name in wb.sheets:
-                        nombre_upper = sheet_name.upper()
-                        if 'TARIFA' in nombre_upper and 'SERV' in nombre_upper:
-                            hoja_tarifas = sheet_name
-                            break
-                    
-                    if not hoja_tarifas:
-                        # Usar primera hoja
-                        hoja_tarifas = wb.sheets[0] if wb.sheets else None
-                
-                if not hoja_tarifas:
-                    return None
-                
-                # Leer datos
-                data = []
-                with wb.get_sheet(hoja_tarifas) as sheet:
-                    for row in sheet.rows():
-                        row_values = [item.v if item.v is not None else '' for item in row]
-                        data.append(row_values)
-                
-                # Convertir a DataFrame
-                return pd.DataFrame(data)
+            return pd.DataFrame(list(self._iterar_filas_xlsb(ruta_archivo, hoja_objetivo)))
         
         except Exception as e:
             print(f"Error leyendo XLSB: {e}")
@@ -314,11 +390,28 @@ class AnexoProcessor:
         Args:
             df: DataFrame a validar
             nombre_archivo: Nombre del archivo (para mensajes)
-            
+        
         Returns:
             Dict con validación y detalles
         """
         if df is None or df.empty:
+            return self._validar_filas([], nombre_archivo)
+        
+        primeras_filas = [list(df.iloc[i]) for i in range(min(self.FILAS_VALIDACION, len(df)))]
+        return self._validar_filas(primeras_filas, nombre_archivo)
+    
+    def _validar_filas(self, primeras_filas: List[list], nombre_archivo: str) -> Dict[str, any]:
+        """
+        Valida el formato POSITIVA sobre las primeras filas del archivo
+        
+        Args:
+            primeras_filas: Valores de las primeras FILAS_VALIDACION filas
+            nombre_archivo: Nombre del archivo (para mensajes)
+        
+        Returns:
+            Dict con validación y detalles
+        """
+        if not primeras_filas:
             return {
                 'valido': False,
                 'mensaje': f'No hay anexo 1 en formato + {nombre_archivo} (archivo vacío)',
@@ -334,11 +427,12 @@ class AnexoProcessor:
             'fila_encabezado': None
         }
         
+        filas_texto = [[str(val).upper() for val in fila] for fila in primeras_filas]
+        
         # Verificar encabezado "ANEXO 1 PACTADO DEL PRESTADOR" en las primeras filas
-        for i in range(min(10, len(df))):
-            fila = df.iloc[i].astype(str).str.upper()
+        for fila in filas_texto[:10]:
             for val in fila:
-                if 'ANEXO' in str(val) and '1' in str(val) and 'PACTADO' in str(val):
+                if 'ANEXO' in val and '1' in val and 'PACTADO' in val:
                     resultado['tiene_encabezado'] = True
                     break
             if resultado['tiene_encabezado']:
@@ -353,9 +447,8 @@ class AnexoProcessor:
             'HABILITACION'
         ]
         
-        for i in range(min(15, len(df))):
-            fila = df.iloc[i].astype(str).str.upper()
-            matches = sum(1 for col in columnas_esperadas if any(col in str(val) for val in fila))
+        for i, fila in enumerate(filas_texto[:15]):
+            matches = sum(1 for col in columnas_esperadas if any(col in val for val in fila))
             
             if matches >= 3:
                 resultado['columnas_correctas'] = True
@@ -374,6 +467,180 @@ class AnexoProcessor:
         
         return resultado
     
+    @staticmethod
+    def _texto_fila(valores) -> str:
+        """Concatena en mayúsculas las celdas no nulas de una fila"""
+        return ' '.join([str(cell).upper() for cell in valores if pd.notna(cell)])
+    
+    @staticmethod
+    def _es_fila_habilitacion(texto_fila: str) -> bool:
+        """Indica si la fila marca el inicio de una sede"""
+        return 'CODIGO DE HABILITACIÓN' in texto_fila or 'CÓDIGO DE HABILITACIÓN' in texto_fila or 'CODIGO DE HABILITACION' in texto_fila
+    
+    @staticmethod
+    def _es_fila_encabezado_servicios(texto_fila: str) -> bool:
+        """Indica si la fila es el encabezado de la tabla de servicios"""
+        return any(keyword in texto_fila for keyword in ['CODIGO CUPS', 'CÓDIGO CUPS', 'CODIGO_CUPS', 'ITEM'])
+    
+    def _parsear_sede(self, sede_row) -> Optional[Dict[str, any]]:
+        """
+        Extrae la sede de la fila que sigue a "CODIGO DE HABILITACIÓN"
+        
+        Args:
+            sede_row: Valores de la fila de datos de la sede
+        
+        Returns:
+            Dict de la sede o None si no tiene código de habilitación
+        """
+        codigo_hab = None
+        numero_sede = None
+        nombre_sede = None
+        municipio = None
+        
+        # Buscar valores en la fila de datos
+        for i, val in enumerate(sede_row):
+            if pd.notna(val) and str(val).strip():
+                val_str = str(val).strip()
+                
+                # Columna C suele tener código de habilitación
+                if i == 2:
+                    codigo_hab = val_str
+                # Columna D suele tener número de sede
+                elif i == 3:
+                    numero_sede = val
+                # Columna E suele tener nombre
+                elif i == 4:
+                    nombre_sede = val_str
+                # Columna B suele tener municipio
+                elif i == 1:
+                    municipio = val_str
+        
+        if not codigo_hab:
+            return None
+        
+        # Formatear número de sede
+        numero_str = '01'
+        if numero_sede is not None:
+            if isinstance(numero_sede, float) and numero_sede.is_integer():
+                numero_str = str(int(numero_sede)).zfill(2)
+            elif isinstance(numero_sede, int):
+                numero_str = str(numero_sede).zfill(2)
+            else:
+                numero_str = str(numero_sede).zfill(2)
+        
+        return {
+            'codigo_habilitacion': codigo_hab,
+            'numero_sede': numero_str,
+            'codigo_completo': f"{codigo_hab}-{numero_str}",
+            'nombre_sede': nombre_sede,
+            'municipio': municipio
+        }
+    
+    def _parsear_servicio(self, row) -> Optional[Dict[str, any]]:
+        """
+        Extrae un servicio de una fila de la tabla de servicios
+        
+        Args:
+            row: Valores de la fila
+        
+        Returns:
+            Dict del servicio o None si la fila no es un servicio válido
+        """
+        # Verificar si es una fila de servicio válida
+        primera_celda = row[0] if len(row) > 0 else None
+        segunda_celda = row[1] if len(row) > 1 else None
+        
+        # La primera o segunda celda debe tener contenido
+        if not (pd.notna(primera_celda) or pd.notna(segunda_celda)):
+            return None
+        
+        codigo_cups = None
+        
+        # Determinar posición del código CUPS
+        if pd.notna(segunda_celda) and str(segunda_celda).strip():
+            # Si hay ITEM en col 0, CUPS en col 1
+            codigo_cups = str(segunda_celda).strip()
+            descripcion_col = 2
+        elif pd.notna(primera_celda) and str(primera_celda).strip():
+            codigo_cups = str(primera_celda).strip()
+            descripcion_col = 1
+        
+        if not codigo_cups:
+            return None
+        
+        # Filtrar encabezados y totales
+        codigo_upper = codigo_cups.upper()
+        if any(kw in codigo_upper for kw in ['CODIGO', 'CUPS', 'DESCRIPCION', 'TARIFA', 'MANUAL', 'TOTAL', 'ITEM']):
+            return None
+        
+        # Filtrar filas vacías o solo con número de item
+        try:
+            int(codigo_cups)
+            # Es solo un número (probablemente ITEM), buscar CUPS en siguiente columna
+            if len(row) > 1 and pd.notna(row[1]):
+                codigo_cups = str(row[1]).strip()
+                descripcion_col = 2
+        except ValueError:
+            pass
+        
+        # Verificar que no sea encabezado
+        if codigo_cups.upper() in ['CODIGO CUPS', 'CÓDIGO CUPS', 'CUPS']:
+            return None
+        
+        tarifa_col = descripcion_col + 1
+        manual_col = descripcion_col + 2
+        porcentaje_col = descripcion_col + 3
+        observaciones_col = descripcion_col + 4
+        
+        return {
+            'codigo_cups': codigo_cups,
+            'codigo_homologo': str(row[descripcion_col - 1]).strip() if len(row) > descripcion_col - 1 and pd.notna(row[descripcion_col - 1]) else '',
+            'descripcion': str(row[descripcion_col]).strip() if len(row) > descripcion_col and pd.notna(row[descripcion_col]) else '',
+            'tarifa_unitaria': row[tarifa_col] if len(row) > tarifa_col and pd.notna(row[tarifa_col]) else 0,
+            'tarifario': str(row[manual_col]).strip() if len(row) > manual_col and pd.notna(row[manual_col]) else '',
+            'tarifa_segun_tarifario': str(row[porcentaje_col]).strip() if len(row) > porcentaje_col and pd.notna(row[porcentaje_col]) else '',
+            'observaciones': str(row[observaciones_col]).strip() if len(row) > observaciones_col and pd.notna(row[observaciones_col]) else ''
+        }
+    
+    def _textos_filas(self, matriz: np.ndarray) -> np.ndarray:
+        """
+        Equivalente vectorizado de _texto_fila para todas las filas: une por
+        columnas, en mayúsculas y con espacio, las celdas no nulas
+        
+        Args:
+            matriz: Valores del DataFrame (df.values)
+        
+        Returns:
+            Arreglo con el texto de cada fila
+        """
+        textos = np.full(matriz.shape[0], '', dtype=object)
+        con_texto = np.zeros(matriz.shape[0], dtype=bool)
+        
+        for j in range(matriz.shape[1]):
+            columna = matriz[:, j]
+            no_nulos = pd.notna(columna)
+            parte = _a_texto(columna)
+            
+            unido = np.where(con_texto, textos + ' ' + parte, parte)
+            textos = np.where(no_nulos, unido, textos)
+            con_texto |= no_nulos
+        
+        return _mayusculas(textos)
+    
+    def _clasificar_filas(self, matriz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcula en bloque qué filas inician sede y cuáles son encabezado de servicios
+        
+        Returns:
+            Tupla (posiciones de filas de habilitación, posiciones de encabezados)
+        """
+        textos = self._textos_filas(matriz)
+        
+        es_habilitacion = _contiene(textos, self.PATRON_HABILITACION)
+        es_encabezado = _contiene(textos, self.PATRON_ENCABEZADO_SERVICIOS)
+        
+        return np.flatnonzero(es_habilitacion), np.flatnonzero(es_encabezado & ~es_habilitacion)
+    
     def extraer_sedes_del_encabezado(self, df: pd.DataFrame) -> List[Dict[str, any]]:
         """
         Extrae información de sedes del encabezado del ANEXO 1
@@ -383,58 +650,16 @@ class AnexoProcessor:
         Returns:
             Lista de sedes encontradas
         """
+        matriz = df.values
+        filas_habilitacion, _ = self._clasificar_filas(matriz)
         sedes = []
         
-        # Buscar filas con "CODIGO DE HABILITACIÓN"
-        for idx, row in df.iterrows():
-            row_str = ' '.join([str(cell).upper() for cell in row if pd.notna(cell)])
-            
-            if 'CODIGO DE HABILITACIÓN' in row_str or 'CÓDIGO DE HABILITACIÓN' in row_str or 'CODIGO DE HABILITACION' in row_str:
-                # La fila siguiente contiene los datos de la sede
-                if idx + 1 < len(df):
-                    sede_row = df.iloc[idx + 1]
-                    
-                    codigo_hab = None
-                    numero_sede = None
-                    nombre_sede = None
-                    municipio = None
-                    
-                    # Buscar valores en la fila de datos
-                    for i, val in enumerate(sede_row):
-                        if pd.notna(val) and str(val).strip():
-                            val_str = str(val).strip()
-                            
-                            # Columna C suele tener código de habilitación
-                            if i == 2:
-                                codigo_hab = val_str
-                            # Columna D suele tener número de sede
-                            elif i == 3:
-                                numero_sede = val
-                            # Columna E suele tener nombre
-                            elif i == 4:
-                                nombre_sede = val_str
-                            # Columna B suele tener municipio
-                            elif i == 1:
-                                municipio = val_str
-                    
-                    if codigo_hab:
-                        # Formatear número de sede
-                        numero_str = '01'
-                        if numero_sede is not None:
-                            if isinstance(numero_sede, float) and numero_sede.is_integer():
-                                numero_str = str(int(numero_sede)).zfill(2)
-                            elif isinstance(numero_sede, int):
-                                numero_str = str(numero_sede).zfill(2)
-                            else:
-                                numero_str = str(numero_sede).zfill(2)
-                        
-                        sedes.append({
-                            'codigo_habilitacion': codigo_hab,
-                            'numero_sede': numero_str,
-                            'codigo_completo': f"{codigo_hab}-{numero_str}",
-                            'nombre_sede': nombre_sede,
-                            'municipio': municipio
-                        })
+        # La fila siguiente a "CODIGO DE HABILITACIÓN" contiene los datos de la sede
+        for fila in filas_habilitacion:
+            if fila + 1 < len(matriz):
+                sede = self._parsear_sede(list(matriz[fila + 1]))
+                if sede:
+                    sedes.append(sede)
         
         return sedes
     
@@ -442,9 +667,14 @@ class AnexoProcessor:
         """
         Extrae servicios de un DataFrame de ANEXO 1
         
+        Motor vectorizado: clasifica todas las filas con operaciones de
+        texto por columna, ubica los bloques de cada sede por índice y
+        convierte cada bloque de servicios en columnas; produce el mismo
+        resultado que recorrer las filas con extraer_servicios_de_filas
+        
         Args:
             df: DataFrame con datos del ANEXO 1
-            
+        
         Returns:
             Dict con sedes y servicios extraídos
         """
@@ -454,21 +684,177 @@ class AnexoProcessor:
                 'error': 'DataFrame vacío'
             }
         
+        try:
+            matriz = df.values
+            total_filas = len(matriz)
+            filas_habilitacion, filas_encabezado = self._clasificar_filas(matriz)
+            
+            # Sede de cada bloque; si la fila de datos no trae código de
+            # habilitación se mantiene la sede anterior
+            sedes_encabezado = []
+            bloques = []
+            current_sede = None
+            limites = list(filas_habilitacion[1:]) + [total_filas]
+            
+            for fila, fin in zip(filas_habilitacion, limites):
+                if fila + 1 < total_filas:
+                    sede = self._parsear_sede(list(matriz[fila + 1]))
+                    if sede:
+                        sedes_encabezado.append(dict(sede))
+                        current_sede = sede
+                
+                # Los servicios empiezan después del primer encabezado del bloque
+                k = np.searchsorted(filas_encabezado, fila + 1)
+                if current_sede and k < len(filas_encabezado) and filas_encabezado[k] < fin:
+                    bloques.append((current_sede, filas_encabezado[k] + 1, fin))
+            
+            sedes_info = []
+            
+            if bloques:
+                filas = np.concatenate([np.arange(inicio, fin) for _, inicio, fin in bloques])
+                bloque_de_fila = np.concatenate([
+                    np.full(fin - inicio, numero) for numero, (_, inicio, fin) in enumerate(bloques)
+                ])
+                
+                validas, servicios = self._parsear_servicios_vectorizado(matriz, filas)
+                bloque_de_servicio = bloque_de_fila[validas]
+                
+                cortes = np.searchsorted(bloque_de_servicio, np.arange(len(bloques) + 1))
+                for numero, (sede, _, _) in enumerate(bloques):
+                    servicios_bloque = servicios[cortes[numero]:cortes[numero + 1]]
+                    if servicios_bloque:
+                        sedes_info.append({
+                            'sede': sede,
+                            'servicios': servicios_bloque
+                        })
+            
+            return self._resultado_extraccion(sedes_info, sedes_encabezado)
+        
+        except Exception as e:
+            import traceback
+            return {
+                'success': False,
+                'error': f'Error extrayendo servicios: {str(e)}',
+                'traceback': traceback.format_exc()
+            }
+    
+    def _parsear_servicios_vectorizado(
+        self,
+        matriz: np.ndarray,
+        filas: np.ndarray
+    ) -> Tuple[np.ndarray, List[Dict[str, any]]]:
+        """
+        Equivalente vectorizado de _parsear_servicio para un conjunto de filas
+        
+        Args:
+            matriz: Valores del DataFrame (df.values)
+            filas: Posiciones de las filas candidatas a servicio
+        
+        Returns:
+            Tupla (máscara de filas que son servicio, servicios en orden)
+        """
+        cantidad = len(filas)
+        ancho = matriz.shape[1]
+        crudos = {}
+        no_nulos = {}
+        textos = {}
+        
+        # Columnas 0 a 6: valor crudo, máscara de no nulos y texto sin espacios
+        for j in range(7):
+            if j < ancho:
+                crudos[j] = matriz[filas, j].astype(object)
+                no_nulos[j] = pd.notna(crudos[j])
+                textos[j] = np.where(no_nulos[j], _sin_espacios(_a_texto(crudos[j])), '')
+            else:
+                crudos[j] = np.full(cantidad, None, dtype=object)
+                no_nulos[j] = np.zeros(cantidad, dtype=bool)
+                textos[j] = np.full(cantidad, '', dtype=object)
+        
+        # Determinar posición del código CUPS
+        usa_segunda = no_nulos[1] & (textos[1] != '')
+        usa_primera = ~usa_segunda & no_nulos[0] & (textos[0] != '')
+        validas = usa_segunda | usa_primera
+        
+        codigo = np.where(usa_segunda, textos[1], textos[0])
+        base = np.where(usa_segunda, 2, 1)
+        
+        # Filtrar encabezados y totales
+        validas &= ~_contiene(_mayusculas(codigo), self.PATRON_NO_SERVICIO)
+        
+        # Solo número (probablemente ITEM): el CUPS está en la columna siguiente
+        es_entero = np.frompyfunc(self.PATRON_ENTERO.fullmatch, 1, 1)(codigo).astype(bool)
+        mover = es_entero & no_nulos[1]
+        codigo = np.where(mover, textos[1], codigo)
+        base = np.where(mover, 2, base)
+        
+        # Verificar que no sea encabezado
+        validas &= ~np.isin(_mayusculas(codigo), ['CODIGO CUPS', 'CÓDIGO CUPS', 'CUPS'])
+        
+        desde_segunda = base == 2
+        
+        def texto_campo(offset):
+            return np.where(desde_segunda, textos[offset + 1], textos[offset])[validas].tolist()
+        
+        tarifa = np.full(cantidad, 0, dtype=object)
+        for j, filas_columna in ((2, ~desde_segunda), (3, desde_segunda)):
+            tomar = filas_columna & no_nulos[j]
+            tarifa[tomar] = crudos[j][tomar]
+        
+        campos = zip(
+            codigo[validas].tolist(),
+            texto_campo(0),
+            texto_campo(1),
+            tarifa[validas].tolist(),
+            texto_campo(3),
+            texto_campo(4),
+            texto_campo(5)
+        )
+        
+        servicios = [
+            {
+                'codigo_cups': codigo_cups,
+                'codigo_homologo': codigo_homologo,
+                'descripcion': descripcion,
+                'tarifa_unitaria': tarifa_unitaria,
+                'tarifario': tarifario,
+                'tarifa_segun_tarifario': tarifa_segun_tarifario,
+                'observaciones': observaciones
+            }
+            for codigo_cups, codigo_homologo, descripcion, tarifa_unitaria, tarifario, tarifa_segun_tarifario, observaciones in campos
+        ]
+        
+        return validas, servicios
+    
+    def extraer_servicios_de_filas(self, filas: Iterable[list]) -> Dict[str, any]:
+        """
+        Extrae servicios recorriendo las filas una sola vez, sin DataFrame
+        
+        Máquina de estados por fila (sede -> encabezado de servicios ->
+        servicios) con una fila de anticipación para leer los datos de la
+        sede; produce el mismo resultado que extraer_servicios_de_anexo
+        
+        Args:
+            filas: Iterable de filas (listas de valores) del ANEXO 1
+        
+        Returns:
+            Dict con sedes y servicios extraídos
+        """
         try:
             sedes_info = []
+            sedes_encabezado = []
             current_sede = None
             current_servicios = []
-            fila_inicio_servicios = None
             en_seccion_servicios = False
             
-            # Primero, extraer todas las sedes del encabezado
-            sedes_encabezado = self.extraer_sedes_del_encabezado(df)
+            filas = iter(filas)
+            row = next(filas, None)
             
-            for idx, row in df.iterrows():
-                row_str = ' '.join([str(cell).upper() for cell in row if pd.notna(cell)])
+            while row is not None:
+                siguiente = next(filas, None)
+                row_str = self._texto_fila(row)
                 
                 # Detectar inicio de sede
-                if 'CODIGO DE HABILITACIÓN' in row_str or 'CÓDIGO DE HABILITACIÓN' in row_str or 'CODIGO DE HABILITACION' in row_str:
+                if self._es_fila_habilitacion(row_str):
                     # Guardar sede anterior si existe
                     if current_sede and current_servicios:
                         sedes_info.append({
@@ -476,120 +862,28 @@ class AnexoProcessor:
                             'servicios': current_servicios.copy()
                         })
                     
-                    # Leer información de la sede (siguiente fila)
                     current_servicios = []
                     en_seccion_servicios = False
-                    fila_inicio_servicios = None
                     
-                    if idx + 1 < len(df):
-                        sede_row = df.iloc[idx + 1]
-                        
-                        codigo_hab = None
-                        numero_sede = None
-                        nombre_sede = None
-                        municipio = None
-                        
-                        for i, val in enumerate(sede_row):
-                            if pd.notna(val) and str(val).strip():
-                                val_str = str(val).strip()
-                                if i == 2:
-                                    codigo_hab = val_str
-                                elif i == 3:
-                                    numero_sede = val
-                                elif i == 4:
-                                    nombre_sede = val_str
-                                elif i == 1:
-                                    municipio = val_str
-                        
-                        if codigo_hab:
-                            numero_str = '01'
-                            if numero_sede is not None:
-                                if isinstance(numero_sede, float) and numero_sede.is_integer():
-                                    numero_str = str(int(numero_sede)).zfill(2)
-                                elif isinstance(numero_sede, int):
-                                    numero_str = str(numero_sede).zfill(2)
-                                else:
-                                    numero_str = str(numero_sede).zfill(2)
-                            
-                            current_sede = {
-                                'codigo_habilitacion': codigo_hab,
-                                'numero_sede': numero_str,
-                                'codigo_completo': f"{codigo_hab}-{numero_str}",
-                                'nombre_sede': nombre_sede,
-                                'municipio': municipio
-                            }
-                    
-                    continue
+                    # La fila siguiente contiene los datos de la sede
+                    if siguiente is not None:
+                        sede = self._parsear_sede(siguiente)
+                        if sede:
+                            sedes_encabezado.append(dict(sede))
+                            current_sede = sede
                 
                 # Detectar fila de encabezados de servicios
-                if not en_seccion_servicios:
-                    if any(keyword in row_str for keyword in ['CODIGO CUPS', 'CÓDIGO CUPS', 'CODIGO_CUPS', 'ITEM']):
+                elif not en_seccion_servicios:
+                    if self._es_fila_encabezado_servicios(row_str):
                         en_seccion_servicios = True
-                        fila_inicio_servicios = idx + 1
-                        continue
                 
                 # Extraer servicios
-                if en_seccion_servicios and current_sede and idx >= (fila_inicio_servicios or 0):
-                    # Verificar si es una fila de servicio válida
-                    primera_celda = row.iloc[0] if len(row) > 0 else None
-                    segunda_celda = row.iloc[1] if len(row) > 1 else None
-                    
-                    # La primera o segunda celda debe tener contenido
-                    if pd.notna(primera_celda) or pd.notna(segunda_celda):
-                        codigo_cups = None
-                        
-                        # Determinar posición del código CUPS
-                        if pd.notna(segunda_celda) and str(segunda_celda).strip():
-                            # Si hay ITEM en col 0, CUPS en col 1
-                            codigo_cups = str(segunda_celda).strip()
-                            descripcion_col = 2
-                            tarifa_col = 3
-                            manual_col = 4
-                            porcentaje_col = 5
-                            observaciones_col = 6
-                        elif pd.notna(primera_celda) and str(primera_celda).strip():
-                            codigo_cups = str(primera_celda).strip()
-                            descripcion_col = 1
-                            tarifa_col = 2
-                            manual_col = 3
-                            porcentaje_col = 4
-                            observaciones_col = 5
-                        
-                        if codigo_cups:
-                            # Filtrar encabezados y totales
-                            codigo_upper = codigo_cups.upper()
-                            if any(kw in codigo_upper for kw in ['CODIGO', 'CUPS', 'DESCRIPCION', 'TARIFA', 'MANUAL', 'TOTAL', 'ITEM']):
-                                continue
-                            
-                            # Filtrar filas vacías o solo con número de item
-                            try:
-                                int(codigo_cups)
-                                # Es solo un número (probablemente ITEM), buscar CUPS en siguiente columna
-                                if len(row) > 1 and pd.notna(row.iloc[1]):
-                                    codigo_cups = str(row.iloc[1]).strip()
-                                    descripcion_col = 2
-                                    tarifa_col = 3
-                                    manual_col = 4
-                                    porcentaje_col = 5
-                                    observaciones_col = 6
-                            except ValueError:
-                                pass
-                            
-                            # Verificar que no sea encabezado
-                            if codigo_cups.upper() in ['CODIGO CUPS', 'CÓDIGO CUPS', 'CUPS']:
-                                continue
-                            
-                            servicio = {
-                                'codigo_cups': codigo_cups,
-                                'codigo_homologo': str(row.iloc[descripcion_col - 1]).strip() if len(row) > descripcion_col - 1 and pd.notna(row.iloc[descripcion_col - 1]) else '',
-                                'descripcion': str(row.iloc[descripcion_col]).strip() if len(row) > descripcion_col and pd.notna(row.iloc[descripcion_col]) else '',
-                                'tarifa_unitaria': row.iloc[tarifa_col] if len(row) > tarifa_col and pd.notna(row.iloc[tarifa_col]) else 0,
-                                'tarifario': str(row.iloc[manual_col]).strip() if len(row) > manual_col and pd.notna(row.iloc[manual_col]) else '',
-                                'tarifa_segun_tarifario': str(row.iloc[porcentaje_col]).strip() if len(row) > porcentaje_col and pd.notna(row.iloc[porcentaje_col]) else '',
-                                'observaciones': str(row.iloc[observaciones_col]).strip() if len(row) > observaciones_col and pd.notna(row.iloc[observaciones_col]) else ''
-                            }
-                            
-                            current_servicios.append(servicio)
+                elif current_sede:
+                    servicio = self._parsear_servicio(row)
+                    if servicio:
+                        current_servicios.append(servicio)
+                
+                row = siguiente
             
             # Guardar última sede
             if current_sede and current_servicios:
@@ -598,27 +892,7 @@ class AnexoProcessor:
                     'servicios': current_servicios.copy()
                 })
             
-            # CASO ESPECIAL: Múltiples sedes sin discriminación de servicios
-            # Si hay múltiples sedes en el encabezado pero solo una sección de servicios
-            if len(sedes_encabezado) > 1 and len(sedes_info) == 1:
-                servicios_base = sedes_info[0]['servicios']
-                sedes_info = []
-                
-                for sede in sedes_encabezado:
-                    sedes_info.append({
-                        'sede': sede,
-                        'servicios': servicios_base.copy()
-                    })
-            
-            # Calcular totales
-            total_servicios = sum(len(sede_data['servicios']) for sede_data in sedes_info)
-            
-            return {
-                'success': True,
-                'sedes_info': sedes_info,
-                'total_sedes': len(sedes_info),
-                'total_servicios': total_servicios
-            }
+            return self._resultado_extraccion(sedes_info, sedes_encabezado)
         
         except Exception as e:
             import traceback
@@ -628,20 +902,65 @@ class AnexoProcessor:
                 'traceback': traceback.format_exc()
             }
     
-    def procesar_archivo_completo(self, ruta_archivo: str) -> Dict[str, any]:
+    def _resultado_extraccion(
+        self,
+        sedes_info: List[Dict[str, any]],
+        sedes_encabezado: List[Dict[str, any]]
+    ) -> Dict[str, any]:
         """
-        Procesa un archivo ANEXO 1 completo
+        Arma el resultado de la extracción aplicando el caso de múltiples
+        sedes en el encabezado con una sola sección de servicios
         
         Args:
-            ruta_archivo: Ruta del archivo
+            sedes_info: Sedes con sus servicios, en orden de aparición
+            sedes_encabezado: Todas las sedes declaradas en el archivo
+        
+        Returns:
+            Dict con sedes_info, total_sedes y total_servicios
+        """
+        # CASO ESPECIAL: Múltiples sedes sin discriminación de servicios
+        # Si hay múltiples sedes en el encabezado pero solo una sección de servicios
+        if len(sedes_encabezado) > 1 and len(sedes_info) == 1:
+            servicios_base = sedes_info[0]['servicios']
+            sedes_info = []
             
+            for sede in sedes_encabezado:
+                sedes_info.append({
+                    'sede': sede,
+                    'servicios': servicios_base.copy()
+                })
+        
+        # Calcular totales
+        total_servicios = sum(len(sede_data['servicios']) for sede_data in sedes_info)
+        
+        return {
+            'success': True,
+            'sedes_info': sedes_info,
+            'total_sedes': len(sedes_info),
+            'total_servicios': total_servicios
+        }
+    
+    def procesar_archivo_completo(self, ruta_archivo: Union[str, BinaryIO], nombre_archivo: str = None) -> Dict[str, any]:
+        """
+        Procesa un archivo ANEXO 1 completo
+        
+        Los XLSB se procesan en streaming (sin DataFrame); los demás
+        formatos se leen con pandas
+        
+        Args:
+            ruta_archivo: Ruta del archivo o archivo binario abierto
+            nombre_archivo: Nombre del archivo (obligatorio si es un archivo abierto sin nombre)
+        
         Returns:
             Dict con toda la información procesada
         """
-        nombre_archivo = os.path.basename(ruta_archivo)
+        nombre_archivo = self._nombre_origen(ruta_archivo, nombre_archivo)
+        
+        if os.path.splitext(nombre_archivo)[1].lower() == '.xlsb':
+            return self._procesar_xlsb_streaming(ruta_archivo, nombre_archivo)
         
         # Leer archivo
-        df = self.leer_archivo_excel(ruta_archivo)
+        df = self.leer_archivo_excel(ruta_archivo, nombre_archivo=nombre_archivo)
         
         if df is None:
             return {
@@ -664,6 +983,59 @@ class AnexoProcessor:
         # Extraer servicios
         extraccion = self.extraer_servicios_de_anexo(df)
         
+        return self._resultado_procesamiento(nombre_archivo, validacion, extraccion)
+    
+    def _procesar_xlsb_streaming(self, ruta_archivo: Union[str, BinaryIO], nombre_archivo: str) -> Dict[str, any]:
+        """
+        Procesa un XLSB fila a fila: valida con las primeras filas y, si el
+        formato es válido, pasa el resto directo a la máquina de estados
+        
+        Args:
+            ruta_archivo: Ruta del archivo XLSB o archivo binario abierto
+            nombre_archivo: Nombre del archivo (para mensajes)
+        
+        Returns:
+            Mismo Dict que procesar_archivo_completo
+        """
+        filas = self._iterar_filas_xlsb(ruta_archivo)
+        
+        try:
+            try:
+                primeras_filas = list(islice(filas, self.FILAS_VALIDACION))
+            except Exception as e:
+                print(f"Error leyendo XLSB: {e}")
+                return {
+                    'success': False,
+                    'error': f'No se pudo leer el archivo: {nombre_archivo}',
+                    'nombre_archivo': nombre_archivo
+                }
+            
+            # Validar formato POSITIVA
+            validacion = self._validar_filas(primeras_filas, nombre_archivo)
+            
+            if not validacion['valido']:
+                return {
+                    'success': False,
+                    'error': validacion['mensaje'],
+                    'nombre_archivo': nombre_archivo,
+                    'validacion': validacion
+                }
+            
+            # Extraer servicios sin materializar la hoja
+            extraccion = self.extraer_servicios_de_filas(chain(primeras_filas, filas))
+            
+            return self._resultado_procesamiento(nombre_archivo, validacion, extraccion)
+        
+        finally:
+            filas.close()
+    
+    def _resultado_procesamiento(
+        self,
+        nombre_archivo: str,
+        validacion: Dict[str, any],
+        extraccion: Dict[str, any]
+    ) -> Dict[str, any]:
+        """Arma el resultado final de procesar_archivo_completo"""
         if not extraccion['success']:
             return {
                 'success': False,
@@ -679,4 +1051,4 @@ class AnexoProcessor:
             'sedes_info': extraccion['sedes_info'],
             'total_sedes': extraccion['total_sedes'],
             'total_servicios': extraccion['total_servicios']
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,209 @@
+"""
+Checkpoints por contrato para reanudar procesamientos masivos T25
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .goanywhere import GoAnywhereWebClient
+
+
+class CheckpointManager:
+    """Guarda y valida el resultado de cada contrato procesado"""
+
+    CHECKPOINT_FOLDER = 'data/checkpoints_consolidador_t25'
+
+    # Versión del formato; un cambio invalida los checkpoints anteriores
+    VERSION = 1
+
+    def __init__(self, carpeta: str = None):
+        """
+        Inicializa el gestor de checkpoints
+
+        Args:
+            carpeta: Carpeta de checkpoints (por defecto CHECKPOINT_FOLDER)
+        """
+        self.carpeta = carpeta or self.CHECKPOINT_FOLDER
+        os.makedirs(self.carpeta, exist_ok=True)
+
+    @staticmethod
+    def firma_maestra(info_contrato: Dict[str, any]) -> str:
+        """
+        Calcula la firma de los campos de la maestra que afectan el
+        consolidado del contrato (fechas de contrato, otrosí y actas)
+
+        Args:
+            info_contrato: Información del contrato de la maestra
+
+        Returns:
+            Hash SHA-1 de los campos relevantes
+        """
+        campos = {
+            'fecha_inicial': info_contrato.get('fecha_inicial'),
+            'otrosi': [(o.get('numero'), o.get('fecha')) for o in info_contrato.get('otrosi', [])],
+            'actas': [(a.get('numero'), a.get('fecha')) for a in info_contrato.get('actas', [])]
+        }
+        contenido = json.dumps(campos, sort_keys=True, default=str)
+        return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def resumen_listado(items: List[Dict[str, any]]) -> Dict[str, list]:
+        """
+        Resume un listado de GoAnywhere para el manifiesto del contrato
+
+        Args:
+            items: Items de GoAnywhereWebClient.list_directory
+
+        Returns:
+            Dict nombre -> [tamaño, fecha de modificación] (carpetas sin tamaño ni fecha)
+        """
+        return {
+            item['nombre']: [None, None] if item['es_directorio'] else [item['tamano'], item['fecha_modificacion']]
+            for item in items
+        }
+
+    def _ruta(self, numero_contrato: str) -> str:
+        """Ruta del checkpoint de un contrato"""
+        seguro = re.sub(r'[^A-Za-z0-9_.-]', '_', numero_contrato)
+        sufijo = hashlib.sha1(numero_contrato.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.carpeta, f"{seguro}_{sufijo}.json")
+
+    def guardar(self, info_contrato: Dict[str, any], resultado: Dict[str, any]):
+        """
+        Guarda el checkpoint de un contrato recién procesado
+
+        Args:
+            info_contrato: Información del contrato de la maestra
+            resultado: Resultado de ConsolidadorT25.procesar_contrato
+
+        Raises:
+            OSError: Si no se pudo escribir; el contrato no debe darse por procesado
+        """
+        checkpoint = {
+            'version': self.VERSION,
+            'numero_contrato': resultado['numero_contrato'],
+            'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'firma_maestra': self.firma_maestra(info_contrato),
+            'fuentes': resultado.get('fuentes', []),
+            'manifiesto': resultado.get('manifiesto'),
+            'resultado': {
+                'numero_contrato': resultado['numero_contrato'],
+                'success': resultado['success'],
+                'error': resultado.get('error'),
+                'servicios_consolidados': resultado.get('servicios_consolidados', []),
+                'alertas': resultado.get('alertas', []),
+                'logs': resultado.get('logs', []),
+                'fuentes': resultado.get('fuentes', [])
+            }
+        }
+
+        ruta = self._ruta(resultado['numero_contrato'])
+        temporal = f"{ruta}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f, ensure_ascii=False, default=str)
+            os.replace(temporal, ruta)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def cargar(self, numero_contrato: str) -> Optional[Dict[str, any]]:
+        """
+        Carga el checkpoint de un contrato
+
+        Returns:
+            Checkpoint completo o None si no existe o está dañado
+        """
+        ruta = self._ruta(numero_contrato)
+        if not os.path.exists(ruta):
+            return None
+
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            print(f"Checkpoint ilegible para {numero_contrato}: {e}")
+            return None
+
+        if checkpoint.get('version') != self.VERSION:
+            return None
+
+        return checkpoint
+
+    def obtener_valido(
+        self,
+        info_contrato: Dict[str, any],
+        cliente: GoAnywhereWebClient
+    ) -> Optional[Dict[str, any]]:
+        """
+        Retorna el resultado guardado si el checkpoint sigue vigente:
+        el contrato se procesó con éxito, la maestra no cambió y los archivos
+        fuente conservan tamaño y fecha de modificación en GoAnywhere
+
+        Args:
+            info_contrato: Información actual del contrato en la maestra
+            cliente: Cliente GoAnywhere conectado para verificar las fuentes
+
+        Returns:
+            Resultado del contrato o None si hay que reprocesarlo
+        """
+        checkpoint = self.cargar(info_contrato['numero_contrato'])
+
+        if not checkpoint or not checkpoint['resultado']['success']:
+            return None
+
+        if checkpoint['firma_maestra'] != self.firma_maestra(info_contrato):
+            return None
+
+        for fuente in checkpoint['fuentes']:
+            actual = cliente.stat_file(fuente['ruta'])
+            if not actual['success']:
+                return None
+            if actual['tamano'] != fuente['tamano'] or actual['fecha_modificacion'] != fuente['fecha_modificacion']:
+                return None
+
+        resultado = checkpoint['resultado']
+        resultado['desde_checkpoint'] = True
+        return resultado
+
+    def obtener_sin_cambios(
+        self,
+        info_contrato: Dict[str, any],
+        cliente: GoAnywhereWebClient
+    ) -> Optional[Dict[str, any]]:
+        """
+        Retorna el resultado guardado si las entradas del contrato no
+        cambiaron: misma firma de maestra y mismo listado (nombres, tamaños y
+        fechas) en TARIFAS y ACTAS DE NEGOCIACIÓN. A diferencia de
+        obtener_valido, detecta también archivos nuevos (otrosí o actas)
+
+        Args:
+            info_contrato: Información actual del contrato en la maestra
+            cliente: Cliente GoAnywhere conectado para listar las carpetas
+
+        Returns:
+            Resultado del contrato o None si hay que reprocesarlo
+        """
+        checkpoint = self.cargar(info_contrato['numero_contrato'])
+
+        if not checkpoint or not checkpoint['resultado']['success'] or not checkpoint.get('manifiesto'):
+            return None
+
+        if checkpoint['firma_maestra'] != self.firma_maestra(info_contrato):
+            return None
+
+        for directorio, resumen in checkpoint['manifiesto']['directorios'].items():
+            listado = cliente.list_directory(directorio)
+            if not listado['success']:
+                return None
+            if self.resumen_listado(listado['items']) != resumen:
+                return None
+
+        resultado = checkpoint['resultado']
+        resultado['desde_checkpoint'] = True
+        return resultado
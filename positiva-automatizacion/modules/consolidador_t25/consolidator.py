@@ -4,32 +4,80 @@ VERSION CORREGIDA según instrucciones completas
 """
 
 import os
+import time
 from typing import Dict, List, Optional
 from datetime import datetime
 from .goanywhere import GoAnywhereWebClient
 from .anexo_processor import AnexoProcessor
 from .maestra_manager import MaestraManager
+from .download_cache import DownloadCache
+from .anexo_cache import ParsedAnexoCache
+from .checkpoint_manager import CheckpointManager
+from .indice_carpetas import IndiceCarpetas
+from .etapa_parseo import EtapaParseo
 
 class ConsolidadorT25:
     """Consolidador principal para procesar contratos T25"""
     
-    def __init__(self, goanywhere_client: GoAnywhereWebClient):
+    # Descargar los anexos a memoria (con desborde a un temporal que se borra solo)
+    # en lugar de dejarlos en temp_folder
+    DESCARGA_EN_MEMORIA = True
+    
+    # Descargas anticipadas en curso a la vez por consolidador
+    DESCARGAS_ANTICIPADAS = 2
+    
+    def __init__(
+        self,
+        goanywhere_client: GoAnywhereWebClient,
+        maestra: MaestraManager = None,
+        cache: DownloadCache = None,
+        cache_parseo: ParsedAnexoCache = None,
+        indice_carpetas: IndiceCarpetas = None,
+        en_memoria: bool = None,
+        etapa_parseo: EtapaParseo = None
+    ):
         """
         Inicializa el consolidador
         
         Args:
             goanywhere_client: Cliente GoAnywhere conectado
+            maestra: Gestor de maestra ya cargado (evita releer el XLSB por cada worker)
+            cache: Caché de descargas compartida (None para descargar siempre)
+            cache_parseo: Caché de anexos ya procesados (None para procesar siempre)
+            indice_carpetas: Índice compartido de carpetas raíz (None para uno propio)
+            en_memoria: Si True los anexos se descargan y procesan en memoria; si False
+                se descargan a temp_folder y se borran al procesarlos (por defecto DESCARGA_EN_MEMORIA)
+            etapa_parseo: Pool de procesos compartido donde se parsean los anexos mientras
+                este consolidador sigue descargando (None para parsear en el hilo)
         """
         self.client = goanywhere_client
         self.processor = AnexoProcessor()
-        self.maestra = MaestraManager()
+        self.maestra = maestra if maestra is not None else MaestraManager()
+        self.cache = cache
+        self.cache_parseo = cache_parseo
+        self.indice_carpetas = indice_carpetas if indice_carpetas is not None else IndiceCarpetas()
         self.alertas = []
         self.archivos_procesados = []
+        self.en_memoria = self.DESCARGA_EN_MEMORIA if en_memoria is None else en_memoria
+        self.etapa_parseo = etapa_parseo
         self.temp_folder = 'temp/consolidador_t25'
         os.makedirs(self.temp_folder, exist_ok=True)
         
         # Logs detallados
         self.logs = []
+        self._directorios_listados = {}
+        
+        # Descargas anticipadas en curso: ruta remota -> (ruta local o None si es en memoria, future)
+        # y las que esperan turno: (ruta remota, ruta local o None)
+        self._descargas_anticipadas = {}
+        self._por_anticipar = []
+        
+        # Bytes descargados por este consolidador (sin contar los servidos desde la caché)
+        self.bytes_descargados = 0
+        
+        # Segundos de descarga y de espera de resultados de etapa_parseo (tiempos por etapa)
+        self.segundos_descarga = 0.0
+        self.segundos_espera_parseo = 0.0
     
     def log(self, mensaje: str, tipo: str = 'info'):
         """Agrega log con timestamp"""
@@ -74,6 +122,7 @@ class ConsolidadorT25:
         
         # Reiniciar logs y alertas para este contrato
         self.logs = []
+        self.alertas = []
         
         self.log("="*70)
         self.log(f"PROCESANDO CONTRATO: {numero_contrato}")
@@ -85,9 +134,14 @@ class ConsolidadorT25:
             'anexos_descargados': [],
             'servicios_consolidados': [],
             'alertas': [],
-            'logs': []
+            'logs': [],
+            'fuentes': [],
+            'manifiesto': None
         }
         
+        # Listados de carpetas leídos, para el modo incremental
+        self._directorios_listados = {}
+        
         try:
             # 1. Buscar carpeta del contrato en GoAnywhere
             self.log(f"Buscando carpeta del contrato en GoAnywhere...")
@@ -98,38 +152,36 @@ class ConsolidadorT25:
                 self.agregar_alerta('error', mensaje, numero_contrato)
                 resultado['error'] = mensaje
                 resultado['logs'] = self.logs
-                resultado['alertas'] = [a for a in self.alertas if a['contrato'] == numero_contrato]
+                resultado['alertas'] = self.alertas
                 return resultado
             
             self.log(f"Carpeta encontrada: {carpeta_contrato}")
+            resultado['manifiesto'] = {
+                'carpeta': carpeta_contrato,
+                'directorios': self._directorios_listados
+            }
             
-            # 2. Navegar a carpeta TARIFAS
-            self.log(f"Navegando a carpeta TARIFAS...")
-            try:
-                self.client.change_directory(f"/{carpeta_contrato}/TARIFAS")
-                self.log(f"Acceso a carpeta TARIFAS exitoso")
-            except Exception as e:
-                mensaje = f"No se encontró carpeta TARIFAS en {numero_contrato}: {str(e)}"
-                self.agregar_alerta('error', mensaje, numero_contrato)
-                resultado['error'] = mensaje
-                resultado['logs'] = self.logs
-                resultado['alertas'] = [a for a in self.alertas if a['contrato'] == numero_contrato]
-                return resultado
-            
-            # 3. Listar archivos en carpeta TARIFAS
+            # 2 y 3. Listar archivos en carpeta TARIFAS (por ruta absoluta, sin
+            # cambiar el directorio del cliente, que comparten los workers)
+            directorio_tarifas = f"/{carpeta_contrato}/TARIFAS"
             self.log("Listando archivos en TARIFAS...")
-            listado = self.client.list_directory()
+            listado = self.client.list_directory(directorio_tarifas)
             
             if not listado['success']:
-                mensaje = f"Error al listar archivos en TARIFAS: {listado['error']}"
+                if listado['error'] == 'Directorio no encontrado':
+                    mensaje = f"No se encontró carpeta TARIFAS en {numero_contrato}: {listado['error']}"
+                else:
+                    mensaje = f"Error al listar archivos en TARIFAS: {listado['error']}"
                 self.agregar_alerta('error', mensaje, numero_contrato)
                 resultado['error'] = mensaje
                 resultado['logs'] = self.logs
-                resultado['alertas'] = [a for a in self.alertas if a['contrato'] == numero_contrato]
+                resultado['alertas'] = self.alertas
                 return resultado
             
             archivos = [item['nombre'] for item in listado['items'] if not item['es_directorio']]
             carpetas = [item['nombre'] for item in listado['items'] if item['es_directorio']]
+            atributos = {item['nombre']: item for item in listado['items'] if not item['es_directorio']}
+            self._directorios_listados[directorio_tarifas] = CheckpointManager.resumen_listado(listado['items'])
             
             self.log(f"Archivos encontrados en TARIFAS: {len(archivos)}")
             for archivo in archivos[:10]:
@@ -143,13 +195,18 @@ class ConsolidadorT25:
             anexo_inicial_otrosi = self._procesar_anexo_inicial_otrosi(
                 archivos, 
                 info_contrato,
-                numero_contrato
+                numero_contrato,
+                directorio_tarifas,
+                atributos
             )
             
             fecha_anexo_base = None
             if anexo_inicial_otrosi:
                 resultado['anexos_descargados'].append(anexo_inicial_otrosi)
-                self.log(f"Anexo procesado: {anexo_inicial_otrosi['tipo']} con {anexo_inicial_otrosi['total_servicios']} servicios")
+                if 'parseo' in anexo_inicial_otrosi:
+                    self.log(f"Anexo enviado a la etapa de parseo: {anexo_inicial_otrosi['tipo']}")
+                else:
+                    self.log(f"Anexo procesado: {anexo_inicial_otrosi['tipo']} con {anexo_inicial_otrosi['total_servicios']} servicios")
                 fecha_anexo_base = anexo_inicial_otrosi.get('fecha_modificacion')
             else:
                 # ALERTA: No hay anexo 1 inicial ni de otrosí
@@ -174,6 +231,19 @@ class ConsolidadorT25:
                 resultado['anexos_descargados'].extend(actas)
                 self.log(f"Actas procesadas: {len(actas)}")
             
+            # Con etapa de parseo, recoger los anexos en el orden en que se descargaron
+            if self.etapa_parseo is not None and resultado['anexos_descargados']:
+                self.log("="*50)
+                self.log("ESPERANDO ETAPA DE PARSEO...")
+                self.log("="*50)
+                
+                resultado['anexos_descargados'] = self._esperar_parseos(resultado['anexos_descargados'], numero_contrato)
+                
+                if anexo_inicial_otrosi and not any(anexo['tipo'] != 'acta' for anexo in resultado['anexos_descargados']):
+                    # ALERTA: El anexo 1 inicial o de otrosí no tenía formato válido
+                    mensaje = "No hay anexo 1 inicial de contrato ni otrosí"
+                    self.agregar_alerta('warning', mensaje, numero_contrato)
+            
             # 6. Consolidar todos los servicios
             if resultado['anexos_descargados']:
                 self.log("="*50)
@@ -196,7 +266,8 @@ class ConsolidadorT25:
                 numero_contrato
             )
             
-            resultado['alertas'] = [a for a in self.alertas if a['contrato'] == numero_contrato]
+            resultado['fuentes'] = [anexo['fuente'] for anexo in resultado['anexos_descargados'] if anexo.get('fuente')]
+            resultado['alertas'] = self.alertas
             resultado['logs'] = self.logs
             
             return resultado
@@ -208,7 +279,7 @@ class ConsolidadorT25:
             self.log(traceback.format_exc(), 'error')
             resultado['error'] = error_msg
             resultado['logs'] = self.logs
-            resultado['alertas'] = [a for a in self.alertas if a['contrato'] == numero_contrato]
+            resultado['alertas'] = self.alertas
             return resultado
     
     def _buscar_carpeta_contrato(self, numero_contrato: str) -> Optional[str]:
@@ -222,47 +293,32 @@ class ConsolidadorT25:
             Ruta de la carpeta o None
         """
         try:
-            # Ir a raíz
-            self.client.change_directory('/')
-            self.log("Navegando a raíz de GoAnywhere")
-            
             # Obtener año del contrato (últimos 4 dígitos)
             partes = numero_contrato.split('-')
             anio = partes[-1] if len(partes) >= 2 else None
             if anio:
                 self.log(f"Año del contrato detectado: {anio}")
             
-            listado = self.client.list_directory()
+            # Buscar carpeta que contenga el número de contrato en el índice de la raíz
+            busqueda = self.indice_carpetas.buscar(numero_contrato, self.client, anio)
             
-            if not listado['success']:
-                self.log(f"Error listando directorio raíz: {listado['error']}", 'error')
+            if not busqueda['success']:
+                self.log(f"Error listando directorio raíz: {busqueda['error']}", 'error')
                 return None
             
-            # Buscar carpeta que contenga el número de contrato
-            contrato_upper = numero_contrato.upper()
-            carpetas_candidatas = []
-            
-            for item in listado['items']:
-                if item['es_directorio']:
-                    nombre_upper = item['nombre'].upper()
-                    
-                    # Buscar coincidencia exacta o parcial
-                    if contrato_upper in nombre_upper:
-                        carpetas_candidatas.append(item['nombre'])
-                        self.log(f"Carpeta candidata encontrada: {item['nombre']}")
+            carpetas_candidatas = busqueda['candidatas']
+            for carpeta in carpetas_candidatas:
+                self.log(f"Carpeta candidata encontrada: {carpeta}")
             
             if not carpetas_candidatas:
                 self.log(f"No se encontraron carpetas para el contrato {numero_contrato}", 'warning')
                 return None
             
-            # Si hay múltiples candidatas, elegir la más específica
+            # Si hay múltiples candidatas, el índice pone primero las del año correcto
             if len(carpetas_candidatas) > 1:
                 self.log(f"Múltiples carpetas candidatas: {carpetas_candidatas}")
-                # Priorizar la que tenga el año correcto
-                for carpeta in carpetas_candidatas:
-                    if anio and anio in carpeta:
-                        self.log(f"Carpeta seleccionada por año: {carpeta}")
-                        return carpeta
+                if anio and anio in carpetas_candidatas[0]:
+                    self.log(f"Carpeta seleccionada por año: {carpetas_candidatas[0]}")
             
             return carpetas_candidatas[0]
             
@@ -274,7 +330,9 @@ class ConsolidadorT25:
         self, 
         archivos: List[str], 
         info_contrato: Dict[str, any],
-        numero_contrato: str
+        numero_contrato: str,
+        directorio: str = None,
+        atributos: Dict[str, Dict[str, any]] = None
     ) -> Optional[Dict[str, any]]:
         """
         Procesa ANEXO 1 inicial o de otrosí según las reglas:
@@ -282,6 +340,13 @@ class ConsolidadorT25:
         REGLA 1: Descargar ANEXO 1 solo si NO existe ningún archivo de otrosí
         REGLA 2: Si existen otrosí, descargar el ANEXO 1 del otrosí de mayor número
         
+        Args:
+            archivos: Nombres de archivos en la carpeta TARIFAS
+            info_contrato: Información del contrato de la maestra
+            numero_contrato: Número del contrato
+            directorio: Ruta remota de la carpeta TARIFAS
+            atributos: Atributos del listado (tamaño, fecha) por nombre de archivo
+        
         Returns:
             Información del anexo procesado o None
         """
@@ -327,7 +392,8 @@ class ConsolidadorT25:
                         'otrosi',
                         otrosi_mayor['numero_otrosi'],
                         info_contrato,
-                        numero_contrato
+                        numero_contrato,
+                        self._fuente_remota(directorio, anexo_otrosi['nombre'], atributos)
                     )
                 else:
                     self.log(f"No se encontró ANEXO 1 para otrosí #{otrosi_mayor['numero_otrosi']}", 'warning')
@@ -343,7 +409,8 @@ class ConsolidadorT25:
                         'inicial',
                         None,
                         info_contrato,
-                        numero_contrato
+                        numero_contrato,
+                        self._fuente_remota(directorio, anexo['nombre'], atributos)
                     )
             
             self.log("No se pudo procesar ningún ANEXO 1 inicial ni de otrosí", 'warning')
@@ -389,17 +456,10 @@ class ConsolidadorT25:
                 self.log("No existe carpeta ACTAS DE NEGOCIACIÓN", 'info')
                 return actas_procesadas
             
-            # Navegar a ACTAS DE NEGOCIACIÓN
-            self.log(f"Navegando a carpeta: {carpeta_actas}")
-            try:
-                self.client.change_directory(f"/{carpeta_contrato}/TARIFAS/{carpeta_actas}")
-                self.log("Acceso a carpeta ACTAS DE NEGOCIACIÓN exitoso")
-            except Exception as e:
-                self.log(f"Error accediendo a ACTAS DE NEGOCIACIÓN: {str(e)}", 'error')
-                return actas_procesadas
-            
-            # Listar archivos
-            listado = self.client.list_directory()
+            # Listar ACTAS DE NEGOCIACIÓN por ruta absoluta
+            directorio_actas = f"/{carpeta_contrato}/TARIFAS/{carpeta_actas}"
+            self.log(f"Listando carpeta: {carpeta_actas}")
+            listado = self.client.list_directory(directorio_actas)
             
             if not listado['success']:
                 self.log(f"Error listando ACTAS DE NEGOCIACIÓN: {listado['error']}", 'error')
@@ -407,6 +467,8 @@ class ConsolidadorT25:
             
             archivos = [item for item in listado['items'] if not item['es_directorio']]
             nombres_archivos = [item['nombre'] for item in archivos]
+            atributos = {item['nombre']: item for item in archivos}
+            self._directorios_listados[directorio_actas] = CheckpointManager.resumen_listado(listado['items'])
             
             self.log(f"Archivos en ACTAS DE NEGOCIACIÓN: {len(archivos)}")
             for archivo in archivos[:10]:
@@ -423,6 +485,9 @@ class ConsolidadorT25:
                 self.agregar_alerta('warning', mensaje, numero_contrato)
                 return actas_procesadas
             
+            # Adelantar las descargas: mientras se procesa un acta ya se transfieren las siguientes
+            self._anticipar_descargas(anexos_actas, 'acta', numero_contrato, directorio_actas, atributos)
+            
             # Procesar cada acta
             for anexo in anexos_actas:
                 numero_acta = self.processor.extraer_numero_acta(anexo['nombre'])
@@ -442,11 +507,12 @@ class ConsolidadorT25:
                         'acta',
                         numero_acta,
                         info_contrato,
-                        numero_contrato
+                        numero_contrato,
+                        self._fuente_remota(directorio_actas, anexo['nombre'], atributos)
                     )
                     if anexo_info:
                         actas_procesadas.append(anexo_info)
-                        self.log(f"Acta #{numero_acta} procesada correctamente")
+                        self.log(f"Acta #{numero_acta} {'enviada a la etapa de parseo' if 'parseo' in anexo_info else 'procesada correctamente'}")
                 else:
                     # REGLA: Descargar solo si fecha es posterior al anexo base
                     # (En producción se compararían las fechas reales)
@@ -456,11 +522,12 @@ class ConsolidadorT25:
                         'acta',
                         numero_acta,
                         info_contrato,
-                        numero_contrato
+                        numero_contrato,
+                        self._fuente_remota(directorio_actas, anexo['nombre'], atributos)
                     )
                     if anexo_info:
                         actas_procesadas.append(anexo_info)
-                        self.log(f"Acta #{numero_acta} procesada correctamente")
+                        self.log(f"Acta #{numero_acta} {'enviada a la etapa de parseo' if 'parseo' in anexo_info else 'procesada correctamente'}")
             
             return actas_procesadas
             
@@ -469,6 +536,109 @@ class ConsolidadorT25:
             import traceback
             self.log(traceback.format_exc(), 'error')
             return actas_procesadas
+        
+        finally:
+            self._descartar_anticipadas()
+    
+    def _ruta_temporal(self, nombre_archivo: str, tipo: str, numero: Optional[int], numero_contrato: str) -> str:
+        """Ruta local donde se descarga un anexo"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        extension = os.path.splitext(nombre_archivo)[1]
+        nombre_local = f"{numero_contrato}_{tipo}_{numero if numero else 'base'}_{timestamp}{extension}"
+        return os.path.join(self.temp_folder, nombre_local)
+    
+    def _anticipar_descargas(
+        self,
+        anexos: List[Dict[str, any]],
+        tipo: str,
+        numero_contrato: str,
+        directorio: Optional[str],
+        atributos: Optional[Dict[str, Dict[str, any]]]
+    ):
+        """
+        Programa la descarga en segundo plano de los anexos candidatos que no
+        están en la caché (hasta DESCARGAS_ANTICIPADAS a la vez);
+        _descargar_y_procesar_anexo toma el resultado cuando llega su turno
+        
+        Args:
+            anexos: Anexos filtrados por filtrar_archivos_anexo1 (en orden de proceso)
+            tipo: 'inicial', 'otrosi' o 'acta'
+            numero_contrato: Número del contrato
+            directorio: Ruta remota de la carpeta
+            atributos: Atributos del listado por nombre de archivo
+        """
+        for anexo in anexos:
+            fuente = self._fuente_remota(directorio, anexo['nombre'], atributos)
+            if fuente is None or fuente['ruta'] in self._descargas_anticipadas:
+                continue
+            if any(ruta == fuente['ruta'] for ruta, _ in self._por_anticipar):
+                continue
+            
+            if (self.cache is not None and fuente['tamano'] is not None
+                    and self.cache.contiene(fuente['ruta'], fuente['tamano'], fuente['fecha_modificacion'])):
+                continue
+            
+            ruta_local = None
+            if not self.en_memoria:
+                numero = self.processor.extraer_numero_acta(anexo['nombre']) if tipo == 'acta' else anexo.get('numero_otrosi')
+                ruta_local = self._ruta_temporal(anexo['nombre'], tipo, numero, numero_contrato)
+            
+            self._por_anticipar.append((fuente['ruta'], ruta_local))
+        
+        self._completar_anticipadas()
+    
+    def _completar_anticipadas(self):
+        """Inicia las descargas programadas hasta tener DESCARGAS_ANTICIPADAS en curso"""
+        while self._por_anticipar and len(self._descargas_anticipadas) < self.DESCARGAS_ANTICIPADAS:
+            ruta_remota, ruta_local = self._por_anticipar.pop(0)
+            self._descargas_anticipadas[ruta_remota] = (
+                ruta_local,
+                self.client.descargar_anticipado(ruta_remota, ruta_local)
+            )
+    
+    def _descartar_anticipadas(self):
+        """Cancela las descargas anticipadas que no se usaron y libera lo que alcanzaron a bajar"""
+        self._por_anticipar = []
+        for ruta_local, futuro in self._descargas_anticipadas.values():
+            if futuro.cancel():
+                continue
+            try:
+                descarga = futuro.result()
+                if descarga.get('archivo') is not None:
+                    descarga['archivo'].close()
+                if ruta_local and os.path.exists(ruta_local):
+                    os.remove(ruta_local)
+            except Exception:
+                pass
+        self._descargas_anticipadas = {}
+    
+    def _fuente_remota(
+        self,
+        directorio: Optional[str],
+        nombre_archivo: str,
+        atributos: Optional[Dict[str, Dict[str, any]]]
+    ) -> Optional[Dict[str, any]]:
+        """
+        Arma la referencia al archivo remoto (ruta, tamaño y fecha de modificación)
+        
+        Args:
+            directorio: Ruta remota de la carpeta
+            nombre_archivo: Nombre del archivo
+            atributos: Atributos del listado por nombre de archivo
+            
+        Returns:
+            Dict con ruta, tamano y fecha_modificacion o None si no hay directorio
+        """
+        if not directorio:
+            return None
+        
+        item = (atributos or {}).get(nombre_archivo, {})
+        
+        return {
+            'ruta': f"{directorio}/{nombre_archivo}",
+            'tamano': item.get('tamano'),
+            'fecha_modificacion': item.get('fecha_modificacion')
+        }
     
     def _descargar_y_procesar_anexo(
         self,
@@ -476,7 +646,8 @@ class ConsolidadorT25:
         tipo: str,
         numero: Optional[int],
         info_contrato: Dict[str, any],
-        numero_contrato: str
+        numero_contrato: str,
+        fuente: Optional[Dict[str, any]] = None
     ) -> Optional[Dict[str, any]]:
         """
         Descarga y procesa un archivo ANEXO 1
@@ -487,62 +658,190 @@ class ConsolidadorT25:
             numero: Número de otrosí o acta
             info_contrato: Info del contrato de la maestra
             numero_contrato: Número del contrato
+            fuente: Ruta remota, tamaño y fecha de modificación del archivo
             
         Returns:
             Información del anexo procesado
         """
+        # Buffer de la descarga en memoria y archivo de temp_folder a borrar al terminar
+        archivo = None
+        temporal = None
+        
         try:
-            # Generar nombre local
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            extension = os.path.splitext(nombre_archivo)[1]
-            nombre_local = f"{numero_contrato}_{tipo}_{numero if numero else 'base'}_{timestamp}{extension}"
-            ruta_local = os.path.join(self.temp_folder, nombre_local)
-            
-            self.log(f"Descargando archivo: {nombre_archivo}")
-            self.log(f"Ruta local: {ruta_local}")
-            
-            # Descargar
-            descarga = self.client.download_file(nombre_archivo, ruta_local)
-            
-            if not descarga['success']:
-                mensaje = f"Error al descargar {nombre_archivo}: {descarga['error']}"
-                self.agregar_alerta('error', mensaje, numero_contrato)
-                self.log(mensaje, 'error')
-                return None
-            
-            self.log(f"Archivo descargado exitosamente")
-            
-            # Procesar archivo y validar formato POSITIVA
-            self.log(f"Procesando y validando formato POSITIVA...")
-            procesamiento = self.processor.procesar_archivo_completo(ruta_local)
-            
-            if not procesamiento['success']:
-                # ALERTA: Formato no es POSITIVA
-                self.agregar_alerta('warning', procesamiento['error'], numero_contrato)
-                self.log(procesamiento['error'], 'warning')
-                return None
-            
-            self.log(f"Archivo procesado: {procesamiento['total_sedes']} sedes, {procesamiento['total_servicios']} servicios")
+            # Usar la copia en caché si el archivo remoto no cambió
+            usar_cache = self.cache is not None and fuente is not None and fuente.get('tamano') is not None
+            ruta_local = None
+            
+            if usar_cache:
+                ruta_local = self.cache.obtener(fuente['ruta'], fuente['tamano'], fuente['fecha_modificacion'])
+                if ruta_local:
+                    self.log(f"Archivo sin cambios, se usa copia en caché: {nombre_archivo}")
+            
+            if not ruta_local:
+                # Ruta absoluta: el cliente puede estar compartido con otros workers
+                ruta_remota = fuente['ruta'] if fuente else nombre_archivo
+                anticipada = self._descargas_anticipadas.pop(ruta_remota, None)
+                self._por_anticipar = [programada for programada in self._por_anticipar if programada[0] != ruta_remota]
+                
+                # Lo que queda por adelantar avanza a medida que se consumen las anticipadas
+                self._completar_anticipadas()
+                
+                if anticipada is not None:
+                    # La descarga se inició mientras se procesaba el anexo anterior
+                    ruta_local, futuro = anticipada
+                    self.log(f"Esperando descarga anticipada: {nombre_archivo}")
+                    descarga = futuro.result()
+                elif self.en_memoria:
+                    self.log(f"Descargando archivo a memoria: {nombre_archivo}")
+                    descarga = self.client.descargar_en_memoria(ruta_remota)
+                else:
+                    ruta_local = self._ruta_temporal(nombre_archivo, tipo, numero, numero_contrato)
+                    
+                    self.log(f"Descargando archivo: {nombre_archivo}")
+                    self.log(f"Ruta local: {ruta_local}")
+                    
+                    # Descargar
+                    descarga = self.client.download_file(ruta_remota, ruta_local)
+                
+                archivo = descarga.get('archivo')
+                if archivo is None:
+                    # Lo descargado a temp_folder se borra al terminar, salvo que pase a la caché
+                    temporal = ruta_local
+                
+                if not descarga['success']:
+                    mensaje = f"Error al descargar {nombre_archivo}: {descarga['error']}"
+                    self.agregar_alerta('error', mensaje, numero_contrato)
+                    self.log(mensaje, 'error')
+                    return None
+                
+                self.bytes_descargados += descarga['bytes']
+                self.segundos_descarga += descarga['segundos']
+                self.log(
+                    f"Archivo descargado exitosamente: {descarga['bytes']:,} bytes en "
+                    f"{descarga['segundos']:.2f} s ({descarga['bytes_por_segundo'] / 1024:,.0f} KB/s)"
+                )
+                
+                if usar_cache and archivo is not None:
+                    # Se guarda la copia en caché, pero se procesa desde memoria
+                    ruta_local = self.cache.registrar_contenido(fuente['ruta'], fuente['tamano'], fuente['fecha_modificacion'], archivo)
+                elif usar_cache:
+                    ruta_local = self.cache.registrar(fuente['ruta'], fuente['tamano'], fuente['fecha_modificacion'], ruta_local)
+                    temporal = None
             
             # Obtener fecha según tipo
             fecha_acuerdo = self._obtener_fecha_acuerdo(tipo, numero, info_contrato)
             self.log(f"Fecha acuerdo asignada: {fecha_acuerdo}")
             
-            return {
+            anexo = {
                 'nombre_archivo': nombre_archivo,
-                'ruta_local': ruta_local,
+                'ruta_local': ruta_local if temporal is None else None,
                 'tipo': tipo,
                 'numero': numero,
                 'fecha_acuerdo': fecha_acuerdo,
-                'sedes_info': procesamiento['sedes_info'],
-                'total_servicios': procesamiento['total_servicios']
+                'fuente': fuente
             }
+            origen = archivo if archivo is not None else ruta_local
+            
+            if self.etapa_parseo is not None:
+                # El parseo sigue en otro proceso mientras este hilo descarga el
+                # siguiente anexo; _esperar_parseos recoge el resultado
+                self.log(f"Enviando a la etapa de parseo: {nombre_archivo}")
+                anexo['parseo'] = self.etapa_parseo.enviar(origen, nombre_archivo)
+                return anexo
+            
+            # Procesar archivo y validar formato POSITIVA
+            self.log(f"Procesando y validando formato POSITIVA...")
+            if self.cache_parseo is not None:
+                procesamiento = self.cache_parseo.procesar(origen, self.processor, nombre_archivo)
+            else:
+                procesamiento = self.processor.procesar_archivo_completo(origen, nombre_archivo)
+            
+            return self._completar_anexo(anexo, procesamiento, numero_contrato)
             
         except Exception as e:
             self.log(f"Error en _descargar_y_procesar_anexo: {str(e)}", 'error')
             import traceback
             self.log(traceback.format_exc(), 'error')
             return None
+        
+        finally:
+            if archivo is not None:
+                archivo.close()
+            if temporal and os.path.exists(temporal):
+                os.remove(temporal)
+    
+    def _completar_anexo(
+        self,
+        anexo: Dict[str, any],
+        procesamiento: Dict[str, any],
+        numero_contrato: str
+    ) -> Optional[Dict[str, any]]:
+        """
+        Valida el resultado del parseo y arma la información del anexo
+        
+        Args:
+            anexo: Datos del anexo descargado (nombre, tipo, número, fecha de acuerdo, fuente)
+            procesamiento: Resultado de procesar_archivo_completo
+            numero_contrato: Número del contrato
+            
+        Returns:
+            Información del anexo procesado o None si no tiene formato POSITIVA
+        """
+        if not procesamiento['success']:
+            # ALERTA: Formato no es POSITIVA
+            self.agregar_alerta('warning', procesamiento['error'], numero_contrato)
+            self.log(procesamiento['error'], 'warning')
+            return None
+        
+        if procesamiento.get('desde_cache'):
+            self.log(f"Contenido sin cambios, se usa el resultado en caché de parseo")
+        self.log(f"Archivo procesado: {procesamiento['total_sedes']} sedes, {procesamiento['total_servicios']} servicios")
+        
+        return {
+            'nombre_archivo': anexo['nombre_archivo'],
+            'ruta_local': anexo['ruta_local'],
+            'tipo': anexo['tipo'],
+            'numero': anexo['numero'],
+            'fecha_acuerdo': anexo['fecha_acuerdo'],
+            'sedes_info': procesamiento['sedes_info'],
+            'total_servicios': procesamiento['total_servicios'],
+            'fuente': anexo['fuente']
+        }
+    
+    def _esperar_parseos(self, anexos: List[Dict[str, any]], numero_contrato: str) -> List[Dict[str, any]]:
+        """
+        Recoge, en el orden en que se descargaron, los anexos enviados a
+        etapa_parseo (aunque los procesos terminen en otro orden)
+        
+        Args:
+            anexos: Anexos del contrato, procesados o con su parseo pendiente
+            numero_contrato: Número del contrato
+            
+        Returns:
+            Anexos procesados, sin los que no tienen formato POSITIVA o fallaron
+        """
+        procesados = []
+        
+        for anexo in anexos:
+            if 'parseo' not in anexo:
+                procesados.append(anexo)
+                continue
+            
+            self.log(f"Esperando parseo: {anexo['nombre_archivo']}")
+            inicio = time.time()
+            try:
+                procesamiento = self.etapa_parseo.resultado(anexo['parseo'])
+            except Exception as e:
+                self.log(f"Error en la etapa de parseo ({anexo['nombre_archivo']}): {str(e)}", 'error')
+                continue
+            finally:
+                self.segundos_espera_parseo += time.time() - inicio
+            
+            anexo_procesado = self._completar_anexo(anexo, procesamiento, numero_contrato)
+            if anexo_procesado:
+                procesados.append(anexo_procesado)
+        
+        return procesados
     
     def _obtener_fecha_acuerdo(
         self,
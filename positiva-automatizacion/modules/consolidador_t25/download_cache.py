@@ -0,0 +1,254 @@
+"""
+Caché persistente de archivos ANEXO 1 descargados de GoAnywhere
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import BinaryIO, Dict, Optional, Tuple
+
+
+class DownloadCache:
+    """Caché en disco con desalojo LRU, indexada por ruta remota, tamaño y fecha"""
+
+    CACHE_FOLDER = 'temp/consolidador_t25/cache'
+    INDEX_FILENAME = 'indice.json'
+
+    # Tamaño máximo de la caché en bytes (2 GB)
+    MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+    # Segundos máximos que un acierto (solo cambia la fecha de último
+    # acceso) espera en memoria antes de reescribir el índice
+    GUARDADO_SEGUNDOS = 30
+
+    def __init__(self, carpeta: str = None, max_bytes: int = None):
+        """
+        Inicializa la caché
+
+        Args:
+            carpeta: Carpeta de la caché (por defecto CACHE_FOLDER)
+            max_bytes: Tamaño máximo antes de desalojar (por defecto MAX_BYTES)
+        """
+        self.carpeta = carpeta or self.CACHE_FOLDER
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        os.makedirs(self.carpeta, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._ruta_indice = os.path.join(self.carpeta, self.INDEX_FILENAME)
+        self._indice = self._cargar_indice()
+
+        # Cambios del índice aún no escritos a disco y momento del último guardado
+        self._indice_pendiente = False
+        self._ultimo_guardado = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_ahorrados = 0
+
+    @staticmethod
+    def generar_clave(ruta_remota: str, tamano: int, fecha_modificacion: str) -> str:
+        """Clave de la entrada: hash de ruta remota + tamaño + fecha de modificación"""
+        contenido = f"{ruta_remota}|{tamano}|{fecha_modificacion}"
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    def _cargar_indice(self) -> Dict[str, Dict[str, any]]:
+        """Carga el índice y descarta entradas cuyo archivo ya no existe"""
+        if not os.path.exists(self._ruta_indice):
+            return {}
+
+        try:
+            with open(self._ruta_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except Exception as e:
+            print(f"Índice de caché ilegible, se reinicia: {e}")
+            return {}
+
+        return {
+            clave: entrada for clave, entrada in indice.items()
+            if os.path.exists(os.path.join(self.carpeta, entrada['archivo']))
+        }
+
+    def _guardar_indice(self):
+        """Guarda el índice de forma atómica (llamar con el lock tomado)"""
+        temporal = f"{self._ruta_indice}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._indice, f, ensure_ascii=False)
+            os.replace(temporal, self._ruta_indice)
+            self._indice_pendiente = False
+        except Exception as e:
+            print(f"Error guardando índice de caché: {e}")
+        self._ultimo_guardado = time.monotonic()
+
+    def _marcar_pendiente(self):
+        """
+        Registra un cambio del índice y lo guarda solo si el último guardado
+        tiene más de GUARDADO_SEGUNDOS (llamar con el lock tomado)
+        """
+        self._indice_pendiente = True
+        if time.monotonic() - self._ultimo_guardado >= self.GUARDADO_SEGUNDOS:
+            self._guardar_indice()
+
+    def guardar(self):
+        """Escribe el índice si tiene cambios pendientes (al terminar una corrida)"""
+        with self._lock:
+            if self._indice_pendiente:
+                self._guardar_indice()
+
+    def obtener(self, ruta_remota: str, tamano: int, fecha_modificacion: str) -> Optional[str]:
+        """
+        Busca un archivo en la caché
+
+        Args:
+            ruta_remota: Ruta del archivo en GoAnywhere
+            tamano: Tamaño reportado por el listado
+            fecha_modificacion: Fecha de modificación reportada por el listado
+
+        Returns:
+            Ruta local del archivo en caché o None si no está
+        """
+        clave = self.generar_clave(ruta_remota, tamano, fecha_modificacion)
+
+        with self._lock:
+            entrada = self._indice.get(clave)
+            ruta_local = os.path.join(self.carpeta, entrada['archivo']) if entrada else None
+
+            if not entrada or not os.path.exists(ruta_local):
+                if entrada:
+                    del self._indice[clave]
+                    self._marcar_pendiente()
+                self.misses += 1
+                return None
+
+            # Solo cambia la fecha de acceso (orden del desalojo): se escribe más tarde
+            entrada['ultimo_acceso'] = time.time()
+            self.hits += 1
+            self.bytes_ahorrados += entrada['bytes']
+            self._marcar_pendiente()
+
+            return ruta_local
+
+    def contiene(self, ruta_remota: str, tamano: int, fecha_modificacion: str) -> bool:
+        """
+        Indica si un archivo está en la caché, sin contarlo como consulta
+        (para decidir si vale la pena descargarlo por anticipado)
+        """
+        clave = self.generar_clave(ruta_remota, tamano, fecha_modificacion)
+
+        with self._lock:
+            entrada = self._indice.get(clave)
+            return entrada is not None and os.path.exists(os.path.join(self.carpeta, entrada['archivo']))
+
+    def registrar(self, ruta_remota: str, tamano: int, fecha_modificacion: str, ruta_descargada: str) -> str:
+        """
+        Mueve un archivo recién descargado a la caché
+
+        Args:
+            ruta_remota: Ruta del archivo en GoAnywhere
+            tamano: Tamaño reportado por el listado
+            fecha_modificacion: Fecha de modificación reportada por el listado
+            ruta_descargada: Ruta local del archivo descargado
+
+        Returns:
+            Ruta del archivo dentro de la caché
+        """
+        clave, ruta_cache = self._ubicacion(ruta_remota, tamano, fecha_modificacion)
+
+        with self._lock:
+            shutil.move(ruta_descargada, ruta_cache)
+            self._agregar_entrada(clave, ruta_remota, tamano, fecha_modificacion, ruta_cache)
+
+        return ruta_cache
+
+    def registrar_contenido(self, ruta_remota: str, tamano: int, fecha_modificacion: str, archivo: BinaryIO) -> str:
+        """
+        Copia a la caché un archivo descargado en memoria (el archivo queda al inicio)
+
+        Args:
+            ruta_remota: Ruta del archivo en GoAnywhere
+            tamano: Tamaño reportado por el listado
+            fecha_modificacion: Fecha de modificación reportada por el listado
+            archivo: Archivo binario abierto con el contenido descargado
+
+        Returns:
+            Ruta del archivo dentro de la caché
+        """
+        clave, ruta_cache = self._ubicacion(ruta_remota, tamano, fecha_modificacion)
+        temporal = f"{ruta_cache}.{threading.get_ident()}.tmp"
+
+        archivo.seek(0)
+        with open(temporal, 'wb') as destino:
+            shutil.copyfileobj(archivo, destino, 1024 * 1024)
+        archivo.seek(0)
+
+        with self._lock:
+            os.replace(temporal, ruta_cache)
+            self._agregar_entrada(clave, ruta_remota, tamano, fecha_modificacion, ruta_cache)
+
+        return ruta_cache
+
+    def _ubicacion(self, ruta_remota: str, tamano: int, fecha_modificacion: str) -> Tuple[str, str]:
+        """Clave y ruta dentro de la caché de un archivo remoto"""
+        clave = self.generar_clave(ruta_remota, tamano, fecha_modificacion)
+        extension = os.path.splitext(ruta_remota)[1].lower()
+        return clave, os.path.join(self.carpeta, f"{clave}{extension}")
+
+    def _agregar_entrada(self, clave: str, ruta_remota: str, tamano: int, fecha_modificacion: str, ruta_cache: str):
+        """Registra un archivo ya copiado a la caché y desaloja si hace falta (llamar con el lock tomado)"""
+        self._indice[clave] = {
+            'ruta_remota': ruta_remota,
+            'tamano': tamano,
+            'fecha_modificacion': fecha_modificacion,
+            'archivo': os.path.basename(ruta_cache),
+            'bytes': os.path.getsize(ruta_cache),
+            'ultimo_acceso': time.time()
+        }
+
+        self._desalojar(clave)
+        self._guardar_indice()
+
+    def _desalojar(self, clave_protegida: str):
+        """
+        Elimina las entradas usadas hace más tiempo hasta quedar bajo el
+        límite (llamar con el lock tomado)
+
+        Args:
+            clave_protegida: Entrada recién registrada, que no se desaloja
+        """
+        total = sum(entrada['bytes'] for entrada in self._indice.values())
+        if total <= self.max_bytes:
+            return
+
+        for clave in sorted(self._indice, key=lambda c: self._indice[c]['ultimo_acceso']):
+            if total <= self.max_bytes:
+                break
+            if clave == clave_protegida:
+                continue
+
+            entrada = self._indice.pop(clave)
+            total -= entrada['bytes']
+            try:
+                os.remove(os.path.join(self.carpeta, entrada['archivo']))
+            except OSError:
+                pass
+
+    def estadisticas(self) -> Dict[str, any]:
+        """
+        Estadísticas de uso de la caché desde que se creó la instancia
+
+        Returns:
+            Dict con hits, misses, tasa de aciertos, bytes ahorrados y ocupación
+        """
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'tasa_aciertos': round(self.hits * 100 / consultas, 1) if consultas else 0.0,
+                'bytes_ahorrados': self.bytes_ahorrados,
+                'entradas': len(self._indice),
+                'bytes_en_cache': sum(entrada['bytes'] for entrada in self._indice.values())
+            }
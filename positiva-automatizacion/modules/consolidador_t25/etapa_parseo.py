@@ -0,0 +1,218 @@
+"""
+Etapa de parseo de anexos en procesos, separada de la descarga SFTP
+"""
+
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO, Dict, Tuple, Union
+
+from .anexo_processor import AnexoProcessor
+from .anexo_cache import ParsedAnexoCache
+
+
+# Procesador de cada proceso del pool (se crea una vez por proceso)
+_processor = None
+
+
+def _iniciar_proceso():
+    """Crea el AnexoProcessor del proceso"""
+    global _processor
+    _processor = AnexoProcessor()
+
+
+def _parsear(contenido: bytes, nombre_archivo: str, enviado: float) -> Tuple[Dict[str, any], float, float]:
+    """
+    Procesa un anexo dentro de un proceso del pool
+
+    Args:
+        contenido: Bytes del archivo descargado
+        nombre_archivo: Nombre del archivo (define el formato)
+        enviado: time.time() al entregarlo a la etapa
+
+    Returns:
+        Tupla (resultado de procesar_archivo_completo, segundos en cola, segundos de parseo)
+    """
+    inicio = time.time()
+    resultado = _processor.procesar_archivo_completo(io.BytesIO(contenido), nombre_archivo)
+    return resultado, max(0.0, inicio - enviado), time.time() - inicio
+
+
+class EtapaParseo:
+    """
+    Parsea anexos con AnexoProcessor en un pool de procesos mientras los
+    hilos de descarga siguen trayendo archivos del SFTP
+
+    En hilos el parseo queda atado al GIL; aquí cada anexo se procesa en
+    uno de PROCESOS procesos. A lo sumo max_en_cola anexos esperan o están
+    en parseo: con la cola llena, enviar bloquea al hilo de descarga
+    (contrapresión), así la memoria no crece cuando el parseo es el cuello
+    de botella
+    """
+
+    # Procesos de parseo (uno por núcleo)
+    PROCESOS = os.cpu_count() or 2
+
+    # Anexos en cola o en parseo por proceso antes de frenar las descargas
+    EN_COLA_POR_PROCESO = 2
+
+    def __init__(self, procesos: int = None, max_en_cola: int = None, cache_parseo: ParsedAnexoCache = None):
+        """
+        Inicia el pool de procesos
+
+        Args:
+            procesos: Procesos de parseo (por defecto PROCESOS)
+            max_en_cola: Anexos pendientes antes de bloquear a quien envía
+                (por defecto EN_COLA_POR_PROCESO por proceso)
+            cache_parseo: Caché de anexos procesados (se consulta antes de enviar al pool)
+        """
+        self.procesos = max(1, procesos or self.PROCESOS)
+        self.max_en_cola = max_en_cola or self.procesos * self.EN_COLA_POR_PROCESO
+        self.cache_parseo = cache_parseo
+
+        # spawn: los procesos no heredan los hilos ni los sockets SFTP del servidor
+        self._ejecutor = ProcessPoolExecutor(
+            max_workers=self.procesos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_iniciar_proceso
+        )
+        self._cupos = threading.BoundedSemaphore(self.max_en_cola)
+        self._lock = threading.Lock()
+        self._inicio = time.monotonic()
+
+        self.enviados = 0
+        self.parseados = 0
+        self.desde_cache = 0
+        self.fallidos = 0
+        self.en_cola = 0
+        self.pico_en_cola = 0
+        self.segundos_contrapresion = 0.0
+        self.segundos_en_cola = 0.0
+        self.segundos_parseo = 0.0
+        self.segundos_espera_resultado = 0.0
+
+    @staticmethod
+    def _leer(origen: Union[str, BinaryIO]) -> bytes:
+        """Contenido de una ruta o de un archivo abierto (que queda al inicio)"""
+        if isinstance(origen, (str, os.PathLike)):
+            with open(origen, 'rb') as f:
+                return f.read()
+
+        origen.seek(0)
+        contenido = origen.read()
+        origen.seek(0)
+        return contenido
+
+    def enviar(self, origen: Union[str, BinaryIO], nombre_archivo: str = None) -> Dict[str, any]:
+        """
+        Entrega un anexo descargado para procesarlo en el pool. El contenido
+        se copia antes de retornar, así que el archivo puede cerrarse o
+        borrarse enseguida. Bloquea mientras la cola esté llena
+
+        Args:
+            origen: Ruta local del archivo o archivo binario abierto
+            nombre_archivo: Nombre del archivo (obligatorio si es un archivo abierto sin nombre)
+
+        Returns:
+            Parseo pendiente, para pasarlo a resultado
+        """
+        nombre_archivo = AnexoProcessor._nombre_origen(origen, nombre_archivo)
+
+        hash_contenido = None
+        if self.cache_parseo is not None:
+            hash_contenido, resultado = self.cache_parseo.buscar(origen, nombre_archivo)
+            if resultado is not None:
+                with self._lock:
+                    self.desde_cache += 1
+                futuro = Future()
+                futuro.set_result((resultado, 0.0, 0.0))
+                return {'futuro': futuro, 'hash': None, 'nombre_archivo': nombre_archivo}
+
+        contenido = self._leer(origen)
+
+        inicio = time.monotonic()
+        self._cupos.acquire()
+
+        with self._lock:
+            self.segundos_contrapresion += time.monotonic() - inicio
+            self.enviados += 1
+            self.en_cola += 1
+            self.pico_en_cola = max(self.pico_en_cola, self.en_cola)
+
+        try:
+            futuro = self._ejecutor.submit(_parsear, contenido, nombre_archivo, time.time())
+        except Exception:
+            self._liberar_cupo(None)
+            raise
+
+        futuro.add_done_callback(self._liberar_cupo)
+
+        return {'futuro': futuro, 'hash': hash_contenido, 'nombre_archivo': nombre_archivo}
+
+    def _liberar_cupo(self, futuro: Future = None):
+        """Registra los tiempos de un parseo terminado y libera su lugar en la cola"""
+        with self._lock:
+            self.en_cola -= 1
+            if futuro is None or futuro.cancelled() or futuro.exception() is not None:
+                self.fallidos += 1
+            else:
+                _, en_cola, parseo = futuro.result()
+                self.parseados += 1
+                self.segundos_en_cola += en_cola
+                self.segundos_parseo += parseo
+
+        self._cupos.release()
+
+    def resultado(self, pendiente: Dict[str, any]) -> Dict[str, any]:
+        """
+        Espera el parseo de un anexo y lo guarda en la caché de parseo
+
+        Args:
+            pendiente: Valor retornado por enviar
+
+        Returns:
+            Mismo Dict que AnexoProcessor.procesar_archivo_completo
+        """
+        inicio = time.monotonic()
+        try:
+            resultado = pendiente['futuro'].result()[0]
+        finally:
+            with self._lock:
+                self.segundos_espera_resultado += time.monotonic() - inicio
+
+        if pendiente['hash'] is not None:
+            self.cache_parseo.guardar_resultado(pendiente['hash'], resultado, pendiente['nombre_archivo'])
+
+        return resultado
+
+    def cerrar(self):
+        """Detiene el pool (descarta lo que no alcanzó a empezar)"""
+        self._ejecutor.shutdown(wait=True, cancel_futures=True)
+
+    def estadisticas(self) -> Dict[str, any]:
+        """
+        Tiempos de la etapa desde que se creó
+
+        Returns:
+            Dict con anexos enviados y parseados, ocupación de los procesos,
+            segundos de parseo, en cola, de contrapresión y de espera de resultados
+        """
+        with self._lock:
+            duracion = max(time.monotonic() - self._inicio, 1e-9)
+            return {
+                'procesos': self.procesos,
+                'max_en_cola': self.max_en_cola,
+                'enviados': self.enviados,
+                'parseados': self.parseados,
+                'desde_cache': self.desde_cache,
+                'fallidos': self.fallidos,
+                'pico_en_cola': self.pico_en_cola,
+                'segundos_parseo': round(self.segundos_parseo, 2),
+                'segundos_en_cola': round(self.segundos_en_cola, 2),
+                'segundos_contrapresion': round(self.segundos_contrapresion, 2),
+                'segundos_espera_resultado': round(self.segundos_espera_resultado, 2),
+                'ocupacion': round(self.segundos_parseo * 100 / (duracion * self.procesos), 1)
+            }
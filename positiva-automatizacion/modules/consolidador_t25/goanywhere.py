@@ -3,10 +3,20 @@ Cliente para conectarse al servidor GoAnywhere SFTP
 """
 
 import paramiko
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+import posixpath
 import stat
 import os
+import tempfile
+import threading
+import time
+
+from .indice_sugerencias import IndiceSugerencias
+from .listado_cache import ListadoCache
+from .sftp_pool import SFTPPool
 
 class GoAnywhereWebClient:
     """Cliente SFTP para GoAnywhere"""
@@ -17,7 +27,22 @@ class GoAnywhereWebClient:
     DEFAULT_USERNAME = ''
     DEFAULT_PASSWORD = ''
     
-    def __init__(self, host: str = None, port: int = None, username: str = None):
+    # Lecturas de 32 KB en vuelo por descarga (pipelining sobre la ventana del canal)
+    LECTURAS_EN_VUELO = 256
+    
+    # Bytes copiados al archivo local por escritura
+    TAMANO_ESCRITURA = 1024 * 1024
+    
+    # Bytes que una descarga en memoria mantiene en RAM antes de pasar a un temporal en disco
+    MAX_BYTES_EN_MEMORIA = 32 * 1024 * 1024
+    
+    # Búsqueda: carpetas listadas a la vez (una por canal), profundidad
+    # máxima bajo la carpeta inicial y tope de carpetas por búsqueda
+    CANALES_BUSQUEDA = 8
+    PROFUNDIDAD_BUSQUEDA = 4
+    MAX_CARPETAS_BUSQUEDA = 20000
+    
+    def __init__(self, host: str = None, port: int = None, username: str = None, tamano_pool: int = None):
         """
         Inicializa el cliente GoAnywhere
         
@@ -25,15 +50,39 @@ class GoAnywhereWebClient:
             host: Servidor SFTP (por defecto DEFAULT_HOST)
             port: Puerto SFTP (por defecto DEFAULT_PORT)
             username: Usuario SFTP (por defecto DEFAULT_USERNAME)
+            tamano_pool: Canales SFTP máximos del pool (por defecto SFTPPool.TAMANO)
         """
         self.host = host or self.DEFAULT_HOST
         self.port = port or self.DEFAULT_PORT
         self.username = username or self.DEFAULT_USERNAME
+        self.tamano_pool = tamano_pool
         
-        self.ssh_client = None
-        self.sftp = None
+        # Pool de canales SFTP: las operaciones usan rutas absolutas y no
+        # dependen del directorio actual, así que varios workers pueden usar
+        # el mismo cliente a la vez
+        self.pool = None
         self.is_connected = False
+        
+        # Listados de carpetas por ruta absoluta y trie de nombres de carpetas
+        # vistas para el autocompletado (se alimenta de los listados)
+        self.listados = None
+        self.sugerencias = None
+        
+        # Directorio actual, solo para la navegación interactiva (las rutas
+        # relativas se resuelven contra él)
         self.current_directory = '/'
+        
+        # Credencial usada en la última conexión (para abrir conexiones adicionales)
+        self._password = None
+        
+        # Métricas de transferencia
+        self.bytes_descargados = 0
+        self.archivos_descargados = 0
+        self._lock_metricas = threading.Lock()
+        
+        # Descargas en segundo plano (se crea al primer uso)
+        self._anticipadas = None
+        self._lock_anticipadas = threading.Lock()
     
     def connect(self, password: str = None) -> Dict[str, any]:
         """
@@ -49,25 +98,24 @@ class GoAnywhereWebClient:
             # Usar contraseña por defecto si no se proporciona
             pwd = password or self.DEFAULT_PASSWORD
             
-            # Crear cliente SSH
-            self.ssh_client = paramiko.SSHClient()
-            self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            # Conectar
-            self.ssh_client.connect(
-                hostname=self.host,
-                port=self.port,
-                username=self.username,
-                password=pwd,
-                timeout=30
-            )
-            
-            # Abrir canal SFTP
-            self.sftp = self.ssh_client.open_sftp()
+            # Crear pool y abrir el primer canal para validar la conexión
+            pool = SFTPPool(self.host, self.port, self.username, pwd, tamano=self.tamano_pool)
+            pool.iniciar()
+            
+            if self.pool is not None:
+                self.disconnect()
+            
+            self.pool = pool
+            self.listados = ListadoCache()
+            self.sugerencias = IndiceSugerencias(lambda ruta: self._listar(ruta, fresco=True))
             self.is_connected = True
+            self._password = pwd
+            
+            # Obtener directorio inicial
+            self.current_directory = self.pool.ejecutar(lambda sftp: sftp.normalize('.')) or '/'
             
-            # Obtener directorio actual
-            self.current_directory = self.sftp.getcwd() or '/'
+            # Sembrar el autocompletado con la raíz sin demorar la conexión
+            self.sugerencias.refrescar_si_vencido()
             
             return {
                 'success': True,
@@ -94,18 +142,82 @@ class GoAnywhereWebClient:
     def disconnect(self):
         """Cierra la conexión SFTP"""
         try:
-            if self.sftp:
-                self.sftp.close()
-            if self.ssh_client:
-                self.ssh_client.close()
+            with self._lock_anticipadas:
+                if self._anticipadas is not None:
+                    self._anticipadas.shutdown(wait=False, cancel_futures=True)
+                    self._anticipadas = None
+            if self.pool is not None:
+                self.pool.cerrar()
+            self.pool = None
+            self.listados = None
+            self.sugerencias = None
             self.is_connected = False
             self.current_directory = '/'
         except Exception as e:
             print(f"Error al desconectar: {e}")
     
+    def _ruta(self, path: str) -> str:
+        """
+        Resuelve una ruta relativa contra el directorio actual de este cliente
+        
+        Args:
+            path: Ruta absoluta o relativa
+            
+        Returns:
+            Ruta absoluta normalizada
+        """
+        if not path or path == '.':
+            return self.current_directory
+        
+        ruta = posixpath.normpath(posixpath.join(self.current_directory, path))
+        if ruta.startswith('//'):
+            ruta = '/' + ruta.lstrip('/')
+        return ruta
+    
+    def _listar(self, ruta: str, fresco: bool = False) -> List[paramiko.SFTPAttributes]:
+        """
+        Lista una carpeta usando la caché de listados; lo que se pide al
+        servidor alimenta también el índice de sugerencias
+        
+        Args:
+            ruta: Ruta absoluta normalizada
+            fresco: Si True, se pide al servidor aunque haya listado en caché
+            
+        Returns:
+            Atributos crudos de listdir_attr (no modificar: se comparten)
+        """
+        if self.listados is not None and not fresco:
+            atributos = self.listados.obtener(ruta)
+            if atributos is not None:
+                return atributos
+        
+        atributos = self.pool.ejecutar(lambda sftp: sftp.listdir_attr(ruta))
+        
+        if self.listados is not None:
+            self.listados.guardar(ruta, atributos)
+        if self.sugerencias is not None:
+            self.sugerencias.registrar_listado(ruta, atributos)
+        return atributos
+    
+    def invalidar_listados(self, path: str = None, recursivo: bool = False) -> int:
+        """
+        Descarta listados en caché para que la próxima consulta vaya al servidor
+        
+        Args:
+            path: Carpeta a descartar (None para descartar todas)
+            recursivo: Descartar también sus subcarpetas
+            
+        Returns:
+            Cantidad de listados descartados
+        """
+        if self.listados is None:
+            return 0
+        return self.listados.invalidar(self._ruta(path) if path else None, recursivo)
+    
     def list_directory(self, path: str = '.') -> Dict[str, any]:
         """
-        Lista el contenido de un directorio
+        Lista el contenido de un directorio (el listado crudo sale de la
+        caché si sigue vigente; aquí solo se le da formato)
         
         Args:
             path: Ruta del directorio (por defecto el actual)
@@ -113,16 +225,18 @@ class GoAnywhereWebClient:
         Returns:
             Dict con success, items (lista de archivos/carpetas) y directorio_actual
         """
-        if not self.is_connected or not self.sftp:
+        if not self.is_connected or not self.pool:
             return {
                 'success': False,
                 'error': 'No hay conexión SFTP activa'
             }
         
         try:
+            ruta = self._ruta(path)
+            
             # Obtener lista de archivos con atributos
             items = []
-            for attr in self.sftp.listdir_attr(path):
+            for attr in self._listar(ruta):
                 item_info = {
                     'nombre': attr.filename,
                     'es_directorio': self._is_directory(attr),
@@ -138,7 +252,7 @@ class GoAnywhereWebClient:
             return {
                 'success': True,
                 'items': items,
-                'directorio_actual': self.sftp.getcwd() or '/'
+                'directorio_actual': self.current_directory
             }
             
         except FileNotFoundError:
@@ -159,7 +273,8 @@ class GoAnywhereWebClient:
     
     def change_directory(self, path: str) -> Dict[str, any]:
         """
-        Cambia el directorio actual
+        Cambia el directorio actual de la navegación interactiva (los
+        canales del pool no guardan directorio)
         
         Args:
             path: Ruta del nuevo directorio
@@ -167,15 +282,23 @@ class GoAnywhereWebClient:
         Returns:
             Dict con success, directorio_actual
         """
-        if not self.is_connected or not self.sftp:
+        if not self.is_connected or not self.pool:
             return {
                 'success': False,
                 'error': 'No hay conexión SFTP activa'
             }
         
         try:
-            self.sftp.chdir(path)
-            self.current_directory = self.sftp.getcwd() or '/'
+            ruta = self._ruta(path)
+            ruta, attr = self.pool.ejecutar(lambda sftp: (sftp.normalize(ruta), sftp.stat(ruta)))
+            
+            if not self._is_directory(attr):
+                return {
+                    'success': False,
+                    'error': 'La ruta no es un directorio'
+                }
+            
+            self.current_directory = ruta or '/'
             
             return {
                 'success': True,
@@ -195,28 +318,37 @@ class GoAnywhereWebClient:
     
     def download_file(self, remote_path: str, local_path: str) -> Dict[str, any]:
         """
-        Descarga un archivo del servidor SFTP
+        Descarga un archivo del servidor SFTP con lecturas en paralelo
+        (pipelining) y verifica que llegue completo
         
         Args:
             remote_path: Ruta del archivo en el servidor
             local_path: Ruta local donde guardar el archivo
             
         Returns:
-            Dict con success y ruta local del archivo
+            Dict con success, ruta local del archivo, bytes, segundos y bytes_por_segundo
         """
-        if not self.is_connected or not self.sftp:
+        if not self.is_connected or not self.pool:
             return {
                 'success': False,
                 'error': 'No hay conexión SFTP activa'
             }
         
         try:
-            self.sftp.get(remote_path, local_path)
+            ruta = self._ruta(remote_path)
+            
+            def copiar(sftp):
+                with open(local_path, 'wb') as local:
+                    return self._transferir(sftp, ruta, local)
+            
+            inicio = time.perf_counter()
+            tamano = self.pool.ejecutar(copiar)
             
             return {
                 'success': True,
                 'mensaje': 'Archivo descargado exitosamente',
-                'ruta_local': local_path
+                'ruta_local': local_path,
+                **self._registrar_descarga(tamano, time.perf_counter() - inicio)
             }
             
         except FileNotFoundError:
@@ -230,16 +362,201 @@ class GoAnywhereWebClient:
                 'error': f'Error al descargar archivo: {str(e)}'
             }
     
+    def descargar_en_memoria(self, remote_path: str, max_en_memoria: int = None) -> Dict[str, any]:
+        """
+        Descarga un archivo a un buffer en memoria que pasa a un temporal
+        en disco (borrado al cerrarlo) solo si supera max_en_memoria
+        
+        Args:
+            remote_path: Ruta del archivo en el servidor
+            max_en_memoria: Bytes máximos en RAM (por defecto MAX_BYTES_EN_MEMORIA)
+        
+        Returns:
+            Dict con success, archivo (posicionado al inicio; quien lo recibe
+            debe cerrarlo), bytes, segundos y bytes_por_segundo
+        """
+        if not self.is_connected or not self.pool:
+            return {
+                'success': False,
+                'error': 'No hay conexión SFTP activa'
+            }
+        
+        archivo = tempfile.SpooledTemporaryFile(max_size=max_en_memoria or self.MAX_BYTES_EN_MEMORIA)
+        
+        try:
+            ruta = self._ruta(remote_path)
+            
+            inicio = time.perf_counter()
+            tamano = self.pool.ejecutar(lambda sftp: self._transferir(sftp, ruta, archivo))
+            archivo.seek(0)
+            
+            return {
+                'success': True,
+                'mensaje': 'Archivo descargado exitosamente',
+                'archivo': archivo,
+                **self._registrar_descarga(tamano, time.perf_counter() - inicio)
+            }
+            
+        except FileNotFoundError:
+            archivo.close()
+            return {
+                'success': False,
+                'error': 'Archivo no encontrado en el servidor'
+            }
+        except Exception as e:
+            archivo.close()
+            return {
+                'success': False,
+                'error': f'Error al descargar archivo: {str(e)}'
+            }
+    
+    def _transferir(self, sftp: paramiko.SFTPClient, ruta: str, destino) -> int:
+        """
+        Copia un archivo remoto pidiendo sus bloques por adelantado
+        
+        Args:
+            sftp: Canal SFTP
+            ruta: Ruta absoluta del archivo remoto
+            destino: Archivo binario de destino (se vacía antes de copiar, por si es un reintento)
+        
+        Returns:
+            Bytes recibidos
+        
+        Raises:
+            ConnectionError si el archivo llegó incompleto (se reintenta en otro canal)
+        """
+        destino.seek(0)
+        destino.truncate()
+        
+        with sftp.open(ruta, 'rb') as remoto:
+            tamano = remoto.stat().st_size
+            remoto.prefetch(tamano, self.LECTURAS_EN_VUELO)
+            
+            recibidos = 0
+            while recibidos < tamano:
+                bloque = remoto.read(min(self.TAMANO_ESCRITURA, tamano - recibidos))
+                if not bloque:
+                    break
+                destino.write(bloque)
+                recibidos += len(bloque)
+        
+        if recibidos != tamano:
+            raise ConnectionError(f'Descarga incompleta de {ruta}: {recibidos} de {tamano} bytes')
+        
+        return recibidos
+    
+    def _registrar_descarga(self, tamano: int, segundos: float) -> Dict[str, any]:
+        """Suma la descarga a las métricas del cliente y retorna su throughput"""
+        with self._lock_metricas:
+            self.bytes_descargados += tamano
+            self.archivos_descargados += 1
+        
+        return {
+            'bytes': tamano,
+            'segundos': round(segundos, 3),
+            'bytes_por_segundo': round(tamano / segundos) if segundos > 0 else 0
+        }
+    
+    def descargar_anticipado(self, remote_path: str, local_path: str = None) -> Future:
+        """
+        Inicia la descarga de un archivo en segundo plano, para adelantar la
+        transferencia del siguiente anexo mientras se procesa el actual (quien
+        llama decide cuántas adelanta; el pool limita cuántas transfieren a la vez)
+        
+        Args:
+            remote_path: Ruta del archivo en el servidor
+            local_path: Ruta local donde guardar el archivo (None para descargar en memoria)
+        
+        Returns:
+            Future con el resultado de download_file o de descargar_en_memoria
+        """
+        with self._lock_anticipadas:
+            if self._anticipadas is None:
+                self._anticipadas = ThreadPoolExecutor(
+                    max_workers=self.pool.tamano,
+                    thread_name_prefix='sftp-anticipada'
+                )
+        
+        # La ruta se resuelve ahora: el directorio actual puede cambiar antes de que empiece
+        if local_path is None:
+            return self._anticipadas.submit(self.descargar_en_memoria, self._ruta(remote_path))
+        return self._anticipadas.submit(self.download_file, self._ruta(remote_path), local_path)
+    
+    def stat_file(self, remote_path: str) -> Dict[str, any]:
+        """
+        Obtiene tamaño y fecha de modificación de un archivo remoto
+        
+        Args:
+            remote_path: Ruta del archivo en el servidor
+            
+        Returns:
+            Dict con success, tamano y fecha_modificacion
+        """
+        if not self.is_connected or not self.pool:
+            return {
+                'success': False,
+                'error': 'No hay conexión SFTP activa'
+            }
+        
+        try:
+            ruta = self._ruta(remote_path)
+            attr = self.pool.ejecutar(lambda sftp: sftp.stat(ruta))
+            
+            return {
+                'success': True,
+                'tamano': attr.st_size,
+                'fecha_modificacion': datetime.fromtimestamp(attr.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+            }
+            
+        except FileNotFoundError:
+            return {
+                'success': False,
+                'error': 'Archivo no encontrado en el servidor'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error al consultar archivo: {str(e)}'
+            }
+    
+    def metricas_pool(self) -> Optional[Dict[str, any]]:
+        """
+        Obtiene el estado del pool de canales
+        
+        Returns:
+            Dict con canales en uso, libres, transportes, reconexiones y reintentos,
+            o None si no está conectado
+        """
+        if not self.is_connected or not self.pool:
+            return None
+        return self.pool.metricas()
+    
+    def metricas_listados(self) -> Optional[Dict[str, any]]:
+        """
+        Obtiene los aciertos y fallos de la caché de listados
+        
+        Returns:
+            Dict con hits, misses, tasa de aciertos, invalidaciones y entradas,
+            o None si no está conectado
+        """
+        if not self.is_connected or self.listados is None:
+            return None
+        return self.listados.estadisticas()
+    
     def get_connection_status(self) -> Dict[str, any]:
         """
         Obtiene el estado de la conexión
         
         Returns:
-            Dict con conectado (bool) y directorio_actual
+            Dict con conectado (bool), directorio_actual y métricas del pool, de los listados
+            y del índice de sugerencias
         """
         return {
             'conectado': self.is_connected,
-            'directorio_actual': self.current_directory if self.is_connected else None
+            'directorio_actual': self.current_directory if self.is_connected else None,
+            'pool': self.metricas_pool(),
+            'listados': self.metricas_listados(),
+            'sugerencias': self.sugerencias.estadisticas() if self.is_connected and self.sugerencias else None
         }
     
     def get_current_directory(self) -> Optional[str]:
@@ -249,8 +566,8 @@ class GoAnywhereWebClient:
         Returns:
             String con la ruta del directorio actual o None si no está conectado
         """
-        if self.is_connected and self.sftp:
-            return self.sftp.getcwd() or '/'
+        if self.is_connected and self.pool:
+            return self.current_directory
         return None
     
     def search_files(self, query: str, search_path: str = '.', max_results: int = 100, max_time: int = 30) -> Dict[str, any]:
@@ -266,101 +583,31 @@ class GoAnywhereWebClient:
         Returns:
             Dict con success, resultados (lista) y total
         """
-        if not self.is_connected or not self.sftp:
+        if not self.is_connected or not self.pool:
             return {
                 'success': False,
                 'error': 'No hay conexión SFTP activa'
             }
         
         try:
-            import time
             resultados = []
-            query_lower = query.lower()
-            start_time = time.time()
-            carpetas_visitadas = 0
-            max_carpetas = 200  # Límite de carpetas para evitar bloqueos
+            resumen = {}
             
-            def buscar_recursivo(path, depth=0, max_depth=4):
-                nonlocal carpetas_visitadas
-                
-                # Verificar timeout
-                if time.time() - start_time > max_time:
-                    return True  # Timeout alcanzado
-                
-                if depth > max_depth or len(resultados) >= max_results or carpetas_visitadas >= max_carpetas:
-                    return False
-                
-                try:
-                    carpetas_visitadas += 1
-                    
-                    for attr in self.sftp.listdir_attr(path):
-                        # Verificar timeout en cada iteración
-                        if time.time() - start_time > max_time:
-                            return True
-                        
-                        if len(resultados) >= max_results:
-                            break
-                        
-                        nombre = attr.filename
-                        
-                        # Ignorar archivos/carpetas ocultas
-                        if nombre.startswith('.'):
-                            continue
-                        
-                        ruta_completa = f"{path}/{nombre}".replace('//', '/')
-                        
-                        # Si es directorio, buscar recursivamente
-                        if self._is_directory(attr):
-                            # También buscar en nombres de carpetas
-                            if query_lower in nombre.lower():
-                                resultados.append({
-                                    'nombre': nombre,
-                                    'ruta': ruta_completa,
-                                    'tipo': 'directorio',
-                                    'extension': '',
-                                    'tamano': 0,
-                                    'fecha_modificacion': datetime.fromtimestamp(attr.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                                    'es_directorio': True
-                                })
-                            
-                            # Buscar dentro del directorio
-                            timeout_reached = buscar_recursivo(ruta_completa, depth + 1, max_depth)
-                            if timeout_reached:
-                                return True
-                        else:
-                            # Buscar en nombres de archivos
-                            if query_lower in nombre.lower():
-                                # Obtener extensión
-                                extension = os.path.splitext(nombre)[1].lower()
-                                
-                                resultados.append({
-                                    'nombre': nombre,
-                                    'ruta': ruta_completa,
-                                    'tipo': 'archivo',
-                                    'extension': extension,
-                                    'tamano': attr.st_size,
-                                    'fecha_modificacion': datetime.fromtimestamp(attr.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                                    'es_directorio': False
-                                })
-                except PermissionError:
-                    # Ignorar errores de permisos
-                    pass
-                except Exception as e:
-                    # Ignorar otros errores y continuar
-                    pass
-                
-                return False
-            
-            # Iniciar búsqueda recursiva
-            timeout_reached = buscar_recursivo(search_path)
+            for evento, datos in self.iterar_busqueda(query, search_path, max_results, max_time):
+                if evento == 'resultado':
+                    resultados.append(datos)
+                else:
+                    resumen = datos
             
             return {
                 'success': True,
                 'resultados': resultados,
                 'total': len(resultados),
                 'query': query,
-                'timeout': timeout_reached,
-                'carpetas_visitadas': carpetas_visitadas
+                'timeout': resumen.get('timeout', False),
+                'truncado': resumen.get('truncado', False),
+                'carpetas_visitadas': resumen.get('carpetas_visitadas', 0),
+                'segundos': resumen.get('segundos', 0)
             }
             
         except Exception as e:
@@ -369,44 +616,152 @@ class GoAnywhereWebClient:
                 'error': f'Error al buscar: {str(e)}'
             }
     
-    def get_suggestions(self, partial_query: str, current_path: str = '.', limit: int = 10) -> Dict[str, any]:
+    def iterar_busqueda(
+        self,
+        query: str,
+        search_path: str = '.',
+        max_results: int = 100,
+        max_time: int = 30
+    ) -> Iterator[Tuple[str, Dict[str, any]]]:
         """
-        Obtiene sugerencias de autocompletado basadas en el directorio actual
+        Busca archivos y carpetas por nombre recorriendo el árbol por niveles,
+        listando varias carpetas a la vez en canales distintos del pool, y
+        entrega cada coincidencia apenas se encuentra
+        
+        El recorrido se detiene al alcanzar max_results, max_time o
+        MAX_CARPETAS_BUSQUEDA carpetas listadas. Las carpetas sin permisos o
+        que fallan al listarse se omiten.
+        
+        Args:
+            query: Término de búsqueda
+            search_path: Ruta donde iniciar la búsqueda
+            max_results: Máximo número de resultados
+            max_time: Tiempo máximo de búsqueda en segundos
+            
+        Returns:
+            Generador de tuplas (evento, datos): ('resultado', coincidencia) por
+            cada coincidencia y al final ('fin', resumen) con total, timeout,
+            truncado (el tope de carpetas detuvo el recorrido con carpetas sin
+            listar), carpetas_visitadas y segundos
+        """
+        if not self.is_connected or not self.pool:
+            raise ConnectionError('No hay conexión SFTP activa')
+        
+        query_lower = query.lower()
+        inicio = time.monotonic()
+        limite = inicio + max_time
+        canales = max(1, min(self.CANALES_BUSQUEDA, self.pool.tamano))
+        
+        pendientes = deque([(self._ruta(search_path), 0)])
+        en_vuelo = {}
+        total = 0
+        carpetas_visitadas = 0
+        timeout = False
+        
+        ejecutor = ThreadPoolExecutor(max_workers=canales, thread_name_prefix='busqueda-sftp')
+        
+        try:
+            while (pendientes or en_vuelo) and total < max_results:
+                # Mantener a lo sumo un listado en vuelo por canal
+                while pendientes and len(en_vuelo) < canales and carpetas_visitadas < self.MAX_CARPETAS_BUSQUEDA:
+                    ruta, profundidad = pendientes.popleft()
+                    futuro = ejecutor.submit(self._listar, ruta)
+                    en_vuelo[futuro] = (ruta, profundidad)
+                    carpetas_visitadas += 1
+                
+                if not en_vuelo:
+                    break
+                
+                restante = limite - time.monotonic()
+                listos, _ = wait(en_vuelo, timeout=max(restante, 0), return_when=FIRST_COMPLETED)
+                if not listos:
+                    timeout = True
+                    break
+                
+                for futuro in listos:
+                    ruta, profundidad = en_vuelo.pop(futuro)
+                    try:
+                        atributos = futuro.result()
+                    except Exception:
+                        # Ignorar carpetas sin permisos o que fallan y continuar
+                        continue
+                    
+                    for attr in atributos:
+                        nombre = attr.filename
+                        
+                        # Ignorar archivos/carpetas ocultas
+                        if nombre.startswith('.'):
+                            continue
+                        
+                        es_directorio = self._is_directory(attr)
+                        ruta_completa = posixpath.join(ruta, nombre)
+                        
+                        if es_directorio and profundidad < self.PROFUNDIDAD_BUSQUEDA:
+                            pendientes.append((ruta_completa, profundidad + 1))
+                        
+                        if query_lower in nombre.lower() and total < max_results:
+                            total += 1
+                            yield 'resultado', self._resultado_busqueda(attr, ruta_completa, es_directorio)
+                
+                if time.monotonic() > limite and (pendientes or en_vuelo):
+                    timeout = True
+                    break
+        finally:
+            # Si el consumidor abandona el generador, no seguir listando
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+        
+        yield 'fin', {
+            'query': query,
+            'total': total,
+            'timeout': timeout,
+            'truncado': bool(pendientes) and carpetas_visitadas >= self.MAX_CARPETAS_BUSQUEDA,
+            'carpetas_visitadas': carpetas_visitadas,
+            'segundos': round(time.monotonic() - inicio, 3)
+        }
+    
+    @staticmethod
+    def _resultado_busqueda(attr, ruta: str, es_directorio: bool) -> Dict[str, any]:
+        """Formatea una coincidencia de la búsqueda"""
+        return {
+            'nombre': attr.filename,
+            'ruta': ruta,
+            'tipo': 'directorio' if es_directorio else 'archivo',
+            'extension': '' if es_directorio else os.path.splitext(attr.filename)[1].lower(),
+            'tamano': 0 if es_directorio else attr.st_size,
+            'fecha_modificacion': datetime.fromtimestamp(attr.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+            'es_directorio': es_directorio
+        }
+    
+    def get_suggestions(self, partial_query: str, current_path: str = None, limit: int = 10) -> Dict[str, any]:
+        """
+        Obtiene sugerencias de autocompletado entre las carpetas ya vistas
+        (la raíz y todo lo listado desde la conexión), sin consultar el
+        servidor: cada palabra del texto debe ser prefijo de alguna palabra
+        del nombre. Si el índice venció, se refresca en segundo plano
         
         Args:
             partial_query: Texto parcial ingresado
-            current_path: Directorio actual
+            current_path: Carpeta a la que se restringen las sugerencias (None para todas)
             limit: Número máximo de sugerencias
             
         Returns:
-            Dict con success y lista de sugerencias
+            Dict con success, lista de sugerencias e indice_listo (False mientras
+            se lista la raíz por primera vez)
         """
-        if not self.is_connected or not self.sftp:
+        if not self.is_connected or not self.pool or self.sugerencias is None:
             return {
                 'success': False,
                 'error': 'No hay conexión SFTP activa'
             }
         
         try:
-            sugerencias = []
-            query_lower = partial_query.lower()
-            
-            # Buscar en directorio actual
-            for attr in self.sftp.listdir_attr(current_path):
-                if len(sugerencias) >= limit:
-                    break
-                
-                nombre = attr.filename
-                if query_lower in nombre.lower():
-                    sugerencias.append({
-                        'nombre': nombre,
-                        'es_directorio': self._is_directory(attr),
-                        'ruta': f"{current_path}/{nombre}".replace('//', '/')
-                    })
+            self.sugerencias.refrescar_si_vencido()
+            bajo = self._ruta(current_path) if current_path else None
             
             return {
                 'success': True,
-                'sugerencias': sugerencias
+                'sugerencias': self.sugerencias.buscar(partial_query, limit, bajo),
+                'indice_listo': self.sugerencias.listo
             }
             
         except Exception as e:
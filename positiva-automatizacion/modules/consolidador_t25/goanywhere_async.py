@@ -0,0 +1,532 @@
+"""
+Cliente GoAnywhere asíncrono (asyncssh) para listar y descargar con cientos
+de operaciones en vuelo desde un solo hilo
+"""
+
+import asyncio
+import os
+import posixpath
+import stat
+import time
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+
+try:
+    import asyncssh
+    ASYNCSSH_AVAILABLE = True
+except ImportError:
+    asyncssh = None
+    ASYNCSSH_AVAILABLE = False
+
+from .goanywhere import GoAnywhereWebClient
+from .listado_cache import ListadoCache
+
+
+class GoAnywhereAsyncClient:
+    """
+    Alternativa a GoAnywhereWebClient con la misma superficie (connect,
+    list_directory, download_file, search_files) en corrutinas
+
+    asyncssh multiplexa todas las peticiones de una sesión SFTP, así que unas
+    pocas conexiones bastan para tener cientos de listados y descargas en
+    vuelo sin un hilo por operación; MAX_EN_VUELO limita cuántas se lanzan a
+    la vez. No hay directorio actual: las rutas relativas se resuelven
+    contra la raíz
+    """
+
+    # Conexiones SSH (cada una con su sesión SFTP) entre las que se reparten las operaciones
+    CONEXIONES = 4
+
+    # Operaciones SFTP en vuelo a la vez entre todas las conexiones
+    MAX_EN_VUELO = 256
+
+    # Lecturas en vuelo por descarga y bytes por lectura
+    LECTURAS_EN_VUELO = 128
+    TAMANO_BLOQUE = 32 * 1024
+
+    # Segundos entre keepalive y máximos para abrir una conexión
+    KEEPALIVE_SEGUNDOS = 30
+    TIMEOUT_CONEXION = 30
+
+    # Búsqueda: carpetas listadas a la vez y mismos límites que el cliente con hilos
+    CARPETAS_EN_VUELO_BUSQUEDA = 64
+    PROFUNDIDAD_BUSQUEDA = GoAnywhereWebClient.PROFUNDIDAD_BUSQUEDA
+    MAX_CARPETAS_BUSQUEDA = GoAnywhereWebClient.MAX_CARPETAS_BUSQUEDA
+
+    def __init__(self, host: str = None, port: int = None, username: str = None, conexiones: int = None):
+        """
+        Inicializa el cliente (las conexiones se abren en connect)
+
+        Args:
+            host: Servidor SFTP (por defecto el de GoAnywhereWebClient)
+            port: Puerto SFTP (por defecto el de GoAnywhereWebClient)
+            username: Usuario SFTP (por defecto el de GoAnywhereWebClient)
+            conexiones: Conexiones SSH a abrir (por defecto CONEXIONES)
+        """
+        self.host = host or GoAnywhereWebClient.DEFAULT_HOST
+        self.port = port or GoAnywhereWebClient.DEFAULT_PORT
+        self.username = username or GoAnywhereWebClient.DEFAULT_USERNAME
+        self.conexiones = max(1, conexiones or self.CONEXIONES)
+
+        # Sesiones abiertas: {'conexion', 'sftp', 'lock'} (el lock serializa la reconexión)
+        self._sesiones = []
+        self._siguiente = 0
+        self._en_vuelo = None
+        self._password = None
+        self.is_connected = False
+
+        self.listados = None
+
+        self.bytes_descargados = 0
+        self.archivos_descargados = 0
+        self.reconexiones = 0
+        self.operaciones = 0
+
+    async def _abrir_sesion(self) -> Dict[str, any]:
+        """Abre una conexión SSH con su sesión SFTP"""
+        conexion = await asyncssh.connect(
+            self.host,
+            port=self.port,
+            username=self.username,
+            password=self._password,
+            known_hosts=None,
+            client_keys=None,
+            agent_path=None,
+            keepalive_interval=self.KEEPALIVE_SEGUNDOS,
+            connect_timeout=self.TIMEOUT_CONEXION
+        )
+        try:
+            sftp = await conexion.start_sftp_client()
+        except Exception:
+            conexion.close()
+            raise
+        return {'conexion': conexion, 'sftp': sftp, 'lock': asyncio.Lock()}
+
+    async def connect(self, password: str = None) -> Dict[str, any]:
+        """
+        Abre las conexiones al servidor SFTP
+
+        Args:
+            password: Contraseña (por defecto la de GoAnywhereWebClient)
+
+        Returns:
+            Dict con success (bool) y mensaje/error
+        """
+        if not ASYNCSSH_AVAILABLE:
+            return {
+                'success': False,
+                'error': 'asyncssh no está instalado. Instalar con: pip install asyncssh'
+            }
+
+        if self.is_connected:
+            await self.disconnect()
+
+        self._password = password or GoAnywhereWebClient.DEFAULT_PASSWORD
+        resultados = await asyncio.gather(
+            *(self._abrir_sesion() for _ in range(self.conexiones)),
+            return_exceptions=True
+        )
+        sesiones = [r for r in resultados if not isinstance(r, BaseException)]
+        errores = [r for r in resultados if isinstance(r, BaseException)]
+
+        if errores:
+            for sesion in sesiones:
+                sesion['conexion'].close()
+            error = errores[0]
+            if isinstance(error, asyncssh.PermissionDenied):
+                return {
+                    'success': False,
+                    'error': 'Error de autenticación. Verifica las credenciales.'
+                }
+            return {
+                'success': False,
+                'error': f'Error de conexión: {str(error)}'
+            }
+
+        self._sesiones = sesiones
+        self._en_vuelo = asyncio.Semaphore(self.MAX_EN_VUELO)
+        self.listados = ListadoCache()
+        self.is_connected = True
+
+        return {
+            'success': True,
+            'mensaje': 'Conexión exitosa',
+            'conexiones': len(sesiones)
+        }
+
+    async def disconnect(self):
+        """Cierra las conexiones"""
+        sesiones = self._sesiones
+        self._sesiones = []
+        self.is_connected = False
+        self.listados = None
+
+        for sesion in sesiones:
+            try:
+                sesion['sftp'].exit()
+                sesion['conexion'].close()
+                await sesion['conexion'].wait_closed()
+            except Exception as e:
+                print(f"Error al desconectar: {e}")
+
+    async def _reconectar(self, sesion: Dict[str, any], caida):
+        """Reemplaza la conexión de una sesión si sigue siendo la que se cayó"""
+        async with sesion['lock']:
+            if sesion['conexion'] is not caida:
+                return
+            nueva = await self._abrir_sesion()
+            sesion['conexion'].close()
+            sesion['conexion'] = nueva['conexion']
+            sesion['sftp'] = nueva['sftp']
+            self.reconexiones += 1
+
+    async def _ejecutar(self, operacion: Callable):
+        """
+        Ejecuta una operación SFTP en la siguiente sesión (en turno
+        rotativo), respetando MAX_EN_VUELO; si la conexión se cayó, reconecta
+        la sesión y reintenta una vez
+
+        Args:
+            operacion: Función que recibe el SFTPClient de asyncssh y retorna una corrutina
+
+        Returns:
+            Resultado de la operación
+        """
+        if not self.is_connected:
+            raise ConnectionError('No hay conexión SFTP activa')
+
+        async with self._en_vuelo:
+            sesion = self._sesiones[self._siguiente % len(self._sesiones)]
+            self._siguiente += 1
+
+            conexion = sesion['conexion']
+            try:
+                resultado = await operacion(sesion['sftp'])
+            except (asyncssh.ConnectionLost, asyncssh.DisconnectError, ConnectionError) as e:
+                print(f"Conexión SFTP caída ({type(e).__name__}: {e}), reconectando")
+                await self._reconectar(sesion, conexion)
+                resultado = await operacion(sesion['sftp'])
+
+            self.operaciones += 1
+            return resultado
+
+    @staticmethod
+    def _ruta(path: str) -> str:
+        """Ruta absoluta normalizada (las relativas se toman desde la raíz)"""
+        return posixpath.normpath(posixpath.join('/', path or '/')).replace('//', '/')
+
+    @staticmethod
+    def _es_directorio(attrs) -> bool:
+        """Indica si los atributos de asyncssh corresponden a un directorio"""
+        return stat.S_ISDIR(attrs.permissions or 0)
+
+    async def _listar(self, ruta: str) -> List:
+        """
+        Lista una carpeta usando la caché de listados
+
+        Args:
+            ruta: Ruta absoluta normalizada
+
+        Returns:
+            Entradas SFTPName de asyncssh (sin '.' ni '..'; no modificar: se comparten)
+        """
+        entradas = self.listados.obtener(ruta)
+        if entradas is not None:
+            return entradas
+
+        entradas = [
+            entrada for entrada in await self._ejecutar(lambda sftp: sftp.readdir(ruta))
+            if entrada.filename not in ('.', '..')
+        ]
+        self.listados.guardar(ruta, entradas)
+        return entradas
+
+    async def list_directory(self, path: str = '/') -> Dict[str, any]:
+        """
+        Lista el contenido de un directorio
+
+        Args:
+            path: Ruta del directorio
+
+        Returns:
+            Dict con success, items (lista de archivos/carpetas) y directorio_actual
+        """
+        if not self.is_connected:
+            return {
+                'success': False,
+                'error': 'No hay conexión SFTP activa'
+            }
+
+        ruta = self._ruta(path)
+        try:
+            items = [
+                {
+                    'nombre': entrada.filename,
+                    'es_directorio': self._es_directorio(entrada.attrs),
+                    'tamano': entrada.attrs.size,
+                    'fecha_modificacion': datetime.fromtimestamp(entrada.attrs.mtime or 0).strftime('%Y-%m-%d %H:%M:%S'),
+                    'permisos': oct(entrada.attrs.permissions or 0)[-3:]
+                }
+                for entrada in await self._listar(ruta)
+            ]
+
+            # Ordenar: directorios primero, luego archivos
+            items.sort(key=lambda x: (not x['es_directorio'], x['nombre'].lower()))
+
+            return {
+                'success': True,
+                'items': items,
+                'directorio_actual': ruta
+            }
+
+        except asyncssh.SFTPNoSuchFile:
+            return {
+                'success': False,
+                'error': 'Directorio no encontrado'
+            }
+        except asyncssh.SFTPPermissionDenied:
+            return {
+                'success': False,
+                'error': 'Sin permisos para acceder al directorio'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error al listar directorio: {str(e)}'
+            }
+
+    async def listar_varios(self, rutas: List[str]) -> List[Dict[str, any]]:
+        """
+        Lista varias carpetas a la vez
+
+        Args:
+            rutas: Rutas de las carpetas
+
+        Returns:
+            Resultados de list_directory en el mismo orden
+        """
+        return await asyncio.gather(*(self.list_directory(ruta) for ruta in rutas))
+
+    async def download_file(self, remote_path: str, local_path: str) -> Dict[str, any]:
+        """
+        Descarga un archivo con LECTURAS_EN_VUELO lecturas en paralelo
+
+        Args:
+            remote_path: Ruta del archivo en el servidor
+            local_path: Ruta local donde guardar el archivo
+
+        Returns:
+            Dict con success, ruta_local, bytes, segundos y bytes_por_segundo
+        """
+        if not self.is_connected:
+            return {
+                'success': False,
+                'error': 'No hay conexión SFTP activa'
+            }
+
+        ruta = self._ruta(remote_path)
+        try:
+            directorio_local = os.path.dirname(local_path)
+            if directorio_local:
+                os.makedirs(directorio_local, exist_ok=True)
+
+            inicio = time.perf_counter()
+            await self._ejecutar(lambda sftp: sftp.get(
+                ruta,
+                local_path,
+                block_size=self.TAMANO_BLOQUE,
+                max_requests=self.LECTURAS_EN_VUELO
+            ))
+            segundos = time.perf_counter() - inicio
+            tamano = os.path.getsize(local_path)
+
+            self.bytes_descargados += tamano
+            self.archivos_descargados += 1
+
+            return {
+                'success': True,
+                'mensaje': 'Archivo descargado exitosamente',
+                'ruta_local': local_path,
+                'bytes': tamano,
+                'segundos': round(segundos, 3),
+                'bytes_por_segundo': round(tamano / segundos) if segundos > 0 else 0
+            }
+
+        except asyncssh.SFTPNoSuchFile:
+            return {
+                'success': False,
+                'error': 'Archivo no encontrado en el servidor'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error al descargar archivo: {str(e)}'
+            }
+
+    async def descargar_varios(self, archivos: List[Tuple[str, str]]) -> List[Dict[str, any]]:
+        """
+        Descarga varios archivos a la vez (MAX_EN_VUELO limita cuántos transfieren)
+
+        Args:
+            archivos: Pares (ruta remota, ruta local)
+
+        Returns:
+            Resultados de download_file en el mismo orden
+        """
+        return await asyncio.gather(*(self.download_file(remoto, local) for remoto, local in archivos))
+
+    async def iterar_busqueda(
+        self,
+        query: str,
+        search_path: str = '/',
+        max_results: int = 100,
+        max_time: int = 30
+    ) -> AsyncIterator[Tuple[str, Dict[str, any]]]:
+        """
+        Busca archivos y carpetas por nombre recorriendo el árbol por niveles
+        con hasta CARPETAS_EN_VUELO_BUSQUEDA listados a la vez (mismos eventos
+        que GoAnywhereWebClient.iterar_busqueda)
+
+        Args:
+            query: Término de búsqueda
+            search_path: Ruta donde iniciar la búsqueda
+            max_results: Máximo número de resultados
+            max_time: Tiempo máximo de búsqueda en segundos
+
+        Returns:
+            Generador asíncrono de tuplas (evento, datos): ('resultado', coincidencia)
+            y al final ('fin', resumen)
+        """
+        query_lower = query.lower()
+        inicio = time.monotonic()
+        limite = inicio + max_time
+
+        pendientes = deque([(self._ruta(search_path), 0)])
+        en_vuelo = {}
+        total = 0
+        carpetas_visitadas = 0
+        timeout = False
+
+        try:
+            while (pendientes or en_vuelo) and total < max_results:
+                while (pendientes and len(en_vuelo) < self.CARPETAS_EN_VUELO_BUSQUEDA
+                       and carpetas_visitadas < self.MAX_CARPETAS_BUSQUEDA):
+                    ruta, profundidad = pendientes.popleft()
+                    en_vuelo[asyncio.ensure_future(self._listar(ruta))] = (ruta, profundidad)
+                    carpetas_visitadas += 1
+
+                if not en_vuelo:
+                    break
+
+                restante = limite - time.monotonic()
+                listas, _ = await asyncio.wait(en_vuelo, timeout=max(restante, 0), return_when=asyncio.FIRST_COMPLETED)
+                if not listas:
+                    timeout = True
+                    break
+
+                for tarea in listas:
+                    ruta, profundidad = en_vuelo.pop(tarea)
+                    if tarea.exception() is not None:
+                        # Ignorar carpetas sin permisos o que fallan y continuar
+                        continue
+
+                    for entrada in tarea.result():
+                        nombre = entrada.filename
+                        if nombre.startswith('.'):
+                            continue
+
+                        es_directorio = self._es_directorio(entrada.attrs)
+                        ruta_completa = posixpath.join(ruta, nombre)
+
+                        if es_directorio and profundidad < self.PROFUNDIDAD_BUSQUEDA:
+                            pendientes.append((ruta_completa, profundidad + 1))
+
+                        if query_lower in nombre.lower() and total < max_results:
+                            total += 1
+                            yield 'resultado', {
+                                'nombre': nombre,
+                                'ruta': ruta_completa,
+                                'tipo': 'directorio' if es_directorio else 'archivo',
+                                'extension': '' if es_directorio else os.path.splitext(nombre)[1].lower(),
+                                'tamano': 0 if es_directorio else entrada.attrs.size,
+                                'fecha_modificacion': datetime.fromtimestamp(entrada.attrs.mtime or 0).strftime('%Y-%m-%d %H:%M:%S'),
+                                'es_directorio': es_directorio
+                            }
+
+                if time.monotonic() > limite and (pendientes or en_vuelo):
+                    timeout = True
+                    break
+        finally:
+            for tarea in en_vuelo:
+                tarea.cancel()
+
+        yield 'fin', {
+            'query': query,
+            'total': total,
+            'timeout': timeout,
+            'truncado': bool(pendientes) and carpetas_visitadas >= self.MAX_CARPETAS_BUSQUEDA,
+            'carpetas_visitadas': carpetas_visitadas,
+            'segundos': round(time.monotonic() - inicio, 3)
+        }
+
+    async def search_files(self, query: str, search_path: str = '/', max_results: int = 100, max_time: int = 30) -> Dict[str, any]:
+        """
+        Busca archivos recursivamente en el servidor con timeout
+
+        Args:
+            query: Término de búsqueda
+            search_path: Ruta donde iniciar la búsqueda
+            max_results: Máximo número de resultados
+            max_time: Tiempo máximo de búsqueda en segundos
+
+        Returns:
+            Dict con success, resultados (lista) y total
+        """
+        if not self.is_connected:
+            return {
+                'success': False,
+                'error': 'No hay conexión SFTP activa'
+            }
+
+        try:
+            resultados = []
+            resumen = {}
+
+            async for evento, datos in self.iterar_busqueda(query, search_path, max_results, max_time):
+                if evento == 'resultado':
+                    resultados.append(datos)
+                else:
+                    resumen = datos
+
+            return {
+                'success': True,
+                'resultados': resultados,
+                'total': len(resultados),
+                'query': query,
+                'timeout': resumen.get('timeout', False),
+                'truncado': resumen.get('truncado', False),
+                'carpetas_visitadas': resumen.get('carpetas_visitadas', 0),
+                'segundos': resumen.get('segundos', 0)
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error al buscar: {str(e)}'
+            }
+
+    def get_connection_status(self) -> Dict[str, any]:
+        """
+        Obtiene el estado de la conexión
+
+        Returns:
+            Dict con conectado (bool), conexiones, operaciones, reconexiones y métricas de los listados
+        """
+        return {
+            'conectado': self.is_connected,
+            'conexiones': len(self._sesiones),
+            'operaciones': self.operaciones,
+            'reconexiones': self.reconexiones,
+            'listados': self.listados.estadisticas() if self.listados else None
+        }
@@ -0,0 +1,118 @@
+"""
+Índice de las carpetas raíz de GoAnywhere para ubicar contratos
+"""
+
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+from .goanywhere import GoAnywhereWebClient
+
+
+class IndiceCarpetas:
+    """
+    Lista la raíz de GoAnywhere una sola vez (con refresco por TTL) y
+    resuelve contratos a carpetas candidatas por diccionario
+    """
+
+    # Segundos antes de volver a listar la raíz
+    TTL_SEGUNDOS = 15 * 60
+
+    # Separadores de palabras en nombres de carpeta (el guion se conserva
+    # porque forma parte del número de contrato)
+    SEPARADORES = re.compile(r'[\s_,;()\[\]]+')
+
+    def __init__(self, ttl_segundos: int = None):
+        """
+        Inicializa el índice (se construye en la primera búsqueda)
+
+        Args:
+            ttl_segundos: Vigencia del listado de la raíz (por defecto TTL_SEGUNDOS)
+        """
+        self.ttl_segundos = ttl_segundos if ttl_segundos is not None else self.TTL_SEGUNDOS
+        self._lock = threading.Lock()
+        self._construido = 0.0
+        self._carpetas = []
+        self._por_token = {}
+        self._por_anio = {}
+
+    @staticmethod
+    def normalizar(texto: str) -> str:
+        """Normaliza un número de contrato o nombre de carpeta para comparar"""
+        return texto.strip().upper()
+
+    def _construir(self, cliente: GoAnywhereWebClient) -> Optional[str]:
+        """
+        Lista la raíz y arma los índices (llamar con el lock tomado)
+
+        Returns:
+            Mensaje de error o None si se construyó correctamente
+        """
+        listado = cliente.list_directory('/')
+        if not listado['success']:
+            return listado['error']
+
+        carpetas = [item['nombre'] for item in listado['items'] if item['es_directorio']]
+        por_token = {}
+        por_anio = {}
+
+        for posicion, carpeta in enumerate(carpetas):
+            nombre = self.normalizar(carpeta)
+
+            for token in set(self.SEPARADORES.split(nombre)):
+                if token:
+                    por_token.setdefault(token, []).append(posicion)
+
+            # Cualquier ventana de 4 dígitos, igual que buscar el año como subcadena
+            for anio in {nombre[i:i + 4] for i in range(len(nombre) - 3) if nombre[i:i + 4].isdigit()}:
+                por_anio.setdefault(anio, set()).add(posicion)
+
+        self._carpetas = carpetas
+        self._por_token = por_token
+        self._por_anio = por_anio
+        self._construido = time.time()
+
+        print(f"Índice de carpetas raíz construido: {len(carpetas)} carpetas")
+        return None
+
+    def buscar(self, numero_contrato: str, cliente: GoAnywhereWebClient, anio: str = None) -> Dict[str, any]:
+        """
+        Busca las carpetas candidatas de un contrato
+
+        Primero por coincidencia exacta de palabra en el nombre de la carpeta;
+        si no hay, por subcadena sobre los nombres ya indexados (sin volver a
+        listar la raíz). Las candidatas que contienen el año van primero.
+
+        Args:
+            numero_contrato: Número del contrato
+            cliente: Cliente conectado (solo se usa si hay que listar la raíz)
+            anio: Año del contrato para priorizar candidatas
+
+        Returns:
+            Dict con success y candidatas (en orden de preferencia)
+        """
+        with self._lock:
+            if not self._construido or time.time() - self._construido > self.ttl_segundos:
+                error = self._construir(cliente)
+                if error:
+                    return {'success': False, 'error': error}
+
+            carpetas = self._carpetas
+            contrato = self.normalizar(numero_contrato)
+            posiciones = self._por_token.get(contrato)
+
+            if posiciones is None:
+                posiciones = [i for i, carpeta in enumerate(carpetas) if contrato in self.normalizar(carpeta)]
+
+            if anio and len(posiciones) > 1:
+                if len(anio) == 4 and anio.isdigit():
+                    con_anio = self._por_anio.get(anio, set())
+                else:
+                    con_anio = {i for i in posiciones if anio in carpetas[i]}
+                posiciones = sorted(posiciones, key=lambda i: i not in con_anio)
+
+        return {
+            'success': True,
+            'candidatas': [carpetas[i] for i in posiciones]
+        }
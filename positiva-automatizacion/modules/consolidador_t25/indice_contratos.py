@@ -0,0 +1,404 @@
+"""
+Índice de los contratos de la maestra para búsquedas y filtros por año
+"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class IndiceContratos:
+    """
+    Índices sobre los contratos de prestadores de salud, construidos una
+    vez por carga de la maestra
+
+    - Número normalizado -> contratos (búsqueda exacta)
+    - Ventana de 4 dígitos del número -> contratos (filtro por año)
+    - Trigramas del número -> contratos (búsqueda por subcadena)
+    - Números ordenados (búsqueda por prefijo con bisect)
+    - Trigramas de número, razón social y NIT normalizados (búsqueda
+      aproximada con puntaje)
+
+    Salvo en la búsqueda aproximada, los resultados se devuelven en el
+    orden de la maestra.
+    """
+
+    # Largo de los n-gramas del índice de subcadenas
+    LARGO_NGRAMA = 3
+
+    # Campos indexados para la búsqueda aproximada
+    CAMPOS_APROXIMADOS = ['numero_contrato', 'razon_social', 'nit']
+
+    # Puntaje mínimo (0 a 1) de un resultado aproximado
+    PUNTAJE_MINIMO = 0.35
+
+    # Puntaje mínimo cuando la clave contiene al término completo (los
+    # aproximados quedan por debajo y la coincidencia exacta vale 1)
+    PUNTAJE_CONTIENE = 0.9
+
+    # Peso de la cobertura del término frente a la similitud total (Dice)
+    PESO_COBERTURA = 0.7
+
+    # Candidatos por resultado pedido que se revisan antes de ordenar
+    CANDIDATOS_POR_RESULTADO = 5
+
+    # Dígitos mínimos del término para buscarlo también como NIT
+    MIN_DIGITOS_NIT = 5
+
+    # Palabras (letras y dígitos) y grupos de solo letras o solo dígitos
+    PALABRAS = re.compile(r'[A-Z0-9]+')
+    GRUPOS = re.compile(r'[A-Z]+|[0-9]+')
+
+    def __init__(self, contratos: List[Dict[str, any]]):
+        """
+        Construye los índices
+
+        Args:
+            contratos: Contratos de prestadores de salud (en orden de maestra)
+        """
+        self.contratos = contratos
+        self._numeros = [self.normalizar(contrato['numero_contrato']) for contrato in contratos]
+        self._por_numero = {}
+        self._por_anio = {}
+        self._por_ngrama = {}
+        anios = set()
+
+        for posicion, numero in enumerate(self._numeros):
+            self._por_numero.setdefault(numero, []).append(posicion)
+
+            # Cualquier ventana de 4 dígitos, igual que buscar el año como subcadena
+            for anio in {numero[i:i + 4] for i in range(len(numero) - 3) if numero[i:i + 4].isdigit()}:
+                self._por_anio.setdefault(anio, []).append(posicion)
+
+            for ngrama in self._ngramas(numero):
+                self._por_ngrama.setdefault(ngrama, []).append(posicion)
+
+            # Año del número de contrato (formato: XXXX-2024)
+            partes = numero.split('-')
+            if len(partes) >= 2:
+                try:
+                    anio = int(partes[-1])
+                    if 2000 <= anio <= 2100:
+                        anios.add(anio)
+                except ValueError:
+                    pass
+
+        self._ordenados = sorted((numero, posicion) for posicion, numero in enumerate(self._numeros))
+        self._anios = sorted(anios, reverse=True)
+
+        # El índice aproximado se arma en segundo plano para no demorar la
+        # carga; una búsqueda que llegue antes espera a que termine
+        self._lock = threading.Lock()
+        self._doc_clave = None
+        self._lock.acquire()
+        threading.Thread(target=self._construir_aproximado, name='indice-contratos', daemon=True).start()
+
+    def _construir_aproximado(self):
+        """
+        Arma el índice de la búsqueda aproximada: un documento por campo no
+        vacío de cada contrato y, por campo, trigrama -> documentos
+        (corre en su propio hilo)
+        """
+        try:
+            doc_contrato = []
+            doc_campo = []
+            doc_ngramas = []
+            doc_clave = []
+            por_ngrama = [{} for _ in self.CAMPOS_APROXIMADOS]
+
+            for posicion, contrato in enumerate(self.contratos):
+                for campo_idx, campo in enumerate(self.CAMPOS_APROXIMADOS):
+                    clave = self.clave_campo(campo, contrato.get(campo))
+                    if not clave:
+                        continue
+
+                    doc = len(doc_contrato)
+                    indice = por_ngrama[campo_idx]
+                    ngramas = self._ngramas_clave(clave)
+                    for ngrama in ngramas:
+                        docs = indice.get(ngrama)
+                        if docs is None:
+                            indice[ngrama] = [doc]
+                        else:
+                            docs.append(doc)
+
+                    doc_contrato.append(posicion)
+                    doc_campo.append(campo_idx)
+                    doc_ngramas.append(len(ngramas))
+                    doc_clave.append(clave)
+
+            self._doc_contrato = np.array(doc_contrato, dtype=np.int32)
+            self._doc_campo = np.array(doc_campo, dtype=np.int8)
+            self._doc_ngramas = np.array(doc_ngramas, dtype=np.float64)
+            self._por_ngrama_campo = [
+                {ngrama: np.array(docs, dtype=np.int32) for ngrama, docs in indice.items()}
+                for indice in por_ngrama
+            ]
+            self._doc_clave = doc_clave
+        finally:
+            # El lock se tomó en __init__ antes de lanzar este hilo
+            self._lock.release()
+
+    @classmethod
+    def normalizar_nombre(cls, texto) -> str:
+        """Mayúsculas sin tildes, solo letras y dígitos separados por un espacio"""
+        texto = str(texto or '').upper()
+        if not texto.isascii():
+            texto = unicodedata.normalize('NFKD', texto)
+            texto = ''.join(c for c in texto if not unicodedata.combining(c))
+        return ' '.join(cls.PALABRAS.findall(texto))
+
+    @classmethod
+    def clave_numero(cls, numero) -> str:
+        """
+        Clave de un número de contrato sin separadores ni ceros a la izquierda
+        (0123-2024, 123/2024 y 1232024 tienen la misma clave)
+        """
+        grupos = cls.GRUPOS.findall(cls.normalizar_nombre(numero))
+        return ''.join(grupo.lstrip('0') or '0' if grupo.isdigit() else grupo for grupo in grupos)
+
+    @staticmethod
+    def clave_nit(nit) -> str:
+        """Dígitos del NIT sin el dígito de verificación (900.123.456-7 -> 900123456)"""
+        return re.sub(r'[^0-9]', '', str(nit or '').split('-')[0])
+
+    @classmethod
+    def clave_campo(cls, campo: str, valor) -> str:
+        """Clave normalizada de un campo para la búsqueda aproximada"""
+        if campo == 'numero_contrato':
+            return cls.clave_numero(valor)
+        if campo == 'nit':
+            return cls.clave_nit(valor)
+        return cls.normalizar_nombre(valor)
+
+    def _ngramas_clave(self, clave: str) -> set:
+        """Trigramas de una clave con un espacio a cada lado (marca inicio y fin)"""
+        return self._ngramas(f" {clave} ")
+
+    def buscar_aproximado(self, termino: str, limite: int = 20) -> List[Dict[str, any]]:
+        """
+        Búsqueda tolerante a errores por número de contrato, razón social o NIT
+
+        Cada documento (campo de un contrato) recibe un puntaje con los
+        trigramas que comparte con el término: PESO_COBERTURA por la parte
+        del término encontrada y el resto por la similitud de Dice. Si la
+        clave contiene al término completo el puntaje sube a 0.9 o más, y
+        la coincidencia exacta vale 1 (PUNTAJE_CONTIENE separa las
+        coincidencias que contienen al término de las aproximadas).
+
+        Args:
+            termino: Texto buscado
+            limite: Máximo de contratos a retornar
+
+        Returns:
+            Lista de {contrato, puntaje, campo} de mayor a menor puntaje
+        """
+        if self._doc_clave is None:
+            with self._lock:
+                pass
+
+        if not self._doc_clave or not limite:
+            return []
+
+        claves = {}
+        coincidencias = None
+        ngramas_consulta = np.zeros(len(self.CAMPOS_APROXIMADOS), dtype=np.float64)
+
+        for campo_idx, campo in enumerate(self.CAMPOS_APROXIMADOS):
+            clave = self.clave_campo(campo, termino)
+            if not clave or (campo == 'nit' and len(clave) < self.MIN_DIGITOS_NIT):
+                continue
+
+            ngramas = self._ngramas_clave(clave)
+            indice = self._por_ngrama_campo[campo_idx]
+            listas = [indice[ngrama] for ngrama in ngramas if ngrama in indice]
+            claves[campo_idx] = clave
+            ngramas_consulta[campo_idx] = len(ngramas)
+
+            if listas:
+                conteo = np.bincount(np.concatenate(listas), minlength=len(self._doc_clave))
+                coincidencias = conteo if coincidencias is None else coincidencias + conteo
+
+        if coincidencias is None:
+            return []
+
+        docs = np.nonzero(coincidencias)[0]
+        compartidos = coincidencias[docs]
+        total_consulta = ngramas_consulta[self._doc_campo[docs]]
+        cobertura = compartidos / total_consulta
+        dice = 2 * compartidos / (total_consulta + self._doc_ngramas[docs])
+        puntajes = self.PESO_COBERTURA * cobertura + (1 - self.PESO_COBERTURA) * dice
+
+        # Solo se revisan los mejores candidatos (un contrato puede aportar varios documentos)
+        revisar = max(limite * self.CANDIDATOS_POR_RESULTADO, 50)
+        if len(docs) > revisar:
+            mejores = np.argpartition(-puntajes, revisar - 1)[:revisar]
+            docs, puntajes, dice = docs[mejores], puntajes[mejores], dice[mejores]
+
+        candidatos = []
+        for doc, puntaje, similitud in zip(docs.tolist(), puntajes.tolist(), dice.tolist()):
+            campo_idx = int(self._doc_campo[doc])
+            clave_doc = self._doc_clave[doc]
+            clave = claves[campo_idx]
+
+            if clave_doc == clave:
+                puntaje = 1.0
+            elif clave in clave_doc:
+                puntaje = max(puntaje, self.PUNTAJE_CONTIENE + 0.09 * similitud)
+            else:
+                puntaje = min(puntaje, self.PUNTAJE_CONTIENE - 0.01)
+
+            if puntaje >= self.PUNTAJE_MINIMO:
+                candidatos.append((-puntaje, int(self._doc_contrato[doc]), campo_idx))
+
+        resultados = []
+        vistos = set()
+        for puntaje, posicion, campo_idx in sorted(candidatos):
+            if posicion in vistos:
+                continue
+            vistos.add(posicion)
+            resultados.append({
+                'contrato': self.contratos[posicion],
+                'puntaje': round(-puntaje, 3),
+                'campo': self.CAMPOS_APROXIMADOS[campo_idx]
+            })
+            if len(resultados) >= limite:
+                break
+
+        return resultados
+
+    def autocompletar(self, termino: str, limite: int = 10) -> List[Dict[str, any]]:
+        """
+        Sugerencias para el buscador: primero los números de contrato que
+        empiezan por el término y luego los resultados aproximados
+
+        Args:
+            termino: Texto escrito hasta ahora
+            limite: Máximo de sugerencias
+
+        Returns:
+            Lista de {contrato, puntaje, campo}
+        """
+        if not self.normalizar(termino or ''):
+            return []
+
+        sugerencias = [
+            {'contrato': contrato, 'puntaje': 1.0, 'campo': 'numero_contrato'}
+            for contrato in self.buscar_prefijo(termino, limite)
+        ]
+        vistos = {id(sugerencia['contrato']) for sugerencia in sugerencias}
+
+        if len(sugerencias) < limite:
+            for resultado in self.buscar_aproximado(termino, limite):
+                if id(resultado['contrato']) not in vistos:
+                    vistos.add(id(resultado['contrato']))
+                    sugerencias.append(resultado)
+                    if len(sugerencias) >= limite:
+                        break
+
+        return sugerencias
+
+    @staticmethod
+    def normalizar(numero_contrato) -> str:
+        """Normaliza un número de contrato (o término de búsqueda) para comparar"""
+        return str(numero_contrato).strip().lower()
+
+    def _ngramas(self, texto: str) -> set:
+        """N-gramas distintos de un texto"""
+        return {texto[i:i + self.LARGO_NGRAMA] for i in range(len(texto) - self.LARGO_NGRAMA + 1)}
+
+    def _contratos_en(self, posiciones) -> List[Dict[str, any]]:
+        """Contratos de las posiciones dadas, en orden de maestra"""
+        return [self.contratos[posicion] for posicion in sorted(posiciones)]
+
+    def obtener(self, numero_contrato: str) -> Optional[Dict[str, any]]:
+        """
+        Contrato con exactamente ese número (el primero si está repetido)
+
+        Returns:
+            Dict del contrato o None si no existe
+        """
+        posiciones = self._por_numero.get(self.normalizar(numero_contrato))
+        return self.contratos[posiciones[0]] if posiciones else None
+
+    def buscar(self, termino: str) -> List[Dict[str, any]]:
+        """
+        Contratos cuyo número contiene el término
+
+        Con términos de al menos LARGO_NGRAMA caracteres se cruzan las listas
+        de sus n-gramas y solo se verifican los candidatos; los términos más
+        cortos se comparan contra todos los números.
+
+        Args:
+            termino: Término a buscar (vacío retorna todos)
+
+        Returns:
+            Lista de contratos que coinciden
+        """
+        termino = self.normalizar(termino or '')
+        if not termino:
+            return list(self.contratos)
+
+        if len(termino) < self.LARGO_NGRAMA:
+            return [self.contratos[p] for p, numero in enumerate(self._numeros) if termino in numero]
+
+        listas = []
+        for ngrama in self._ngramas(termino):
+            lista = self._por_ngrama.get(ngrama)
+            if not lista:
+                return []
+            listas.append(lista)
+
+        # Empezar por la lista más corta
+        listas.sort(key=len)
+        candidatos = set(listas[0])
+        for lista in listas[1:]:
+            candidatos.intersection_update(lista)
+            if not candidatos:
+                return []
+
+        return self._contratos_en(p for p in candidatos if termino in self._numeros[p])
+
+    def buscar_prefijo(self, prefijo: str, limite: int = None) -> List[Dict[str, any]]:
+        """
+        Contratos cuyo número empieza por el prefijo, en orden de número
+
+        Args:
+            prefijo: Inicio del número de contrato
+            limite: Máximo de resultados (None = todos)
+
+        Returns:
+            Lista de contratos
+        """
+        prefijo = self.normalizar(prefijo or '')
+        resultados = []
+
+        for numero, posicion in self._ordenados[bisect_left(self._ordenados, (prefijo, -1)):]:
+            if not numero.startswith(prefijo) or (limite is not None and len(resultados) >= limite):
+                break
+            resultados.append(self.contratos[posicion])
+
+        return resultados
+
+    def por_anio(self, anio) -> List[Dict[str, any]]:
+        """
+        Contratos cuyo número contiene el año
+
+        Args:
+            anio: Año a filtrar (ej: 2024)
+
+        Returns:
+            Lista de contratos del año
+        """
+        anio = str(anio)
+        if len(anio) == 4 and anio.isdigit():
+            return [self.contratos[posicion] for posicion in self._por_anio.get(anio, [])]
+        return [contrato for contrato in self.contratos if anio in str(contrato['numero_contrato'])]
+
+    def anios(self) -> List[int]:
+        """Años de los números de contrato (formato XXXX-AAAA), del más reciente al más antiguo"""
+        return list(self._anios)
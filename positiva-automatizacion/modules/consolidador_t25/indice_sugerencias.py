@@ -0,0 +1,240 @@
+"""
+Índice en memoria para autocompletar nombres de carpetas de GoAnywhere
+"""
+
+import posixpath
+import re
+import stat
+import threading
+import time
+from typing import Callable, Dict, List
+
+import paramiko
+
+
+class _Nodo:
+    """
+    Nodo del trie: hijos por carácter, carpetas cuya palabra termina aquí y
+    cuántas palabras indexadas hay bajo el nodo
+    """
+
+    __slots__ = ('hijos', 'rutas', 'cantidad')
+
+    def __init__(self):
+        self.hijos = {}
+        self.rutas = set()
+        self.cantidad = 0
+
+
+class IndiceSugerencias:
+    """
+    Trie de las palabras de los nombres de carpetas ya vistas en GoAnywhere
+
+    Se siembra con el listado de la raíz y crece con cada listado que hace
+    el cliente, de modo que las consultas por prefijo se responden en
+    memoria sin ir al servidor. Cuando el listado de la raíz vence, se
+    vuelve a pedir en segundo plano y mientras tanto se responde con lo que
+    ya está indexado
+    """
+
+    # Segundos antes de volver a listar la raíz en segundo plano
+    TTL_SEGUNDOS = 10 * 60
+
+    # Separadores de palabras (los mismos de IndiceCarpetas: el guion se
+    # conserva porque forma parte del número de contrato)
+    SEPARADORES = re.compile(r'[\s_,;()\[\]]+')
+
+    def __init__(self, listar: Callable[[str], List[paramiko.SFTPAttributes]], ttl_segundos: int = None):
+        """
+        Inicializa el índice vacío
+
+        Args:
+            listar: Función que lista una carpeta en el servidor (se usa para refrescar la raíz)
+            ttl_segundos: Vigencia del listado de la raíz (por defecto TTL_SEGUNDOS)
+        """
+        self._listar = listar
+        self.ttl_segundos = ttl_segundos if ttl_segundos is not None else self.TTL_SEGUNDOS
+
+        self._lock = threading.Lock()
+        self._raiz = _Nodo()
+
+        # ruta -> (nombre, palabras) y directorio -> rutas de sus subcarpetas indexadas
+        self._carpetas = {}
+        self._subcarpetas = {}
+
+        self._refrescado = 0.0
+        self._refrescando = False
+
+        self.refrescos = 0
+        self.consultas = 0
+
+    @classmethod
+    def palabras(cls, texto: str) -> List[str]:
+        """Palabras normalizadas de un nombre o consulta"""
+        return [palabra for palabra in cls.SEPARADORES.split(texto.strip().lower()) if palabra]
+
+    def _agregar(self, ruta: str, nombre: str):
+        """
+        Indexa una carpeta por sus palabras y por las partes de las palabras
+        con guion, para que '2024' encuentre '100-2024' (llamar con el lock tomado)
+        """
+        palabras = self.palabras(nombre)
+        palabras += [parte for palabra in palabras if '-' in palabra for parte in palabra.split('-') if parte]
+        self._carpetas[ruta] = (nombre, palabras)
+
+        for palabra in set(palabras):
+            nodo = self._raiz
+            for caracter in palabra:
+                nodo = nodo.hijos.setdefault(caracter, _Nodo())
+                nodo.cantidad += 1
+            nodo.rutas.add(ruta)
+
+    def _quitar(self, ruta: str):
+        """Quita una carpeta y las subcarpetas indexadas bajo ella (llamar con el lock tomado)"""
+        for subcarpeta in self._subcarpetas.pop(ruta, ()):
+            self._quitar(subcarpeta)
+
+        entrada = self._carpetas.pop(ruta, None)
+        if entrada is None:
+            return
+
+        for palabra in set(entrada[1]):
+            camino = self._camino(palabra)
+            if camino and ruta in camino[-1].rutas:
+                camino[-1].rutas.discard(ruta)
+                for nodo in camino:
+                    nodo.cantidad -= 1
+
+    def _camino(self, palabra: str) -> List[_Nodo]:
+        """Nodos desde la raíz hasta el prefijo (lista vacía si no está indexado)"""
+        camino = []
+        nodo = self._raiz
+        for caracter in palabra:
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                return []
+            camino.append(nodo)
+        return camino
+
+    def registrar_listado(self, directorio: str, atributos: List[paramiko.SFTPAttributes]):
+        """
+        Actualiza el índice con el listado de una carpeta: agrega las
+        subcarpetas nuevas y quita las que ya no están
+
+        Args:
+            directorio: Ruta absoluta de la carpeta listada
+            atributos: Resultado de listdir_attr
+        """
+        carpetas = {
+            posixpath.join(directorio, attr.filename): attr.filename
+            for attr in atributos
+            if stat.S_ISDIR(attr.st_mode) and not attr.filename.startswith('.')
+        }
+
+        with self._lock:
+            for ruta in self._subcarpetas.get(directorio, set()) - carpetas.keys():
+                self._quitar(ruta)
+            for ruta, nombre in carpetas.items():
+                if ruta not in self._carpetas:
+                    self._agregar(ruta, nombre)
+            self._subcarpetas[directorio] = set(carpetas)
+
+            if directorio == '/':
+                self._refrescado = time.monotonic()
+
+    def refrescar_si_vencido(self):
+        """Vuelve a listar la raíz en segundo plano si su listado venció (no bloquea)"""
+        with self._lock:
+            if self._refrescando or (self._refrescado and time.monotonic() - self._refrescado <= self.ttl_segundos):
+                return
+            self._refrescando = True
+
+        threading.Thread(target=self._refrescar, name='sugerencias-sftp', daemon=True).start()
+
+    def _refrescar(self):
+        """Lista la raíz (el cliente pasa el listado a registrar_listado)"""
+        try:
+            self._listar('/')
+        except Exception as e:
+            print(f"Error refrescando índice de sugerencias: {e}")
+        finally:
+            with self._lock:
+                self._refrescando = False
+                self.refrescos += 1
+
+    def buscar(self, texto: str, limite: int = 10, bajo: str = None) -> List[Dict[str, any]]:
+        """
+        Carpetas en las que cada palabra de la consulta es prefijo de alguna
+        palabra del nombre. Primero las que tienen la palabra completa, luego
+        en orden alfabético
+
+        Args:
+            texto: Texto parcial ingresado
+            limite: Número máximo de sugerencias
+            bajo: Ruta absoluta a la que se restringen las sugerencias (None para todas)
+
+        Returns:
+            Lista de sugerencias con nombre, es_directorio y ruta
+        """
+        palabras = self.palabras(texto)
+        if not palabras:
+            return []
+
+        prefijo_bajo = posixpath.join(bajo, '') if bajo and bajo != '/' else None
+        sugerencias = []
+
+        with self._lock:
+            self.consultas += 1
+
+            # El trie se recorre desde el prefijo con menos palabras debajo (el
+            # más selectivo) y las demás palabras se verifican sobre los candidatos
+            nodos = [self._camino(palabra) for palabra in palabras]
+            if not all(nodos):
+                return []
+            nodo = min((camino[-1] for camino in nodos), key=lambda n: n.cantidad)
+
+            vistas = set()
+            pendientes = [nodo]
+            while pendientes and len(sugerencias) < limite:
+                nodo = pendientes.pop()
+
+                for ruta in sorted(nodo.rutas):
+                    if ruta in vistas:
+                        continue
+                    vistas.add(ruta)
+
+                    nombre, palabras_nombre = self._carpetas[ruta]
+                    if prefijo_bajo and not ruta.startswith(prefijo_bajo):
+                        continue
+                    if not all(any(p.startswith(q) for p in palabras_nombre) for q in palabras):
+                        continue
+
+                    sugerencias.append({'nombre': nombre, 'es_directorio': True, 'ruta': ruta})
+                    if len(sugerencias) >= limite:
+                        break
+
+                # Pila: se apilan en orden inverso para visitar en orden alfabético
+                pendientes.extend(nodo.hijos[caracter] for caracter in sorted(nodo.hijos, reverse=True))
+
+        return sugerencias
+
+    def estadisticas(self) -> Dict[str, any]:
+        """
+        Estado del índice
+
+        Returns:
+            Dict con carpetas indexadas, consultas, refrescos y segundos desde el último listado de la raíz
+        """
+        with self._lock:
+            return {
+                'carpetas': len(self._carpetas),
+                'consultas': self.consultas,
+                'refrescos': self.refrescos,
+                'segundos_desde_refresco': round(time.monotonic() - self._refrescado, 1) if self._refrescado else None,
+                'refrescando': self._refrescando
+            }
+
+    @property
+    def listo(self) -> bool:
+        """Indica si la raíz ya se indexó al menos una vez"""
+        return bool(self._refrescado)
@@ -0,0 +1,467 @@
+"""
+Gestor de trabajos en segundo plano para el consolidado masivo T25
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .goanywhere import GoAnywhereWebClient
+from .maestra_manager import MaestraManager
+from .parallel_runner import ParallelRunner
+from .checkpoint_manager import CheckpointManager
+from .download_cache import DownloadCache
+from .anexo_cache import ParsedAnexoCache
+
+
+class JobManager:
+    """Encola, ejecuta y persiste los trabajos de procesamiento masivo"""
+
+    JOBS_FOLDER = 'data/jobs_consolidador_t25'
+
+    # Trabajos simultáneos (cada uno usa su propio pool de workers SFTP)
+    MAX_JOBS_SIMULTANEOS = 1
+
+    # Estados desde los que un trabajo se puede reanudar
+    ESTADOS_REANUDABLES = ('interrumpido', 'cancelado', 'error')
+
+    def __init__(
+        self,
+        maestra: MaestraManager,
+        generar_salida: Callable[[Iterable, str, str], Dict[str, any]],
+        checkpoints: CheckpointManager = None,
+        cache: DownloadCache = None,
+        cache_parseo: ParsedAnexoCache = None
+    ):
+        """
+        Inicializa el gestor de trabajos
+
+        Args:
+            maestra: Gestor de maestra compartido
+            generar_salida: Función (servicios por contrato, nombre_base, formato) -> manifiesto
+                de la salida generada (ver ShardedWriter.cerrar)
+            checkpoints: Gestor de checkpoints donde quedan los servicios de cada contrato
+            cache: Caché de descargas compartida
+            cache_parseo: Caché de anexos procesados compartida
+        """
+        os.makedirs(self.JOBS_FOLDER, exist_ok=True)
+        self.maestra = maestra
+        self.checkpoints = checkpoints or CheckpointManager()
+        self.cache = cache
+        self.cache_parseo = cache_parseo
+        self.generar_salida = generar_salida
+        self.executor = ThreadPoolExecutor(max_workers=self.MAX_JOBS_SIMULTANEOS, thread_name_prefix='t25-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._cancelaciones = {}
+        # Cliente GoAnywhere con el que corre cada trabajo en cola o en ejecución
+        self._clientes = {}
+
+        self._cargar_jobs_existentes()
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    def _ruta_job(self, job_id: str) -> str:
+        """Ruta del archivo de estado del trabajo"""
+        return os.path.join(self.JOBS_FOLDER, f"{job_id}.json")
+
+    def _ruta_resultados(self, job_id: str) -> str:
+        """Ruta del archivo con el resumen por contrato del trabajo"""
+        return os.path.join(self.JOBS_FOLDER, f"{job_id}_resultados.jsonl")
+
+    def _guardar_job(self, job: Dict[str, any]):
+        """Guarda el estado del trabajo de forma atómica"""
+        ruta = self._ruta_job(job['id'])
+        temporal = f"{ruta}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False, default=str)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            print(f"Error guardando trabajo {job['id']}: {e}")
+
+    def _cargar_jobs_existentes(self):
+        """
+        Carga los trabajos persistidos. Los que estaban en cola o en
+        ejecución cuando el proceso se detuvo quedan como 'interrumpido'
+        """
+        for nombre in os.listdir(self.JOBS_FOLDER):
+            if not nombre.endswith('.json'):
+                continue
+
+            try:
+                with open(os.path.join(self.JOBS_FOLDER, nombre), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except Exception as e:
+                print(f"Error cargando trabajo {nombre}: {e}")
+                continue
+
+            if job.get('estado') in ('en_cola', 'en_ejecucion'):
+                job['estado'] = 'interrumpido'
+                job['contratos_actuales'] = {}
+                self._guardar_job(job)
+
+            self._jobs[job['id']] = job
+
+    def _registrar_resultado(self, job_id: str, idx: int, resultado: Dict[str, any]):
+        """
+        Agrega el resumen de un contrato al archivo de resultados del trabajo.
+        Los servicios quedan en el checkpoint del contrato
+        """
+        registro = {
+            'idx': idx,
+            'numero_contrato': resultado['numero_contrato'],
+            'success': resultado['success'],
+            'error': resultado.get('error'),
+            'total_servicios': len(resultado.get('servicios_consolidados', [])),
+            'alertas': resultado.get('alertas', [])
+        }
+        with open(self._ruta_resultados(job_id), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+    def _leer_resultados(self, job_id: str) -> Dict[str, Dict[str, any]]:
+        """
+        Lee los resúmenes ya registrados del trabajo
+
+        Returns:
+            Dict numero_contrato -> resumen
+        """
+        resultados = {}
+        ruta = self._ruta_resultados(job_id)
+
+        if not os.path.exists(ruta):
+            return resultados
+
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    # Línea incompleta por una caída a mitad de escritura
+                    continue
+                resultados[registro['numero_contrato']] = registro
+
+        return resultados
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def crear_job(
+        self,
+        cliente: GoAnywhereWebClient,
+        num_workers: int = None,
+        reanudar: bool = False,
+        incremental: bool = False,
+        formato: str = 'xlsx'
+    ) -> Dict[str, any]:
+        """
+        Crea un trabajo sobre todos los contratos de prestadores y lo encola
+
+        Args:
+            cliente: Cliente GoAnywhere conectado
+            num_workers: Workers SFTP concurrentes
+            reanudar: Reutilizar checkpoints vigentes de ejecuciones anteriores
+            incremental: Reprocesar solo los contratos cuyas entradas cambiaron
+            formato: Formato del consolidado (xlsx, csv.gz o parquet)
+
+        Returns:
+            Estado inicial del trabajo
+        """
+        contratos = self.maestra.obtener_contratos_prestadores()
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'estado': 'en_cola',
+            'creado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'iniciado': None,
+            'finalizado': None,
+            'workers': num_workers or ParallelRunner.DEFAULT_WORKERS,
+            'reanudar': reanudar,
+            'incremental': incremental,
+            'formato': formato,
+            'contratos': [c['numero_contrato'] for c in contratos],
+            'total': len(contratos),
+            'completados': 0,
+            'exitosos': 0,
+            'fallidos': 0,
+            'total_servicios': 0,
+            'alertas_por_tipo': {},
+            'contratos_actuales': {},
+            'segundos_ejecucion': 0.0,
+            'eta_segundos': None,
+            'archivo': None,
+            'archivos': [],
+            'manifiesto': None,
+            'error': None,
+            'rendimiento': None
+        }
+
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._guardar_job(job)
+
+        self._encolar(job['id'], cliente)
+        return self.obtener_job(job['id'])
+
+    def reanudar_job(self, job_id: str, cliente: GoAnywhereWebClient) -> Optional[Dict[str, any]]:
+        """
+        Reanuda un trabajo interrumpido o cancelado, omitiendo los contratos
+        ya procesados y reutilizando checkpoints vigentes para los demás
+
+        Returns:
+            Estado del trabajo o None si no existe o no es reanudable
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['estado'] not in self.ESTADOS_REANUDABLES:
+                return None
+            job['estado'] = 'en_cola'
+            job['error'] = None
+            job['reanudar'] = True
+            self._guardar_job(job)
+
+        self._encolar(job_id, cliente)
+        return self.obtener_job(job_id)
+
+    def cancelar_job(self, job_id: str) -> Optional[Dict[str, any]]:
+        """
+        Solicita la cancelación de un trabajo. Los contratos en curso
+        terminan y no se toman nuevos
+
+        Returns:
+            Estado del trabajo o None si no existe
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+
+            evento = self._cancelaciones.get(job_id)
+            if evento:
+                evento.set()
+
+            if job['estado'] == 'en_cola':
+                job['estado'] = 'cancelado'
+                self._guardar_job(job)
+
+        return self.obtener_job(job_id)
+
+    def obtener_job(self, job_id: str) -> Optional[Dict[str, any]]:
+        """
+        Obtiene el progreso de un trabajo
+
+        Returns:
+            Dict con el estado (sin la lista completa de contratos) o None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+
+            resumen = {k: v for k, v in job.items() if k != 'contratos'}
+            resumen['contratos_actuales'] = list(job['contratos_actuales'].values())
+            resumen['porcentaje'] = round(job['completados'] * 100 / job['total'], 1) if job['total'] else 100.0
+            return resumen
+
+    def listar_jobs(self) -> List[Dict[str, any]]:
+        """Lista los trabajos conocidos, del más reciente al más antiguo"""
+        with self._lock:
+            ids = sorted(self._jobs, key=lambda j: self._jobs[j]['creado'], reverse=True)
+        return [self.obtener_job(job_id) for job_id in ids]
+
+    def tiene_jobs_activos(self, cliente: GoAnywhereWebClient) -> bool:
+        """
+        Indica si hay trabajos en cola o en ejecución que usan el cliente.
+        Mientras los haya, su conexión y su pool SFTP no se deben cerrar
+        """
+        with self._lock:
+            return any(
+                self._jobs[job_id]['estado'] in ('en_cola', 'en_ejecucion')
+                for job_id, cliente_job in self._clientes.items()
+                if cliente_job is cliente
+            )
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _encolar(self, job_id: str, cliente: GoAnywhereWebClient):
+        """
+        Envía el trabajo al executor en segundo plano con su propio evento de
+        cancelación (un envío anterior del mismo trabajo conserva el suyo)
+        """
+        cancelar = threading.Event()
+        with self._lock:
+            self._cancelaciones[job_id] = cancelar
+            self._clientes[job_id] = cliente
+        self.executor.submit(self._ejecutar_job, job_id, cliente, cancelar)
+
+    def _ejecutar_job(self, job_id: str, cliente: GoAnywhereWebClient, cancelar: threading.Event):
+        """
+        Ejecuta el trabajo: procesa los contratos pendientes y genera el consolidado
+
+        Un trabajo cancelado en cola y reanudado queda dos veces en el
+        executor; solo corre el envío que lo encuentra en cola sin cancelar
+        """
+        job = self._jobs[job_id]
+
+        with self._lock:
+            if cancelar.is_set() or job['estado'] != 'en_cola':
+                return
+            job['estado'] = 'en_ejecucion'
+
+        try:
+            previos = self._leer_resultados(job_id)
+
+            with self._lock:
+                job['iniciado'] = job['iniciado'] or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                self._recalcular_contadores(job, previos)
+                self._guardar_job(job)
+
+            # Contratos pendientes, en el orden de la maestra del trabajo
+            pendientes = [
+                contrato for contrato in (
+                    self.maestra.obtener_contrato(numero) for numero in job['contratos'] if numero not in previos
+                )
+                if contrato is not None
+            ]
+
+            print(f"\nTrabajo {job_id}: {len(previos)} contratos previos, {len(pendientes)} pendientes")
+
+            inicio = time.time()
+            segundos_previos = job['segundos_ejecucion']
+            completados_previos = job['completados']
+
+            def on_inicio(idx, contrato, worker_id):
+                with self._lock:
+                    job['contratos_actuales'][str(worker_id)] = contrato['numero_contrato']
+
+            def on_resultado(idx, contrato, resultado):
+                with self._lock:
+                    self._registrar_resultado(job_id, idx, resultado)
+                    job['contratos_actuales'].pop(str(resultado.get('worker')), None)
+                    self._acumular_resultado(job, resultado)
+                    job['segundos_ejecucion'] = round(segundos_previos + (time.time() - inicio), 2)
+                    job['eta_segundos'] = self._calcular_eta(job, inicio, completados_previos)
+                    self._guardar_job(job)
+
+            runner = ParallelRunner(
+                cliente,
+                job['workers'],
+                self.maestra,
+                checkpoints=self.checkpoints,
+                reanudar=job.get('reanudar', False),
+                incremental=job.get('incremental', False),
+                cache=self.cache,
+                cache_parseo=self.cache_parseo
+            )
+            # Los servicios quedan en los checkpoints y la salida se arma desde ellos
+            ejecucion = runner.procesar(pendientes, on_inicio, on_resultado, cancelar, conservar_servicios=False)
+
+            with self._lock:
+                job['contratos_actuales'] = {}
+                job['rendimiento'] = ejecucion['rendimiento']
+                job['eta_segundos'] = None
+
+            if ejecucion['cancelado']:
+                with self._lock:
+                    job['estado'] = 'cancelado'
+                    self._guardar_job(job)
+                return
+
+            # Generar consolidado desde los checkpoints, un contrato a la vez
+            resultados = self._leer_resultados(job_id)
+            salida = self.generar_salida(
+                self._servicios_por_contrato(job, resultados),
+                'TODOS_LOS_CONTRATOS',
+                job.get('formato', 'xlsx')
+            )
+            archivos = [fragmento['archivo'] for fragmento in salida['fragmentos']]
+
+            with self._lock:
+                job['archivo'] = archivos[0] if archivos else None
+                job['archivos'] = archivos
+                job['manifiesto'] = salida['manifiesto']
+                job['estado'] = 'completado'
+                job['finalizado'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                if not salida['total_filas']:
+                    job['error'] = 'No se pudieron procesar contratos'
+                self._guardar_job(job)
+
+        except Exception as e:
+            import traceback
+            print(f"\nERROR EN TRABAJO {job_id}:")
+            print(traceback.format_exc())
+
+            with self._lock:
+                job['estado'] = 'error'
+                job['error'] = str(e)
+                job['contratos_actuales'] = {}
+                self._guardar_job(job)
+
+        finally:
+            with self._lock:
+                # Un trabajo reanudado mientras terminaba ya volvió a la cola
+                if job['estado'] not in ('en_cola', 'en_ejecucion'):
+                    self._clientes.pop(job_id, None)
+
+    def _servicios_por_contrato(
+        self,
+        job: Dict[str, any],
+        resultados: Dict[str, Dict[str, any]]
+    ) -> Iterator[Tuple[str, List[Dict[str, any]]]]:
+        """
+        Recorre los servicios de los contratos exitosos del trabajo desde sus
+        checkpoints, uno a la vez y en orden de número de contrato
+
+        Returns:
+            Iterador de (numero_contrato, servicios)
+        """
+        for numero in sorted(job['contratos'], key=str):
+            registro = resultados.get(numero)
+            if not registro or not registro['success']:
+                continue
+            checkpoint = self.checkpoints.cargar(numero)
+            if checkpoint:
+                yield numero, checkpoint['resultado']['servicios_consolidados']
+
+    def _recalcular_contadores(self, job: Dict[str, any], resultados: Dict[str, Dict[str, any]]):
+        """Reconstruye los contadores del trabajo desde los resultados persistidos"""
+        job['completados'] = 0
+        job['exitosos'] = 0
+        job['fallidos'] = 0
+        job['total_servicios'] = 0
+        job['alertas_por_tipo'] = {}
+        job['contratos_actuales'] = {}
+
+        for resultado in resultados.values():
+            self._acumular_resultado(job, resultado)
+
+    def _acumular_resultado(self, job: Dict[str, any], resultado: Dict[str, any]):
+        """Suma un resultado de contrato a los contadores del trabajo"""
+        job['completados'] += 1
+        if resultado['success']:
+            job['exitosos'] += 1
+            job['total_servicios'] += resultado.get('total_servicios', len(resultado.get('servicios_consolidados', [])))
+        else:
+            job['fallidos'] += 1
+
+        for alerta in resultado.get('alertas', []):
+            tipo = alerta.get('tipo', 'info')
+            job['alertas_por_tipo'][tipo] = job['alertas_por_tipo'].get(tipo, 0) + 1
+
+    def _calcular_eta(self, job: Dict[str, any], inicio: float, completados_previos: int) -> Optional[float]:
+        """Estima los segundos restantes según el ritmo de la ejecución actual"""
+        procesados_ahora = job['completados'] - completados_previos
+        restantes = job['total'] - job['completados']
+        if procesados_ahora <= 0:
+            return None
+        return round((time.time() - inicio) / procesados_ahora * restantes, 1)
@@ -0,0 +1,124 @@
+"""
+Caché en memoria de listados de carpetas de GoAnywhere
+"""
+
+import posixpath
+import threading
+import time
+from typing import Dict, List, Optional
+
+import paramiko
+
+
+class ListadoCache:
+    """
+    Guarda el resultado crudo de listdir_attr por ruta absoluta durante
+    TTL_SEGUNDOS, para que navegar varias veces por las mismas carpetas no
+    cueste viajes al servidor. El formato (fechas, orden) se aplica al
+    serializar, no al guardar
+    """
+
+    # Segundos que un listado se considera vigente
+    TTL_SEGUNDOS = 5 * 60
+
+    # Listados máximos guardados (se descartan primero los más antiguos)
+    MAX_ENTRADAS = 5000
+
+    def __init__(self, ttl_segundos: int = None, max_entradas: int = None):
+        """
+        Inicializa la caché
+
+        Args:
+            ttl_segundos: Vigencia de cada listado (por defecto TTL_SEGUNDOS)
+            max_entradas: Listados máximos guardados (por defecto MAX_ENTRADAS)
+        """
+        self.ttl_segundos = ttl_segundos if ttl_segundos is not None else self.TTL_SEGUNDOS
+        self.max_entradas = max_entradas or self.MAX_ENTRADAS
+
+        self._lock = threading.Lock()
+        self._listados = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    def obtener(self, ruta: str) -> Optional[List[paramiko.SFTPAttributes]]:
+        """
+        Busca el listado vigente de una carpeta
+
+        Args:
+            ruta: Ruta absoluta normalizada de la carpeta
+
+        Returns:
+            Atributos de listdir_attr o None si no hay listado vigente
+        """
+        with self._lock:
+            entrada = self._listados.get(ruta)
+
+            if entrada is None or time.monotonic() - entrada[0] > self.ttl_segundos:
+                if entrada is not None:
+                    del self._listados[ruta]
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entrada[1]
+
+    def guardar(self, ruta: str, atributos: List[paramiko.SFTPAttributes]):
+        """
+        Guarda el listado de una carpeta
+
+        Args:
+            ruta: Ruta absoluta normalizada de la carpeta
+            atributos: Resultado de listdir_attr
+        """
+        with self._lock:
+            self._listados.pop(ruta, None)
+            self._listados[ruta] = (time.monotonic(), atributos)
+
+            while len(self._listados) > self.max_entradas:
+                del self._listados[next(iter(self._listados))]
+
+    def invalidar(self, ruta: str = None, recursivo: bool = False) -> int:
+        """
+        Descarta listados guardados
+
+        Args:
+            ruta: Carpeta a descartar (None para descartar todo)
+            recursivo: Descartar también las subcarpetas de ruta
+
+        Returns:
+            Cantidad de listados descartados
+        """
+        with self._lock:
+            if ruta is None:
+                rutas = list(self._listados)
+            else:
+                prefijo = posixpath.join(ruta, '')
+                rutas = [
+                    guardada for guardada in self._listados
+                    if guardada == ruta or (recursivo and guardada.startswith(prefijo))
+                ]
+
+            for guardada in rutas:
+                del self._listados[guardada]
+            self.invalidaciones += len(rutas)
+
+            return len(rutas)
+
+    def estadisticas(self) -> Dict[str, any]:
+        """
+        Estadísticas de uso de la caché desde que se creó la instancia
+
+        Returns:
+            Dict con hits, misses, tasa de aciertos, invalidaciones y entradas
+        """
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'tasa_aciertos': round(self.hits * 100 / consultas, 1) if consultas else 0.0,
+                'invalidaciones': self.invalidaciones,
+                'entradas': len(self._listados)
+            }
@@ -2,13 +2,18 @@
 Gestor de la Maestra de Contratos Vigentes - CORREGIDO
 """
 
+import hashlib
+import json
 import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional
 from werkzeug.utils import secure_filename
 import shutil
 
+from .indice_contratos import IndiceContratos
+
 class MaestraManager:
     """Gestiona la carga, actualización y lectura de la maestra de contratos"""
     
@@ -16,12 +21,23 @@ class MaestraManager:
     MAESTRA_FOLDER = 'data/maestra'
     MAESTRA_FILENAME = 'maestra_contratos_vigentes.xlsb'
     
+    # Snapshot compilado de la maestra (junto al XLSB); cambiar la versión
+    # si cambia la forma de derivar los contratos para invalidar los existentes
+    SNAPSHOT_SUFIJO = '.snapshot.npz'
+    VERSION_SNAPSHOT = 2
+    
+    # Encabezados (palabras sin tildes) de las columnas de razón social y NIT
+    ENCABEZADOS_RAZON_SOCIAL = [('RAZON', 'SOCIAL'), ('NOMBRE', 'PROVEEDOR'), ('NOMBRE', 'PRESTADOR'), ('NOMBRE', 'CONTRATISTA')]
+    ENCABEZADOS_NIT = [('NIT',), ('IDENTIFICACION', 'PROVEEDOR'), ('DOCUMENTO', 'PROVEEDOR')]
+    
     def __init__(self):
         """Inicializa el gestor y crea carpetas necesarias"""
         os.makedirs(self.MAESTRA_FOLDER, exist_ok=True)
         self.maestra = None
         self.ultima_carga = None
         self._tipo_proveedor_col = None
+        self._contratos = None
+        self._indice = None
         
         # Intentar cargar maestra existente
         if self.tiene_maestra():
@@ -42,6 +58,10 @@ class MaestraManager:
         """
         Carga la maestra desde un archivo XLSB
         
+        Si existe un snapshot compilado del mismo archivo (mismo tamaño y fecha
+        de modificación, o mismo hash de contenido) se carga desde él sin
+        volver a leer el XLSB; si no, se lee el XLSB y se genera el snapshot.
+        
         Args:
             filepath: Ruta del archivo a cargar
             
@@ -49,74 +69,61 @@ class MaestraManager:
             Dict con success, total_contratos, total_prestadores
         """
         try:
-            from pyxlsb import open_workbook
-            
-            with open_workbook(filepath) as wb:
-                # Buscar hoja de contratos vigentes
-                hoja_contratos = None
-                for sheet_name in wb.sheets:
-                    if 'CONTRATO' in sheet_name.upper() and 'VIGENTE' in sheet_name.upper():
-                        hoja_contratos = sheet_name
-                        break
-                
-                if not hoja_contratos:
-                    # Intentar con primera hoja
-                    hoja_contratos = wb.sheets[0] if wb.sheets else None
-                
-                if not hoja_contratos:
-                    return {
-                        'success': False,
-                        'error': 'No se encontró la hoja de contratos vigentes'
-                    }
-                
-                # Leer datos
-                data = []
-                with wb.get_sheet(hoja_contratos) as sheet:
-                    for row in sheet.rows():
-                        data.append([item.v if item.v is not None else '' for item in row])
-                
-                if len(data) < 2:
-                    return {
-                        'success': False,
-                        'error': 'La maestra no contiene datos'
-                    }
-                
-                # Buscar columna "TIPO DE PROVEEDOR"
-                encabezados = data[0] if data else []
-                tipo_proveedor_col = None
-                
-                for idx, header in enumerate(encabezados):
-                    if header and 'TIPO' in str(header).upper() and 'PROVEEDOR' in str(header).upper():
-                        tipo_proveedor_col = idx
-                        break
-                
-                if tipo_proveedor_col is None:
-                    return {
-                        'success': False,
-                        'error': 'No se encontró la columna "TIPO DE PROVEEDOR"'
-                    }
-                
-                self._tipo_proveedor_col = tipo_proveedor_col
-                
-                # Contar contratos y prestadores de salud
-                total_contratos = len(data) - 1  # Excluir encabezado
-                prestadores_salud = 0
-                
-                for row in data[1:]:  # Saltar encabezado
-                    if len(row) > tipo_proveedor_col:
-                        tipo = str(row[tipo_proveedor_col]).upper()
-                        if 'PRESTADOR' in tipo and 'SALUD' in tipo:
-                            prestadores_salud += 1
-                
-                # Guardar datos en memoria
-                self.maestra = data
-                self.ultima_carga = datetime.now()
-                
+            ruta_snapshot = self._ruta_snapshot(filepath)
+            origen = self._firma_archivo(filepath)
+            
+            snapshot = self._leer_snapshot(ruta_snapshot, filepath, origen)
+            if snapshot is not None:
+                self._aplicar_snapshot(snapshot)
                 return {
                     'success': True,
+                    'total_contratos': snapshot['total_contratos'],
+                    'total_prestadores': snapshot['total_prestadores'],
+                    'desde_snapshot': True
+                }
+            
+            lectura = self._leer_xlsb(filepath)
+            if not lectura['success']:
+                return lectura
+            
+            data = lectura['data']
+            tipo_proveedor_col = lectura['tipo_proveedor_col']
+            contratos = self._compilar_contratos(data, tipo_proveedor_col)
+            
+            # Contar contratos y prestadores de salud
+            total_contratos = len(data) - 1  # Excluir encabezado
+            prestadores_salud = 0
+            
+            for row in data[1:]:  # Saltar encabezado
+                if len(row) > tipo_proveedor_col:
+                    tipo = str(row[tipo_proveedor_col]).upper()
+                    if 'PRESTADOR' in tipo and 'SALUD' in tipo:
+                        prestadores_salud += 1
+            
+            # Guardar datos en memoria
+            self.maestra = data
+            self._tipo_proveedor_col = tipo_proveedor_col
+            self._contratos = contratos
+            self._indice = IndiceContratos(contratos)
+            self.ultima_carga = datetime.now()
+            
+            try:
+                self._guardar_snapshot(ruta_snapshot, {
+                    'version': self.VERSION_SNAPSHOT,
+                    'origen': {**origen, 'sha256': self._hash_archivo(filepath)},
+                    'hoja': lectura['hoja'],
+                    'tipo_proveedor_col': tipo_proveedor_col,
                     'total_contratos': total_contratos,
                     'total_prestadores': prestadores_salud
-                }
+                })
+            except Exception as e:
+                print(f"No se pudo guardar el snapshot de la maestra: {e}")
+            
+            return {
+                'success': True,
+                'total_contratos': total_contratos,
+                'total_prestadores': prestadores_salud
+            }
                 
         except Exception as e:
             return {
@@ -124,6 +131,202 @@ class MaestraManager:
                 'error': f'Error al cargar maestra: {str(e)}'
             }
     
+    def _leer_xlsb(self, filepath: str) -> Dict[str, any]:
+        """
+        Lee la hoja de contratos vigentes del XLSB
+        
+        Returns:
+            Dict con success, data (filas), hoja y tipo_proveedor_col
+        """
+        from pyxlsb import open_workbook
+        
+        with open_workbook(filepath) as wb:
+            # Buscar hoja de contratos vigentes
+            hoja_contratos = None
+            for sheet_name in wb.sheets:
+                if 'CONTRATO' in sheet_name.upper() and 'VIGENTE' in sheet_name.upper():
+                    hoja_contratos = sheet_name
+                    break
+            
+            if not hoja_contratos:
+                # Intentar con primera hoja
+                hoja_contratos = wb.sheets[0] if wb.sheets else None
+            
+            if not hoja_contratos:
+                return {
+                    'success': False,
+                    'error': 'No se encontró la hoja de contratos vigentes'
+                }
+            
+            # Leer datos
+            data = []
+            with wb.get_sheet(hoja_contratos) as sheet:
+                for row in sheet.rows():
+                    data.append([item.v if item.v is not None else '' for item in row])
+        
+        if len(data) < 2:
+            return {
+                'success': False,
+                'error': 'La maestra no contiene datos'
+            }
+        
+        # Buscar columna "TIPO DE PROVEEDOR"
+        encabezados = data[0] if data else []
+        tipo_proveedor_col = None
+        
+        for idx, header in enumerate(encabezados):
+            if header and 'TIPO' in str(header).upper() and 'PROVEEDOR' in str(header).upper():
+                tipo_proveedor_col = idx
+                break
+        
+        if tipo_proveedor_col is None:
+            return {
+                'success': False,
+                'error': 'No se encontró la columna "TIPO DE PROVEEDOR"'
+            }
+        
+        return {
+            'success': True,
+            'data': data,
+            'hoja': hoja_contratos,
+            'tipo_proveedor_col': tipo_proveedor_col
+        }
+    
+    def _ruta_snapshot(self, filepath: str) -> str:
+        """Ruta del snapshot compilado de un archivo de maestra"""
+        return os.path.splitext(filepath)[0] + self.SNAPSHOT_SUFIJO
+    
+    @staticmethod
+    def _firma_archivo(filepath: str) -> Dict[str, int]:
+        """Tamaño y fecha de modificación (ns) del archivo"""
+        stat_info = os.stat(filepath)
+        return {'tamano': stat_info.st_size, 'mtime_ns': stat_info.st_mtime_ns}
+    
+    @staticmethod
+    def _hash_archivo(filepath: str) -> str:
+        """SHA-256 del contenido del archivo"""
+        sha = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloque)
+        return sha.hexdigest()
+    
+    def _leer_snapshot(self, ruta_snapshot: str, filepath: str, origen: Dict[str, int]) -> Optional[Dict[str, any]]:
+        """
+        Lee el snapshot si corresponde al archivo actual
+        
+        Se acepta si coinciden tamaño y fecha de modificación; si solo cambió
+        la fecha (ej. el mismo archivo subido de nuevo) se compara el hash del
+        contenido y se actualiza la firma guardada.
+        
+        Returns:
+            Meta del snapshot con sus códigos, o None si no existe, es de otra
+            versión o está desactualizado
+        """
+        if not os.path.exists(ruta_snapshot):
+            return None
+        
+        try:
+            with np.load(ruta_snapshot, allow_pickle=False) as datos:
+                snapshot = json.loads(datos['meta'].tobytes().decode('utf-8'))
+                codigos = datos['codigos']
+        except Exception as e:
+            print(f"Snapshot de maestra inválido, se regenerará: {e}")
+            return None
+        
+        if snapshot.get('version') != self.VERSION_SNAPSHOT:
+            return None
+        
+        guardado = snapshot.get('origen', {})
+        if guardado.get('tamano') != origen['tamano']:
+            return None
+        
+        if guardado.get('mtime_ns') != origen['mtime_ns']:
+            if guardado.get('sha256') != self._hash_archivo(filepath):
+                return None
+            
+            snapshot['origen'] = {**guardado, **origen}
+            try:
+                self._escribir_snapshot(ruta_snapshot, snapshot, codigos)
+            except Exception as e:
+                print(f"No se pudo actualizar la firma del snapshot de la maestra: {e}")
+        
+        snapshot['codigos'] = codigos
+        return snapshot
+    
+    def _aplicar_snapshot(self, snapshot: Dict[str, any]):
+        """Reconstruye las filas y los contratos en memoria desde el snapshot"""
+        codigos = snapshot['codigos']
+        celdas = np.empty(codigos.shape, dtype=object)
+        
+        for col, valores in enumerate(snapshot['valores']):
+            diccionario = np.empty(len(valores), dtype=object)
+            diccionario[:] = valores
+            celdas[:, col] = diccionario[codigos[:, col]]
+        
+        data = celdas.tolist()
+        longitudes = snapshot['longitudes']
+        if longitudes is not None:
+            data = [fila[:longitud] for fila, longitud in zip(data, longitudes)]
+        
+        contratos = snapshot['contratos']
+        for contrato in contratos:
+            contrato['datos_fila'] = data[contrato['fila'] - 1]
+        
+        self.maestra = data
+        self._tipo_proveedor_col = snapshot['tipo_proveedor_col']
+        self._contratos = contratos
+        self._indice = IndiceContratos(contratos)
+        self.ultima_carga = datetime.now()
+    
+    def _guardar_snapshot(self, ruta_snapshot: str, meta: Dict[str, any]):
+        """
+        Guarda la maestra cargada como snapshot columnar: por cada columna
+        sus valores distintos (JSON, conservan el tipo) y una matriz de
+        códigos int32 fila x columna, más los contratos ya derivados
+        """
+        ancho = max((len(row) for row in self.maestra), default=0)
+        longitudes = [len(row) for row in self.maestra]
+        codigos = np.zeros((len(self.maestra), ancho), dtype=np.int32)
+        valores = []
+        
+        for col in range(ancho):
+            # La clave incluye el tipo para no mezclar 1, 1.0 y True
+            indice = {}
+            distintos = []
+            columna = []
+            for row in self.maestra:
+                valor = row[col] if col < len(row) else ''
+                clave = (type(valor), valor)
+                codigo = indice.get(clave)
+                if codigo is None:
+                    codigo = indice[clave] = len(distintos)
+                    distintos.append(valor)
+                columna.append(codigo)
+            codigos[:, col] = columna
+            valores.append(distintos)
+        
+        snapshot = dict(meta)
+        snapshot['valores'] = valores
+        snapshot['longitudes'] = None if len(set(longitudes)) <= 1 else longitudes
+        snapshot['contratos'] = [
+            {clave: valor for clave, valor in contrato.items() if clave != 'datos_fila'}
+            for contrato in self._contratos
+        ]
+        
+        self._escribir_snapshot(ruta_snapshot, snapshot, codigos)
+    
+    @staticmethod
+    def _escribir_snapshot(ruta_snapshot: str, meta: Dict[str, any], codigos):
+        """Escribe el snapshot (npz sin pickle) de forma atómica"""
+        temporal = f"{ruta_snapshot}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            temporal,
+            meta=np.frombuffer(json.dumps(meta, ensure_ascii=False, default=str).encode('utf-8'), dtype=np.uint8),
+            codigos=codigos
+        )
+        os.replace(temporal, ruta_snapshot)
+    
     def subir_maestra(self, archivo_stream, filename: str) -> Dict[str, any]:
         """
         Sube y guarda una nueva maestra
@@ -241,27 +444,60 @@ class MaestraManager:
         Returns:
             Lista de diccionarios con información de contratos
         """
+        indice = self._obtener_indice()
+        return list(indice.contratos) if indice else []
+    
+    def _obtener_indice(self) -> Optional[IndiceContratos]:
+        """Índice de contratos de la maestra cargada (la carga si aún no está en memoria)"""
         if self.maestra is None:
             if self.tiene_maestra():
                 ruta = os.path.join(self.MAESTRA_FOLDER, self.MAESTRA_FILENAME)
                 self.cargar_maestra(ruta)
             else:
-                return []
+                return None
         
-        if self.maestra is None or self._tipo_proveedor_col is None:
-            return []
+        return self._indice
+    
+    def obtener_contrato(self, numero_contrato: str) -> Optional[Dict[str, any]]:
+        """
+        Busca un contrato por su número exacto (sin distinguir mayúsculas ni espacios al borde)
         
+        Args:
+            numero_contrato: Número de contrato
+            
+        Returns:
+            Dict del contrato o None si no existe
+        """
+        indice = self._obtener_indice()
+        return indice.obtener(numero_contrato) if indice else None
+    
+    def _compilar_contratos(self, data: list, tipo_proveedor_col: int) -> List[Dict[str, any]]:
+        """
+        Deriva los contratos de prestadores de salud de las filas de la maestra
+        (se hace una vez por carga y queda guardado en el snapshot)
+        
+        Args:
+            data: Filas de la maestra (la primera es el encabezado)
+            tipo_proveedor_col: Índice de la columna "TIPO DE PROVEEDOR"
+            
+        Returns:
+            Lista de diccionarios con información de contratos
+        """
         contratos = []
         
         # Columna L = índice 11, Columna M = índice 12
         numero_contrato_col = 11
         fecha_inicial_col = 12
         
-        for idx, row in enumerate(self.maestra[1:], start=2):  # Empezar desde fila 2
-            if len(row) <= self._tipo_proveedor_col:
+        # Razón social y NIT se ubican por encabezado (None si no están)
+        razon_social_col = self._buscar_columna(data[0], self.ENCABEZADOS_RAZON_SOCIAL)
+        nit_col = self._buscar_columna(data[0], self.ENCABEZADOS_NIT)
+        
+        for idx, row in enumerate(data[1:], start=2):  # Empezar desde fila 2
+            if len(row) <= tipo_proveedor_col:
                 continue
             
-            tipo = str(row[self._tipo_proveedor_col]).upper()
+            tipo = str(row[tipo_proveedor_col]).upper()
             
             if 'PRESTADOR' in tipo and 'SALUD' in tipo:
                 # Extraer información del contrato
@@ -280,7 +516,9 @@ class MaestraManager:
                         'fila': idx,
                         'numero_contrato': numero_contrato,
                         'fecha_inicial': fecha_inicial,
-                        'tipo_proveedor': row[self._tipo_proveedor_col],
+                        'tipo_proveedor': row[tipo_proveedor_col],
+                        'razon_social': self._texto_celda(row, razon_social_col),
+                        'nit': self._texto_celda(row, nit_col),
                         'datos_fila': row,
                         'otrosi': self._extraer_otrosi(row),
                         'actas': self._extraer_actas(row)
@@ -290,6 +528,32 @@ class MaestraManager:
         
         return contratos
     
+    @staticmethod
+    def _buscar_columna(encabezados: list, patrones: List[tuple]) -> Optional[int]:
+        """
+        Índice de la primera columna cuyo encabezado contiene todas las
+        palabras de alguno de los patrones (en orden de prioridad)
+        """
+        normalizados = [IndiceContratos.normalizar_nombre(encabezado) for encabezado in encabezados]
+        
+        for palabras in patrones:
+            for idx, encabezado in enumerate(normalizados):
+                if all(palabra in encabezado.split() for palabra in palabras):
+                    return idx
+        
+        return None
+    
+    @staticmethod
+    def _texto_celda(row: list, col: Optional[int]) -> str:
+        """Valor de una celda como texto (los números enteros sin decimales)"""
+        if col is None or len(row) <= col or row[col] in ('', None):
+            return ''
+        
+        valor = row[col]
+        if isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        return str(valor).strip()
+    
     def buscar_contrato(self, termino_busqueda: str) -> List[Dict[str, any]]:
         """
         Busca contratos por número
@@ -300,21 +564,55 @@ class MaestraManager:
         Returns:
             Lista de contratos que coinciden
         """
-        contratos = self.obtener_contratos_prestadores()
+        indice = self._obtener_indice()
+        return indice.buscar(termino_busqueda) if indice else []
+    
+    def buscar_contrato_aproximado(self, termino_busqueda: str, limite: int = 20) -> List[Dict[str, any]]:
+        """
+        Busca contratos por número, razón social o NIT tolerando errores de
+        digitación y diferencias de formato (guiones, ceros a la izquierda)
         
-        if not termino_busqueda:
-            return contratos
+        Args:
+            termino_busqueda: Término a buscar
+            limite: Máximo de contratos a retornar
+            
+        Returns:
+            Lista de contratos ordenados por puntaje (cada uno con 'puntaje' y 'coincidencia')
+        """
+        indice = self._obtener_indice()
+        if not indice or not termino_busqueda:
+            return []
         
-        termino_lower = termino_busqueda.lower().strip()
+        return [
+            {**resultado['contrato'], 'puntaje': resultado['puntaje'], 'coincidencia': resultado['campo']}
+            for resultado in indice.buscar_aproximado(termino_busqueda, limite)
+        ]
+    
+    def sugerir_contratos(self, termino: str, limite: int = 10) -> List[Dict[str, any]]:
+        """
+        Sugerencias de autocompletado para el buscador de contratos
         
-        resultados = []
-        for contrato in contratos:
-            numero = str(contrato['numero_contrato']).lower()
+        Args:
+            termino: Texto escrito hasta ahora
+            limite: Máximo de sugerencias
             
-            if termino_lower in numero:
-                resultados.append(contrato)
+        Returns:
+            Lista de dicts con numero_contrato, razon_social, nit, puntaje y coincidencia
+        """
+        indice = self._obtener_indice()
+        if not indice:
+            return []
         
-        return resultados
+        return [
+            {
+                'numero_contrato': resultado['contrato']['numero_contrato'],
+                'razon_social': resultado['contrato'].get('razon_social', ''),
+                'nit': resultado['contrato'].get('nit', ''),
+                'puntaje': resultado['puntaje'],
+                'coincidencia': resultado['campo']
+            }
+            for resultado in indice.autocompletar(termino, limite)
+        ]
     
     def obtener_contratos_por_anio(self, anio: int) -> List[Dict[str, any]]:
         """
@@ -326,16 +624,8 @@ class MaestraManager:
         Returns:
             Lista de contratos del año
         """
-        contratos = self.obtener_contratos_prestadores()
-        
-        contratos_anio = []
-        for contrato in contratos:
-            numero = str(contrato['numero_contrato'])
-            
-            if str(anio) in numero:
-                contratos_anio.append(contrato)
-        
-        return contratos_anio
+        indice = self._obtener_indice()
+        return indice.por_anio(anio) if indice else []
     
     def obtener_anios_disponibles(self) -> List[int]:
         """
@@ -344,22 +634,8 @@ class MaestraManager:
         Returns:
             Lista de años ordenados
         """
-        contratos = self.obtener_contratos_prestadores()
-        
-        anios = set()
-        for contrato in contratos:
-            numero = str(contrato['numero_contrato'])
-            # Buscar año en el número de contrato (formato: XXXX-2024)
-            partes = numero.split('-')
-            if len(partes) >= 2:
-                try:
-                    anio = int(partes[-1])
-                    if 2000 <= anio <= 2100:
-                        anios.add(anio)
-                except ValueError:
-                    pass
-        
-        return sorted(anios, reverse=True)
+        indice = self._obtener_indice()
+        return indice.anios() if indice else []
     
     def _extraer_otrosi(self, row: list) -> List[Dict[str, any]]:
         """
@@ -0,0 +1,378 @@
+"""
+Ejecución paralela del procesamiento masivo T25
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .goanywhere import GoAnywhereWebClient
+from .consolidator import ConsolidadorT25
+from .maestra_manager import MaestraManager
+from .checkpoint_manager import CheckpointManager
+from .download_cache import DownloadCache
+from .anexo_cache import ParsedAnexoCache
+from .indice_carpetas import IndiceCarpetas
+from .etapa_parseo import EtapaParseo
+
+
+class ParallelRunner:
+    """Procesa contratos en paralelo con un pool acotado de conexiones SFTP"""
+
+    # Número de workers por defecto y máximo permitido
+    DEFAULT_WORKERS = 4
+    MAX_WORKERS = 16
+
+    def __init__(
+        self,
+        cliente_base: GoAnywhereWebClient,
+        num_workers: int = None,
+        maestra: MaestraManager = None,
+        checkpoints: CheckpointManager = None,
+        reanudar: bool = False,
+        cache: DownloadCache = None,
+        cache_parseo: ParsedAnexoCache = None,
+        incremental: bool = False,
+        procesos_parseo: int = None
+    ):
+        """
+        Inicializa el ejecutor paralelo
+
+        Args:
+            cliente_base: Cliente GoAnywhere conectado de la sesión (lo comparten todos los workers)
+            num_workers: Número de workers concurrentes (cada uno toma canales del pool SFTP)
+            maestra: Gestor de maestra compartido por los consolidadores
+            checkpoints: Gestor de checkpoints donde se guarda cada contrato terminado
+            reanudar: Si True, reutiliza los checkpoints vigentes en lugar de reprocesar
+            cache: Caché de descargas compartida por los workers
+            cache_parseo: Caché de anexos procesados compartida por los workers
+            incremental: Si True, solo reprocesa contratos cuyo listado de TARIFAS/ACTAS
+                o datos de maestra cambiaron desde el último checkpoint
+            procesos_parseo: Procesos de la etapa de parseo que comparten los workers
+                (None para EtapaParseo.PROCESOS, 0 para parsear en los hilos de los workers)
+        """
+        self.cliente_base = cliente_base
+        self.num_workers = max(1, min(num_workers or self.DEFAULT_WORKERS, self.MAX_WORKERS))
+        self.maestra = maestra
+        self.checkpoints = checkpoints
+        self.reanudar = reanudar
+        self.incremental = incremental
+        self.cache = cache
+        self.cache_parseo = cache_parseo
+        self.procesos_parseo = procesos_parseo
+        self._lock = threading.Lock()
+
+    def _crear_workers(self, total_contratos: int, etapa_parseo: Optional[EtapaParseo]) -> List[Dict[str, any]]:
+        """
+        Crea los workers: todos usan el cliente de la sesión (trabaja con
+        rutas absolutas, así que no hay estado de directorio que proteger) y
+        toman canales de su pool SFTP. También comparten un índice de
+        carpetas raíz, de modo que la raíz se lista una vez por ejecución, y
+        la etapa de parseo, así los hilos solo descargan
+
+        Args:
+            total_contratos: Total de contratos (no se crean más workers que contratos)
+            etapa_parseo: Pool de procesos de parseo (None para parsear en cada hilo)
+
+        Returns:
+            Lista de workers con su cliente y consolidador
+        """
+        cantidad = max(1, min(self.num_workers, total_contratos))
+        workers = []
+        indice_carpetas = IndiceCarpetas()
+
+        for numero in range(1, cantidad + 1):
+            workers.append({
+                'id': numero,
+                'cliente': self.cliente_base,
+                'consolidador': ConsolidadorT25(
+                    self.cliente_base, self.maestra, self.cache, self.cache_parseo, indice_carpetas,
+                    etapa_parseo=etapa_parseo
+                ),
+                'contratos': 0,
+                'exitosos': 0,
+                'reutilizados': 0,
+                'segundos': 0.0
+            })
+
+        return workers
+
+    def procesar(
+        self,
+        contratos: List[Dict[str, any]],
+        on_inicio: Optional[Callable] = None,
+        on_resultado: Optional[Callable] = None,
+        cancelar: Optional[threading.Event] = None,
+        conservar_servicios: bool = True
+    ) -> Dict[str, any]:
+        """
+        Procesa los contratos en paralelo y combina los resultados en el
+        orden de la maestra
+
+        Args:
+            contratos: Contratos de la maestra (en orden)
+            on_inicio: Callback (idx, contrato, worker_id) al iniciar un contrato
+            on_resultado: Callback (idx, contrato, resultado) al terminar un contrato
+                (ambos se llaman desde los hilos de los workers, sin el lock del
+                runner: deben ser seguros entre hilos)
+            cancelar: Evento que detiene la toma de nuevos contratos
+            conservar_servicios: Si False, los servicios de cada contrato se
+                descartan después de on_resultado (quien los necesite los escribe
+                en ese callback) y servicios_totales queda vacío
+
+        Returns:
+            Dict con resultados (en orden), servicios_totales, alertas y rendimiento
+        """
+        total = len(contratos)
+        resultados = [None] * total
+
+        pendientes = queue.Queue()
+        for idx, contrato in enumerate(contratos):
+            pendientes.put((idx, contrato))
+
+        # Cada corrida parte de listados frescos; dentro de ella se reutilizan
+        self.cliente_base.invalidar_listados()
+
+        # Etapa de parseo: los workers descargan y entregan los anexos a un pool de procesos
+        etapa_parseo = None
+        if self.procesos_parseo != 0:
+            etapa_parseo = EtapaParseo(self.procesos_parseo, cache_parseo=self.cache_parseo)
+
+        workers = self._crear_workers(total, etapa_parseo)
+
+        print(f"Workers SFTP activos: {len(workers)}")
+        if etapa_parseo is not None:
+            print(f"Procesos de parseo: {etapa_parseo.procesos} (hasta {etapa_parseo.max_en_cola} anexos en cola)")
+
+        inicio = time.time()
+        cache_inicial = self.cache.estadisticas() if self.cache else None
+        parseo_inicial = self.cache_parseo.estadisticas() if self.cache_parseo else None
+
+        def ejecutar_worker(worker):
+            while True:
+                if cancelar is not None and cancelar.is_set():
+                    return
+
+                try:
+                    idx, contrato = pendientes.get_nowait()
+                except queue.Empty:
+                    return
+
+                if on_inicio:
+                    on_inicio(idx, contrato, worker['id'])
+
+                inicio_contrato = time.time()
+                resultado = self._procesar_contrato(worker, contrato)
+                resultado['worker'] = worker['id']
+                resultados[idx] = resultado
+
+                worker['contratos'] += 1
+                worker['segundos'] += time.time() - inicio_contrato
+                if resultado['success']:
+                    worker['exitosos'] += 1
+                if resultado.get('desde_checkpoint'):
+                    worker['reutilizados'] += 1
+
+                with self._lock:
+                    completados = sum(1 for r in resultados if r is not None)
+                    estado = 'Exitoso' if resultado['success'] else f"Error: {resultado.get('error', 'Desconocido')}"
+                    if resultado.get('desde_checkpoint'):
+                        estado += ' (checkpoint)'
+                    print(f"  [W{worker['id']}] {completados}/{total} {contrato['numero_contrato']}: {estado}")
+
+                # Fuera del lock: un callback lento (escritura a disco) no frena a los demás workers
+                if on_resultado:
+                    on_resultado(idx, contrato, resultado)
+
+                if not conservar_servicios:
+                    resultado['total_servicios'] = len(resultado.get('servicios_consolidados', []))
+                    resultado['servicios_consolidados'] = []
+
+        try:
+            hilos = []
+            for worker in workers:
+                hilo = threading.Thread(target=ejecutar_worker, args=(worker,), name=f"t25-worker-{worker['id']}", daemon=True)
+                hilo.start()
+                hilos.append(hilo)
+
+            for hilo in hilos:
+                hilo.join()
+        finally:
+            if etapa_parseo is not None:
+                etapa_parseo.cerrar()
+            if self.cache:
+                self.cache.guardar()
+
+        duracion = time.time() - inicio
+
+        # Combinar resultados en orden de maestra
+        servicios_totales = []
+        alertas = []
+        for resultado in resultados:
+            if resultado is None:
+                continue
+            if resultado['success']:
+                servicios_totales.extend(resultado['servicios_consolidados'])
+            alertas.extend(resultado.get('alertas', []))
+
+        rendimiento = self._generar_reporte(workers, duracion)
+        rendimiento['pool_sftp'] = self.cliente_base.metricas_pool()
+        rendimiento['listados_sftp'] = self.cliente_base.metricas_listados()
+        if etapa_parseo is not None:
+            rendimiento['etapas'] = self._reporte_etapas(workers, duracion, etapa_parseo)
+        if self.cache:
+            rendimiento['cache_descargas'] = self._reporte_cache(cache_inicial, self.cache.estadisticas())
+        if self.cache_parseo:
+            parseo_final = self.cache_parseo.estadisticas()
+            hits = parseo_final['hits'] - parseo_inicial['hits']
+            misses = parseo_final['misses'] - parseo_inicial['misses']
+            rendimiento['cache_parseo'] = {
+                'hits': hits,
+                'misses': misses,
+                'tasa_aciertos': round(hits * 100 / (hits + misses), 1) if hits + misses else 0.0
+            }
+
+        return {
+            'cancelado': cancelar is not None and cancelar.is_set(),
+            'resultados': resultados,
+            'servicios_totales': servicios_totales,
+            'alertas': alertas,
+            'rendimiento': rendimiento
+        }
+
+    def _procesar_contrato(self, worker: Dict[str, any], contrato: Dict[str, any]) -> Dict[str, any]:
+        """
+        Procesa un contrato con el consolidador del worker, reutilizando el
+        checkpoint vigente en modo reanudar o incremental y guardando el
+        nuevo resultado
+
+        Args:
+            worker: Worker que procesa el contrato
+            contrato: Información del contrato de la maestra
+
+        Returns:
+            Resultado del contrato
+        """
+        if self.checkpoints and self.incremental:
+            resultado = self.checkpoints.obtener_sin_cambios(contrato, worker['cliente'])
+            if resultado is not None:
+                return resultado
+        elif self.checkpoints and self.reanudar:
+            resultado = self.checkpoints.obtener_valido(contrato, worker['cliente'])
+            if resultado is not None:
+                return resultado
+
+        resultado = worker['consolidador'].procesar_contrato(contrato)
+
+        if self.checkpoints:
+            try:
+                self.checkpoints.guardar(contrato, resultado)
+            except Exception as e:
+                # Sin checkpoint el contrato no llega a la salida del trabajo: se marca fallido
+                mensaje = f"No se pudo guardar el checkpoint: {e}"
+                worker['consolidador'].agregar_alerta('error', mensaje, contrato['numero_contrato'])
+                resultado['success'] = False
+                resultado['error'] = mensaje
+                resultado['alertas'] = worker['consolidador'].alertas
+
+        return resultado
+
+    def _generar_reporte(self, workers: List[Dict[str, any]], duracion: float) -> Dict[str, any]:
+        """
+        Genera el reporte de throughput de la ejecución
+
+        Args:
+            workers: Workers utilizados
+            duracion: Duración total en segundos
+
+        Returns:
+            Dict con contratos/minuto, bytes/segundo y detalle por worker
+        """
+        detalle = []
+        bytes_totales = 0
+
+        for worker in workers:
+            bytes_worker = worker['consolidador'].bytes_descargados
+            bytes_totales += bytes_worker
+            detalle.append({
+                'worker': worker['id'],
+                'contratos': worker['contratos'],
+                'exitosos': worker['exitosos'],
+                'reutilizados': worker['reutilizados'],
+                'segundos': round(worker['segundos'], 2),
+                'segundos_descarga': round(worker['consolidador'].segundos_descarga, 2),
+                'segundos_espera_parseo': round(worker['consolidador'].segundos_espera_parseo, 2),
+                'bytes_descargados': bytes_worker
+            })
+
+        procesados = sum(worker['contratos'] for worker in workers)
+        duracion_segura = duracion if duracion > 0 else 1e-9
+
+        return {
+            'workers': len(workers),
+            'total_contratos': procesados,
+            'contratos_reutilizados': sum(worker['reutilizados'] for worker in workers),
+            'duracion_segundos': round(duracion, 2),
+            'contratos_por_minuto': round(procesados * 60 / duracion_segura, 2),
+            'bytes_descargados': bytes_totales,
+            'bytes_por_segundo': round(bytes_totales / duracion_segura, 2),
+            'detalle_workers': detalle
+        }
+
+    def _reporte_etapas(
+        self,
+        workers: List[Dict[str, any]],
+        duracion: float,
+        etapa_parseo: EtapaParseo
+    ) -> Dict[str, any]:
+        """
+        Tiempos de la descarga (hilos de los workers) y del parseo (procesos
+        de la etapa). La etapa con mayor ocupación es el cuello de botella;
+        contrapresión alta también indica que el parseo no da abasto
+
+        Args:
+            workers: Workers utilizados
+            duracion: Duración total en segundos
+            etapa_parseo: Etapa de parseo de la ejecución
+
+        Returns:
+            Dict con la descarga, el parseo y la etapa que limita el throughput
+        """
+        segundos_descarga = sum(worker['consolidador'].segundos_descarga for worker in workers)
+        descarga = {
+            'hilos': len(workers),
+            'segundos': round(segundos_descarga, 2),
+            'segundos_espera_parseo': round(sum(worker['consolidador'].segundos_espera_parseo for worker in workers), 2),
+            'ocupacion': round(segundos_descarga * 100 / ((duracion or 1e-9) * len(workers)), 1)
+        }
+        parseo = etapa_parseo.estadisticas()
+
+        return {
+            'descarga': descarga,
+            'parseo': parseo,
+            'cuello_de_botella': 'parseo' if parseo['ocupacion'] > descarga['ocupacion'] else 'descarga'
+        }
+
+    def _reporte_cache(self, inicial: Dict[str, any], final: Dict[str, any]) -> Dict[str, any]:
+        """
+        Calcula el uso de la caché de descargas durante esta ejecución
+
+        Args:
+            inicial: Estadísticas de la caché al iniciar
+            final: Estadísticas de la caché al terminar
+
+        Returns:
+            Dict con hits, misses, tasa de aciertos y bytes ahorrados de la ejecución
+        """
+        hits = final['hits'] - inicial['hits']
+        misses = final['misses'] - inicial['misses']
+        consultas = hits + misses
+
+        return {
+            'hits': hits,
+            'misses': misses,
+            'tasa_aciertos': round(hits * 100 / consultas, 1) if consultas else 0.0,
+            'bytes_ahorrados': final['bytes_ahorrados'] - inicial['bytes_ahorrados'],
+            'bytes_en_cache': final['bytes_en_cache']
+        }
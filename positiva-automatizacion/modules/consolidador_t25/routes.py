@@ -2,8 +2,9 @@
 Rutas para el módulo Consolidador T25
 """
 
-from flask import Blueprint, render_template, request, jsonify, session, send_file
+from flask import Blueprint, render_template, request, jsonify, session, send_file, Response, stream_with_context
 from werkzeug.utils import secure_filename
+import json
 import os
 import uuid
 from datetime import datetime
@@ -11,7 +12,19 @@ from datetime import datetime
 from .goanywhere import GoAnywhereWebClient
 from .consolidator import ConsolidadorT25
 from .maestra_manager import MaestraManager
+from .indice_contratos import IndiceContratos
 from .stats_manager import StatsManager
+from .parallel_runner import ParallelRunner
+from .job_manager import JobManager
+from .checkpoint_manager import CheckpointManager
+from .download_cache import DownloadCache
+from .anexo_cache import ParsedAnexoCache
+from .sharded_writer import ShardedWriter
+from utils.excel_export import ExcelStreamWriter
+from utils.columnar_export import (
+    FORMATOS_SALIDA, normalizar_formato, formatos_disponibles, formato_de_archivo,
+    mimetype_de_archivo, escribir_columnar, convertir_xlsx
+)
 
 consolidador_t25_bp = Blueprint(
     'consolidador_t25',
@@ -23,6 +36,16 @@ consolidador_t25_bp = Blueprint(
 # Managers globales
 maestra_manager = MaestraManager()
 stats_manager = StatsManager()
+checkpoint_manager = CheckpointManager()
+download_cache = DownloadCache()
+parsed_anexo_cache = ParsedAnexoCache()
+job_manager = JobManager(
+    maestra_manager,
+    lambda servicios_por_contrato, nombre_base, formato: generar_salida_job(servicios_por_contrato, nombre_base, formato),
+    checkpoint_manager,
+    download_cache,
+    parsed_anexo_cache
+)
 
 # Almacenamiento de clientes SFTP por sesión
 clientes_sftp = {}
@@ -33,6 +56,17 @@ OUTPUT_FOLDER = 'output/consolidador_t25'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
+# Resultados de la búsqueda de contratos y del autocompletado
+LIMITE_BUSQUEDA = 20
+LIMITE_SUGERENCIAS = 10
+LIMITE_BUSQUEDA_MAX = 100
+
+# Búsqueda de archivos en GoAnywhere (resultados y segundos por defecto / máximos)
+RESULTADOS_ARCHIVOS = 100
+RESULTADOS_ARCHIVOS_MAX = 1000
+TIEMPO_BUSQUEDA_ARCHIVOS = 30
+TIEMPO_BUSQUEDA_ARCHIVOS_MAX = 120
+
 
 @consolidador_t25_bp.route('/')
 def index():
@@ -156,6 +190,14 @@ def desconectar_goanywhere():
         
         if session_id and session_id in clientes_sftp:
             cliente = clientes_sftp[session_id]
+            
+            # Los trabajos en segundo plano usan el pool SFTP de la sesión
+            if job_manager.tiene_jobs_activos(cliente):
+                return jsonify({
+                    'success': False,
+                    'error': 'Hay trabajos en cola o en ejecución con esta conexión. Cancélalos o espera a que terminen'
+                }), 409
+            
             cliente.disconnect()
             del clientes_sftp[session_id]
         
@@ -184,9 +226,7 @@ def estado_goanywhere():
         
         cliente = clientes_sftp[session_id]
         
-        return jsonify({
-            'conectado': cliente.is_connected()
-        }), 200
+        return jsonify(cliente.get_connection_status()), 200
     
     except Exception as e:
         return jsonify({
@@ -195,6 +235,96 @@ def estado_goanywhere():
         }), 500
 
 
+@consolidador_t25_bp.route('/goanywhere/buscar')
+def buscar_archivos_goanywhere():
+    """
+    Busca archivos y carpetas en GoAnywhere y envía cada coincidencia como
+    evento (server-sent events) apenas se encuentra, terminando con un
+    evento 'fin' con el resumen (timeout y truncado indican que el
+    recorrido no cubrió todo el árbol)
+    """
+    try:
+        session_id = session.get('session_id')
+        
+        if not session_id or session_id not in clientes_sftp:
+            return jsonify({
+                'success': False,
+                'error': 'No hay conexión a GoAnywhere'
+            }), 400
+        
+        termino = request.args.get('q', '').strip()
+        
+        if not termino:
+            return jsonify({
+                'success': False,
+                'error': 'Debe proporcionar un término de búsqueda'
+            }), 400
+        
+        cliente = clientes_sftp[session_id]
+        ruta = request.args.get('ruta') or '.'
+        max_resultados = entero_positivo(request.args.get('max_resultados') or RESULTADOS_ARCHIVOS)
+        max_tiempo = entero_positivo(request.args.get('max_tiempo') or TIEMPO_BUSQUEDA_ARCHIVOS)
+        
+        if max_resultados is None or max_tiempo is None:
+            return jsonify({
+                'success': False,
+                'error': 'max_resultados y max_tiempo deben ser enteros positivos'
+            }), 400
+        
+        max_resultados = min(max_resultados, RESULTADOS_ARCHIVOS_MAX)
+        max_tiempo = min(max_tiempo, TIEMPO_BUSQUEDA_ARCHIVOS_MAX)
+        
+        def eventos():
+            try:
+                for evento, datos in cliente.iterar_busqueda(termino, ruta, max_resultados, max_tiempo):
+                    yield f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+        
+        return Response(
+            stream_with_context(eventos()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@consolidador_t25_bp.route('/goanywhere/sugerencias')
+def sugerir_carpetas_goanywhere():
+    """Autocompletado de carpetas de GoAnywhere desde el índice en memoria (no consulta el servidor)"""
+    try:
+        session_id = session.get('session_id')
+        termino = request.args.get('q', '').strip()
+        limite = entero_positivo(request.args.get('limite') or LIMITE_SUGERENCIAS)
+        
+        if limite is None:
+            return jsonify({
+                'success': False,
+                'error': 'El límite debe ser un entero positivo'
+            }), 400
+        
+        limite = min(limite, LIMITE_BUSQUEDA_MAX)
+        
+        if not session_id or session_id not in clientes_sftp or not termino:
+            return jsonify({'success': True, 'sugerencias': []}), 200
+        
+        cliente = clientes_sftp[session_id]
+        resultado = cliente.get_suggestions(termino, request.args.get('ruta') or None, limite)
+        
+        return jsonify(resultado), 200 if resultado['success'] else 500
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ============================================================================
 # BÚSQUEDA DE CONTRATOS
 # ============================================================================
@@ -218,16 +348,32 @@ def buscar_contrato():
                 'error': 'No hay maestra cargada'
             }), 400
         
-        contratos = maestra_manager.buscar_contrato(numero_contrato)
+        limite = data.get('limite')
+        limite = entero_positivo(LIMITE_BUSQUEDA if limite in (None, '') else limite)
         
-        if not contratos:
+        if limite is None:
             return jsonify({
                 'success': False,
-                'error': f'Contrato {numero_contrato} no encontrado en la maestra'
+                'error': 'El límite debe ser un entero positivo'
+            }), 400
+        
+        limite = min(limite, LIMITE_BUSQUEDA_MAX)
+        
+        # Resultados ordenados por puntaje (exactos primero, luego aproximados)
+        contratos = maestra_manager.buscar_contrato_aproximado(str(numero_contrato), limite)
+        
+        # Sin coincidencia exacta ni contratos que contengan el término, los
+        # aproximados solo se ofrecen como sugerencias
+        if not contratos or contratos[0]['puntaje'] < IndiceContratos.PUNTAJE_CONTIENE:
+            return jsonify({
+                'success': False,
+                'error': f'Contrato {numero_contrato} no encontrado en la maestra',
+                'sugerencias': contratos
             }), 404
         
         return jsonify({
             'success': True,
+            'exacto': contratos[0]['puntaje'] == 1.0,
             'contratos': contratos
         }), 200
     
@@ -238,6 +384,36 @@ def buscar_contrato():
         }), 500
 
 
+@consolidador_t25_bp.route('/buscar-contrato/sugerencias')
+def sugerir_contratos():
+    """Autocompletado de contratos por número, razón social o NIT"""
+    try:
+        termino = request.args.get('q', '').strip()
+        limite = entero_positivo(request.args.get('limite') or LIMITE_SUGERENCIAS)
+        
+        if limite is None:
+            return jsonify({
+                'success': False,
+                'error': 'El límite debe ser un entero positivo'
+            }), 400
+        
+        limite = min(limite, LIMITE_BUSQUEDA_MAX)
+        
+        if not termino or maestra_manager.maestra is None:
+            return jsonify({'success': True, 'sugerencias': []}), 200
+        
+        return jsonify({
+            'success': True,
+            'sugerencias': maestra_manager.sugerir_contratos(termino, limite)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @consolidador_t25_bp.route('/buscar-contrato/procesar', methods=['POST'])
 def procesar_contrato_individual():
     """Procesa un contrato individual"""
@@ -259,8 +435,17 @@ def procesar_contrato_individual():
                 'error': 'Debe proporcionar número de contrato'
             }), 400
         
-        # Buscar información del contrato en la maestra
-        contratos = maestra_manager.buscar_contrato(numero_contrato)
+        formato = normalizar_formato(data.get('formato'))
+        if formato is None:
+            return jsonify({
+                'success': False,
+                'error': f'Formato de salida no válido. Disponibles: {", ".join(formatos_disponibles())}'
+            }), 400
+        
+        # Buscar información del contrato en la maestra (coincidencia exacta
+        # primero; si no hay, el primer contrato que contenga el número)
+        info_contrato = maestra_manager.obtener_contrato(numero_contrato)
+        contratos = [info_contrato] if info_contrato else maestra_manager.buscar_contrato(numero_contrato)
         
         if not contratos:
             return jsonify({
@@ -272,7 +457,7 @@ def procesar_contrato_individual():
         
         # Crear consolidador
         cliente = clientes_sftp[session_id]
-        consolidador = ConsolidadorT25(cliente)
+        consolidador = ConsolidadorT25(cliente, maestra_manager, download_cache, parsed_anexo_cache)
         
         # Procesar contrato
         print("\n" + "="*70, flush=True)
@@ -280,6 +465,7 @@ def procesar_contrato_individual():
         print("="*70 + "\n", flush=True)
         
         resultado = consolidador.procesar_contrato(info_contrato)
+        download_cache.guardar()
         
         print("\n" + "="*70, flush=True)
         print("RESULTADO DEL PROCESAMIENTO", flush=True)
@@ -293,7 +479,8 @@ def procesar_contrato_individual():
             # Generar Excel consolidado
             archivo_consolidado = generar_excel_consolidado(
                 resultado['servicios_consolidados'],
-                numero_contrato
+                numero_contrato,
+                formato
             )
             
             print(f"Archivo generado: {archivo_consolidado}", flush=True)
@@ -361,46 +548,92 @@ def procesar_masivo():
                 'error': 'No hay maestra cargada'
             }), 400
         
-        # Obtener todos los contratos de prestadores de salud
-        contratos = maestra_manager.obtener_contratos_prestadores()
+        data = request.get_json(silent=True) or {}
+        num_workers = entero_positivo(data.get('workers', ParallelRunner.DEFAULT_WORKERS))
+        if num_workers is None:
+            return jsonify({
+                'success': False,
+                'error': 'El número de workers debe ser un entero positivo'
+            }), 400
+        
+        reanudar = bool(data.get('reanudar', False))
+        incremental = bool(data.get('incremental', False))
         
-        cliente = clientes_sftp[session_id]
-        consolidador = ConsolidadorT25(cliente)
+        formato = normalizar_formato(data.get('formato'))
+        if formato is None:
+            return jsonify({
+                'success': False,
+                'error': f'Formato de salida no válido. Disponibles: {", ".join(formatos_disponibles())}'
+            }), 400
+        
+        filas_por_archivo = data.get('filas_por_archivo')
+        if filas_por_archivo:
+            filas_por_archivo = entero_positivo(filas_por_archivo)
+            if filas_por_archivo is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Las filas por archivo deben ser un entero positivo'
+                }), 400
+        else:
+            filas_por_archivo = None
+        
+        # Obtener todos los contratos de prestadores de salud, en el orden de
+        # la salida (número de contrato): los workers los toman en ese orden y
+        # el buffer de reordenamiento del escritor queda del tamaño de los workers
+        contratos = sorted(
+            maestra_manager.obtener_contratos_prestadores(),
+            key=lambda contrato: str(contrato['numero_contrato'])
+        )
         
-        resultados = []
-        servicios_totales = []
+        cliente = clientes_sftp[session_id]
+        runner = ParallelRunner(
+            cliente, num_workers, maestra_manager, checkpoint_manager, reanudar,
+            download_cache, parsed_anexo_cache, incremental
+        )
         
         print(f"\n{'='*70}")
         print(f"PROCESAMIENTO MASIVO INICIADO")
         print(f"Total de contratos a procesar: {len(contratos)}")
+        print(f"Workers solicitados: {runner.num_workers}")
+        print(f"Modo reanudar: {'SI' if reanudar else 'NO'}")
+        print(f"Modo incremental: {'SI' if incremental else 'NO'}")
         print(f"{'='*70}\n")
         
-        for i, contrato in enumerate(contratos, 1):
-            print(f"\nProcesando contrato {i}/{len(contratos)}: {contrato['numero_contrato']}")
-            
-            resultado = consolidador.procesar_contrato(contrato)
-            resultados.append(resultado)
-            
-            if resultado['success']:
-                servicios_totales.extend(resultado['servicios_consolidados'])
-                print(f"  Exitoso: {len(resultado['servicios_consolidados'])} servicios")
-            else:
-                print(f"  Error: {resultado.get('error', 'Desconocido')}")
-        
-        # Generar archivo consolidado único
-        if servicios_totales:
-            archivo_consolidado = generar_excel_consolidado(
-                servicios_totales,
-                'TODOS_LOS_CONTRATOS'
-            )
-            
+        # Cada contrato se escribe al terminar, en orden de número de contrato,
+        # en fragmentos de hasta filas_por_archivo filas
+        escritor = ShardedWriter(OUTPUT_FOLDER, 'TODOS_LOS_CONTRATOS', formato, filas_por_archivo)
+        
+        def escribir_resultado(idx, contrato, resultado):
+            servicios = resultado.get('servicios_consolidados', []) if resultado['success'] else []
+            escritor.agregar(idx, contrato['numero_contrato'], servicios)
+        
+        try:
+            ejecucion = runner.procesar(contratos, on_resultado=escribir_resultado, conservar_servicios=False)
+        finally:
+            manifiesto = escritor.cerrar()
+        
+        rendimiento = ejecucion['rendimiento']
+        
+        print(f"\nRendimiento: {rendimiento['contratos_por_minuto']} contratos/min, "
+              f"{rendimiento['bytes_por_segundo']:,.0f} bytes/s con {rendimiento['workers']} workers")
+        print(f"Caché de descargas: {rendimiento['cache_descargas']['tasa_aciertos']}% aciertos, "
+              f"{rendimiento['cache_descargas']['bytes_ahorrados']:,} bytes ahorrados")
+        print(f"Caché de parseo: {rendimiento['cache_parseo']['tasa_aciertos']}% aciertos")
+        print(f"Contratos reutilizados de checkpoints: {rendimiento['contratos_reutilizados']}")
+        if 'etapas' in rendimiento:
+            etapas = rendimiento['etapas']
+            print(f"Ocupación por etapa: descarga {etapas['descarga']['ocupacion']}%, "
+                  f"parseo {etapas['parseo']['ocupacion']}% (cuello de botella: {etapas['cuello_de_botella']})")
+        print(f"Consolidado: {manifiesto['total_filas']:,} filas en {len(manifiesto['fragmentos'])} archivo(s)")
+        
+        if manifiesto['total_filas']:
             # Registrar estadísticas
             try:
                 stats_manager.registrar_proceso(
                     tipo='consolidador_t25_masivo',
                     usuario='sistema',
                     archivo='procesamiento_masivo',
-                    registros=len(servicios_totales),
+                    registros=manifiesto['total_filas'],
                     exitoso=True
                 )
             except:
@@ -408,17 +641,21 @@ def procesar_masivo():
             
             return jsonify({
                 'success': True,
-                'archivo': archivo_consolidado,
+                'archivo': manifiesto['fragmentos'][0]['archivo'],
+                'archivos': [fragmento['archivo'] for fragmento in manifiesto['fragmentos']],
+                'manifiesto': manifiesto['manifiesto'],
                 'total_contratos_procesados': len(contratos),
-                'total_servicios': len(servicios_totales),
-                'total_alertas': len(consolidador.alertas),
-                'alertas': consolidador.alertas
+                'total_servicios': manifiesto['total_filas'],
+                'total_alertas': len(ejecucion['alertas']),
+                'alertas': ejecucion['alertas'],
+                'rendimiento': rendimiento
             }), 200
         else:
             return jsonify({
                 'success': False,
                 'error': 'No se pudieron procesar contratos',
-                'alertas': consolidador.alertas
+                'alertas': ejecucion['alertas'],
+                'rendimiento': rendimiento
             }), 500
     
     except Exception as e:
@@ -432,13 +669,176 @@ def procesar_masivo():
         }), 500
 
 
+# ============================================================================
+# TRABAJOS DE PROCESAMIENTO MASIVO EN SEGUNDO PLANO
+# ============================================================================
+
+@consolidador_t25_bp.route('/procesar-masivo/jobs', methods=['POST'])
+def crear_job_masivo():
+    """Encola un procesamiento masivo y retorna el id del trabajo"""
+    try:
+        session_id = session.get('session_id')
+        
+        if not session_id or session_id not in clientes_sftp:
+            return jsonify({
+                'success': False,
+                'error': 'No hay sesión SFTP activa'
+            }), 401
+        
+        if maestra_manager.maestra is None:
+            return jsonify({
+                'success': False,
+                'error': 'No hay maestra cargada'
+            }), 400
+        
+        data = request.get_json(silent=True) or {}
+        num_workers = entero_positivo(data.get('workers', ParallelRunner.DEFAULT_WORKERS))
+        if num_workers is None:
+            return jsonify({
+                'success': False,
+                'error': 'El número de workers debe ser un entero positivo'
+            }), 400
+        
+        reanudar = bool(data.get('reanudar', False))
+        incremental = bool(data.get('incremental', False))
+        
+        formato = normalizar_formato(data.get('formato'))
+        if formato is None:
+            return jsonify({
+                'success': False,
+                'error': f'Formato de salida no válido. Disponibles: {", ".join(formatos_disponibles())}'
+            }), 400
+        
+        job = job_manager.crear_job(clientes_sftp[session_id], num_workers, reanudar, incremental, formato)
+        
+        return jsonify({
+            'success': True,
+            'job_id': job['id'],
+            'job': job
+        }), 202
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@consolidador_t25_bp.route('/procesar-masivo/jobs')
+def listar_jobs_masivo():
+    """Lista los trabajos de procesamiento masivo"""
+    try:
+        return jsonify({
+            'success': True,
+            'jobs': job_manager.listar_jobs()
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@consolidador_t25_bp.route('/procesar-masivo/jobs/<job_id>')
+def progreso_job_masivo(job_id):
+    """Consulta el progreso de un trabajo"""
+    try:
+        job = job_manager.obtener_job(job_id)
+        
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Trabajo no encontrado'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@consolidador_t25_bp.route('/procesar-masivo/jobs/<job_id>/cancelar', methods=['POST'])
+def cancelar_job_masivo(job_id):
+    """Cancela un trabajo en cola o en ejecución"""
+    try:
+        job = job_manager.cancelar_job(job_id)
+        
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Trabajo no encontrado'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@consolidador_t25_bp.route('/procesar-masivo/jobs/<job_id>/reanudar', methods=['POST'])
+def reanudar_job_masivo(job_id):
+    """Reanuda un trabajo interrumpido, cancelado o con error"""
+    try:
+        session_id = session.get('session_id')
+        
+        if not session_id or session_id not in clientes_sftp:
+            return jsonify({
+                'success': False,
+                'error': 'No hay sesión SFTP activa'
+            }), 401
+        
+        if not job_manager.obtener_job(job_id):
+            return jsonify({
+                'success': False,
+                'error': 'Trabajo no encontrado'
+            }), 404
+        
+        job = job_manager.reanudar_job(job_id, clientes_sftp[session_id])
+        
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'El trabajo no se puede reanudar en su estado actual'
+            }), 409
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        }), 202
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ============================================================================
 # DESCARGA DE ARCHIVOS
 # ============================================================================
 
 @consolidador_t25_bp.route('/descargar/<filename>')
 def descargar_archivo(filename):
-    """Descarga archivo consolidado"""
+    """
+    Descarga archivo consolidado
+    
+    Con ?formato=csv.gz|parquet|xlsx se entrega en ese formato: si el
+    consolidado se generó como .xlsx se convierte una sola vez y la
+    conversión queda guardada junto al original
+    """
     try:
         filepath = os.path.join(OUTPUT_FOLDER, filename)
         
@@ -448,10 +848,35 @@ def descargar_archivo(filename):
                 'error': 'Archivo no encontrado'
             }), 404
         
+        if request.args.get('formato'):
+            formato = normalizar_formato(request.args.get('formato'))
+            if formato is None:
+                return jsonify({
+                    'success': False,
+                    'error': f'Formato no válido. Disponibles: {", ".join(formatos_disponibles())}'
+                }), 400
+            
+            formato_actual = formato_de_archivo(filename)
+            if formato != formato_actual:
+                if formato_actual != 'xlsx':
+                    return jsonify({
+                        'success': False,
+                        'error': 'Solo se puede convertir a otro formato desde un consolidado .xlsx'
+                    }), 400
+                
+                filename = filename[:-len(FORMATOS_SALIDA['xlsx']['extension'])] + FORMATOS_SALIDA[formato]['extension']
+                destino = os.path.join(OUTPUT_FOLDER, filename)
+                
+                if not os.path.exists(destino) or os.path.getmtime(destino) < os.path.getmtime(filepath):
+                    convertir_xlsx(filepath, destino, formato)
+                
+                filepath = destino
+        
         return send_file(
             filepath,
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            mimetype=mimetype_de_archivo(filename)
         )
     
     except Exception as e:
@@ -490,21 +915,73 @@ def obtener_alertas():
 # FUNCIONES AUXILIARES
 # ============================================================================
 
-def generar_excel_consolidado(servicios: list, nombre_base: str) -> str:
+def entero_positivo(valor):
     """
-    Genera archivo Excel con servicios consolidados
+    Convierte un parámetro de la petición a entero positivo
+    
+    Args:
+        valor: Valor recibido (número o texto)
+        
+    Returns:
+        El entero, o None si no es un entero mayor que cero
+    """
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return numero if numero > 0 else None
+
+
+def generar_salida_job(servicios_por_contrato, nombre_base: str, formato: str = 'xlsx') -> dict:
+    """
+    Genera el consolidado fragmentado de un trabajo en segundo plano y
+    registra estadísticas
+    
+    Args:
+        servicios_por_contrato: Iterable de (numero_contrato, servicios) en orden de salida
+        nombre_base: Nombre base para los archivos
+        formato: Formato de salida (xlsx, csv.gz o parquet)
+        
+    Returns:
+        Manifiesto de la salida (fragmentos y rangos por contrato)
+    """
+    escritor = ShardedWriter(OUTPUT_FOLDER, nombre_base, formato)
+    try:
+        for posicion, (numero_contrato, servicios) in enumerate(servicios_por_contrato):
+            escritor.agregar(posicion, numero_contrato, servicios)
+    finally:
+        manifiesto = escritor.cerrar()
+    
+    if manifiesto['total_filas']:
+        try:
+            stats_manager.registrar_proceso(
+                tipo='consolidador_t25_masivo',
+                usuario='sistema',
+                archivo='procesamiento_masivo_job',
+                registros=manifiesto['total_filas'],
+                exitoso=True
+            )
+        except:
+            pass
+    
+    return manifiesto
+
+
+def generar_excel_consolidado(servicios: list, nombre_base: str, formato: str = 'xlsx') -> str:
+    """
+    Genera archivo Excel con servicios consolidados (o CSV comprimido /
+    Parquet según el formato)
     
     Args:
         servicios: Lista de servicios
         nombre_base: Nombre base para el archivo
+        formato: Formato de salida (xlsx, csv.gz o parquet)
         
     Returns:
         Nombre del archivo generado
     """
     try:
         import pandas as pd
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment
         
         # Crear DataFrame
         df = pd.DataFrame(servicios)
@@ -514,47 +991,30 @@ def generar_excel_consolidado(servicios: list, nombre_base: str) -> str:
         
         # Generar nombre de archivo
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"CONSOLIDADO_{nombre_base}_{timestamp}.xlsx"
+        filename = f"CONSOLIDADO_{nombre_base}_{timestamp}{FORMATOS_SALIDA[formato]['extension']}"
         filepath = os.path.join(OUTPUT_FOLDER, filename)
         
-        # Crear archivo Excel con formato
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Consolidado')
-            
-            # Obtener worksheet
-            worksheet = writer.sheets['Consolidado']
-            
-            # Formato de encabezados
-            header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-            header_font = Font(bold=True, color='FFFFFF', size=11)
-            
-            for cell in worksheet[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Ajustar anchos de columna
-            column_widths = {
-                'A': 12,  # codigo_cups
-                'B': 12,  # codigo_homologo_manual
-                'C': 50,  # descripcion_del_cups
-                'D': 18,  # tarifa_unitaria_en_pesos
-                'E': 20,  # manual_tarifario
-                'F': 22,  # porcentaje_manual_tarifario
-                'G': 30,  # observaciones
-                'H': 20,  # codigo_de_habilitacion
-                'I': 15,  # fecha_acuerdo
-                'J': 20,  # numero_contrato_año
-                'K': 15   # origen_tarifa
-            }
-            
-            for col, width in column_widths.items():
-                worksheet.column_dimensions[col].width = width
-            
-            # Formato de datos
-            for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row):
-                for cell in row:
-                    cell.alignment = Alignment(vertical='center', wrap_text=True)
+        columnas = [str(col) for col in df.columns]
+        
+        # Valores vacíos (NaN/NaT) como celdas vacías
+        valores = df.astype(object).where(df.notna(), None)
+        
+        # Formatos columnares: fila a fila, sin estilos
+        if formato != 'xlsx':
+            escribir_columnar(valores.itertuples(index=False, name=None), columnas, filepath, formato)
+            print(f"Archivo {formato} generado: {filepath}")
+            return filename
+        
+        # Crear archivo Excel con formato (en streaming, estilos compartidos)
+        escritor = ExcelStreamWriter(filepath, 'Consolidado', anchos=ShardedWriter.ANCHOS_COLUMNAS)
+        escritor.agregar_fila(columnas, ['positiva_encabezado'] * len(columnas))
+        
+        estilos = ['positiva_ajustado'] * len(columnas)
+        
+        for fila in valores.itertuples(index=False, name=None):
+            escritor.agregar_fila(fila, estilos)
+        
+        escritor.guardar()
         
         print(f"Archivo Excel generado: {filepath}")
         return filename
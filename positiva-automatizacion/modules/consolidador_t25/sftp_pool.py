@@ -0,0 +1,394 @@
+"""
+Pool de canales SFTP sobre conexiones SSH reutilizables
+"""
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+import paramiko
+
+
+class PoolAgotadoError(Exception):
+    """No se liberó ningún canal del pool dentro del tiempo de espera"""
+
+
+class SFTPPool:
+    """
+    Reparte operaciones SFTP entre varios canales abiertos sobre uno o más
+    transportes SSH
+
+    Los canales se abren a medida que se necesitan (hasta `tamano`) y se
+    multiplexan en transportes de hasta `canales_por_transporte` canales.
+    Cada transporte envía keepalive. Si una operación falla porque el
+    canal o el transporte se cayó, el canal se descarta, se reconecta y la
+    operación se reintenta con espera exponencial. Los errores propios de la
+    operación (archivo inexistente, sin permisos) no se reintentan.
+    """
+
+    # Canales máximos del pool
+    TAMANO = 16
+
+    # Canales SFTP por transporte SSH
+    CANALES_POR_TRANSPORTE = 4
+
+    # Ventana de recepción de cada canal en bytes (cuántos datos puede enviar
+    # el servidor sin esperar confirmación; limita el throughput a ventana / latencia)
+    VENTANA_CANAL = 16 * 1024 * 1024
+
+    # Segundos entre paquetes keepalive de cada transporte
+    KEEPALIVE_SEGUNDOS = 30
+
+    # Reintentos ante errores transitorios y espera inicial/máxima entre ellos
+    REINTENTOS = 3
+    ESPERA_INICIAL = 0.5
+    ESPERA_MAXIMA = 8.0
+
+    # Segundos máximos esperando un canal libre y para abrir una conexión
+    TIMEOUT_CANAL = 300
+    TIMEOUT_CONEXION = 30
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        tamano: int = None,
+        canales_por_transporte: int = None
+    ):
+        """
+        Configura el pool (las conexiones se abren al usarlo)
+
+        Args:
+            host: Servidor SFTP
+            port: Puerto SFTP
+            username: Usuario
+            password: Contraseña
+            tamano: Canales máximos (por defecto TAMANO)
+            canales_por_transporte: Canales por transporte SSH (por defecto CANALES_POR_TRANSPORTE)
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self._password = password
+        self.tamano = max(1, tamano or self.TAMANO)
+        self.canales_por_transporte = max(1, canales_por_transporte or self.CANALES_POR_TRANSPORTE)
+
+        self._condicion = threading.Condition()
+        self._libres = []
+        self._transportes = []
+        self._abiertos = 0
+        self._en_uso = 0
+        self._cerrado = False
+
+        # Transportes caídos aún no reemplazados (para contar reconexiones)
+        self._caidos = 0
+
+        self.reconexiones = 0
+        self.reintentos = 0
+        self.esperas = 0
+        self.operaciones = 0
+
+    def iniciar(self):
+        """
+        Abre el primer canal para validar credenciales y conectividad
+
+        Raises:
+            paramiko.AuthenticationException, paramiko.SSHException u OSError si no se puede conectar
+        """
+        with self._condicion:
+            self._abiertos += 1
+        try:
+            canal = self._abrir_canal()
+        except Exception:
+            with self._condicion:
+                self._abiertos -= 1
+            raise
+        self._devolver(canal)
+
+    def _conectar_transporte(self) -> Dict[str, any]:
+        """Abre una nueva conexión SSH con keepalive"""
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh.connect(
+            hostname=self.host,
+            port=self.port,
+            username=self.username,
+            password=self._password,
+            timeout=self.TIMEOUT_CONEXION,
+            allow_agent=False,
+            look_for_keys=False
+        )
+        ssh.get_transport().set_keepalive(self.KEEPALIVE_SEGUNDOS)
+
+        with self._condicion:
+            if self._caidos:
+                self._caidos -= 1
+                self.reconexiones += 1
+
+        return {'ssh': ssh, 'canales': 0}
+
+    def _abrir_canal(self) -> Dict[str, any]:
+        """
+        Abre un canal SFTP en un transporte activo con cupo, o en uno nuevo
+        (el cupo en _abiertos ya fue reservado por quien llama)
+        """
+        with self._condicion:
+            transporte = None
+            for candidato in self._transportes:
+                sesion = candidato['ssh'].get_transport()
+                if candidato['canales'] < self.canales_por_transporte and sesion is not None and sesion.is_active():
+                    transporte = candidato
+                    break
+            if transporte is not None:
+                transporte['canales'] += 1
+
+        if transporte is None:
+            transporte = self._conectar_transporte()
+            transporte['canales'] = 1
+            with self._condicion:
+                self._transportes.append(transporte)
+
+        try:
+            sftp = paramiko.SFTPClient.from_transport(
+                transporte['ssh'].get_transport(),
+                window_size=self.VENTANA_CANAL
+            )
+        except Exception:
+            self._liberar_transporte(transporte)
+            raise
+
+        return {'sftp': sftp, 'transporte': transporte}
+
+    def _liberar_transporte(self, transporte: Dict[str, any]):
+        """Descuenta un canal del transporte y lo cierra si quedó sin canales o caído"""
+        with self._condicion:
+            transporte['canales'] -= 1
+            sesion = transporte['ssh'].get_transport()
+            caido = sesion is None or not sesion.is_active()
+            cerrar = transporte['canales'] <= 0 or caido
+            if cerrar and transporte in self._transportes:
+                self._transportes.remove(transporte)
+                if caido and not self._cerrado:
+                    self._caidos += 1
+
+        if cerrar:
+            try:
+                transporte['ssh'].close()
+            except Exception:
+                pass
+
+    def _adquirir(self) -> Dict[str, any]:
+        """
+        Toma un canal libre (descartando los que se cayeron mientras
+        esperaban), abre uno nuevo si hay cupo o espera a que se libere uno
+        """
+        limite = time.monotonic() + self.TIMEOUT_CANAL
+        caidos = []
+
+        try:
+            with self._condicion:
+                while True:
+                    if self._cerrado:
+                        raise ConnectionError('El pool SFTP está cerrado')
+                    while self._libres:
+                        canal = self._libres.pop()
+                        if not self._canal_caido(canal):
+                            self._en_uso += 1
+                            return canal
+                        self._abiertos -= 1
+                        caidos.append(canal)
+                    if self._abiertos < self.tamano:
+                        self._abiertos += 1
+                        self._en_uso += 1
+                        break
+
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise PoolAgotadoError('No hay canales SFTP libres')
+                    self.esperas += 1
+                    self._condicion.wait(restante)
+        finally:
+            for canal in caidos:
+                self._cerrar_canal(canal)
+
+        try:
+            return self._abrir_canal()
+        except Exception:
+            with self._condicion:
+                self._abiertos -= 1
+                self._en_uso -= 1
+                self._condicion.notify()
+            raise
+
+    def _devolver(self, canal: Dict[str, any], en_uso: bool = False):
+        """Deja un canal disponible para otras operaciones"""
+        with self._condicion:
+            if en_uso:
+                self._en_uso -= 1
+            if self._cerrado:
+                cerrar = True
+            else:
+                cerrar = False
+                self._libres.append(canal)
+                self._condicion.notify()
+
+        if cerrar:
+            self._descartar(canal)
+
+    def _cerrar_canal(self, canal: Dict[str, any]):
+        """Cierra un canal y su transporte si quedó sin canales o caído"""
+        try:
+            canal['sftp'].close()
+        except Exception:
+            pass
+
+        self._liberar_transporte(canal['transporte'])
+
+    def _descartar(self, canal: Dict[str, any], en_uso: bool = False):
+        """Cierra un canal y libera su cupo"""
+        self._cerrar_canal(canal)
+
+        with self._condicion:
+            self._abiertos -= 1
+            if en_uso:
+                self._en_uso -= 1
+            self._condicion.notify()
+
+    @staticmethod
+    def _canal_caido(canal: Dict[str, any]) -> bool:
+        """Indica si el canal o su transporte ya no están activos"""
+        transporte = canal['transporte']['ssh'].get_transport()
+        return transporte is None or not transporte.is_active() or canal['sftp'].sock.closed
+
+    def _es_transitorio(self, error: Exception, canal: Dict[str, any]) -> bool:
+        """
+        Indica si el error se debe a la conexión (se reintenta) y no a la
+        operación misma (archivo inexistente, permisos, etc.)
+        """
+        if isinstance(error, paramiko.AuthenticationException):
+            return False
+        if isinstance(error, (EOFError, paramiko.SSHException, ConnectionError, socket.timeout)):
+            return True
+        return isinstance(error, OSError) and self._canal_caido(canal)
+
+    @contextmanager
+    def canal(self):
+        """
+        Presta un canal SFTP de uso exclusivo mientras dure el bloque (sin
+        reintentos: si el canal se cae se descarta al devolverlo)
+        """
+        canal = self._adquirir()
+        try:
+            yield canal['sftp']
+        except BaseException:
+            if self._canal_caido(canal):
+                self._descartar(canal, en_uso=True)
+            else:
+                self._devolver(canal, en_uso=True)
+            raise
+        else:
+            self._devolver(canal, en_uso=True)
+
+    def ejecutar(self, operacion: Callable[[paramiko.SFTPClient], any]):
+        """
+        Ejecuta una operación con un canal del pool, reintentando en otro
+        canal (reconectando si hace falta) ante errores transitorios
+
+        Args:
+            operacion: Función que recibe el SFTPClient y retorna el resultado
+
+        Returns:
+            Resultado de la operación
+
+        Raises:
+            La excepción de la operación si no es transitoria o si se agotan los reintentos
+        """
+        espera = self.ESPERA_INICIAL
+        intento = 0
+
+        while True:
+            try:
+                canal = self._adquirir()
+            except (paramiko.SSHException, EOFError, ConnectionError, socket.timeout, OSError) as e:
+                # No se pudo abrir un canal nuevo (servidor caído o reiniciando)
+                if isinstance(e, paramiko.AuthenticationException) or self._cerrado or intento >= self.REINTENTOS:
+                    raise
+                intento += 1
+                with self._condicion:
+                    self.reintentos += 1
+                time.sleep(espera)
+                espera = min(espera * 2, self.ESPERA_MAXIMA)
+                continue
+
+            try:
+                resultado = operacion(canal['sftp'])
+            except Exception as e:
+                transitorio = self._es_transitorio(e, canal)
+                if transitorio:
+                    self._descartar(canal, en_uso=True)
+                else:
+                    self._devolver(canal, en_uso=True)
+
+                if not transitorio or intento >= self.REINTENTOS:
+                    raise
+
+                intento += 1
+                with self._condicion:
+                    self.reintentos += 1
+                print(f"Error transitorio SFTP ({type(e).__name__}: {e}), reintento {intento}/{self.REINTENTOS}")
+                time.sleep(espera)
+                espera = min(espera * 2, self.ESPERA_MAXIMA)
+                continue
+
+            self._devolver(canal, en_uso=True)
+            with self._condicion:
+                self.operaciones += 1
+            return resultado
+
+    def metricas(self) -> Dict[str, any]:
+        """
+        Estado del pool
+
+        Returns:
+            Dict con tamano, en_uso, libres, abiertos, transportes, reconexiones,
+            reintentos, esperas y operaciones
+        """
+        with self._condicion:
+            return {
+                'tamano': self.tamano,
+                'en_uso': self._en_uso,
+                'libres': len(self._libres),
+                'abiertos': self._abiertos,
+                'transportes': len(self._transportes),
+                'canales_por_transporte': self.canales_por_transporte,
+                'reconexiones': self.reconexiones,
+                'reintentos': self.reintentos,
+                'esperas': self.esperas,
+                'operaciones': self.operaciones
+            }
+
+    def cerrar(self):
+        """Cierra los canales libres y todas las conexiones"""
+        with self._condicion:
+            self._cerrado = True
+            libres = self._libres
+            self._libres = []
+            transportes: List[Dict[str, any]] = list(self._transportes)
+            self._transportes = []
+            self._condicion.notify_all()
+
+        for canal in libres:
+            try:
+                canal['sftp'].close()
+            except Exception:
+                pass
+
+        for transporte in transportes:
+            try:
+                transporte['ssh'].close()
+            except Exception:
+                pass
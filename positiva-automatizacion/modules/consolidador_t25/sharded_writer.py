@@ -0,0 +1,257 @@
+"""
+Escritura fragmentada del consolidado masivo T25
+"""
+
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+from utils.excel_export import ExcelStreamWriter
+from utils.columnar_export import FORMATOS_SALIDA, crear_escritor
+
+
+class ShardedWriter:
+    """
+    Escribe el consolidado masivo en fragmentos (archivos) a medida que
+    terminan los contratos, sin acumular todos los servicios en memoria
+
+    Los contratos se escriben en el orden de su posición; los que terminan
+    antes de su turno esperan en un buffer de reordenamiento. Un hilo
+    propio hace la escritura para no frenar a los workers. Al cerrar se
+    genera un manifiesto con el fragmento y el rango de filas de cada contrato.
+    """
+
+    # Filas de datos por fragmento: límite de filas de una hoja de Excel menos el encabezado
+    FILAS_POR_FRAGMENTO = 1048576 - 1
+
+    # Contratos en cola hacia el hilo de escritura antes de frenar a quien entrega
+    MAX_EN_COLA = 32
+
+    # Columnas del consolidado T25 (en el orden en que las genera ConsolidadorT25)
+    COLUMNAS = [
+        'codigo_cups',
+        'codigo_homologo_manual',
+        'descripcion_del_cups',
+        'tarifa_unitaria_en_pesos',
+        'manual_tarifario',
+        'porcentaje_manual_tarifario',
+        'observaciones',
+        'codigo_de_habilitacion',
+        'fecha_acuerdo',
+        'numero_contrato_año',
+        'origen_tarifa'
+    ]
+
+    # Anchos de columna del Excel consolidado
+    ANCHOS_COLUMNAS = {
+        'A': 12,  # codigo_cups
+        'B': 12,  # codigo_homologo_manual
+        'C': 50,  # descripcion_del_cups
+        'D': 18,  # tarifa_unitaria_en_pesos
+        'E': 20,  # manual_tarifario
+        'F': 22,  # porcentaje_manual_tarifario
+        'G': 30,  # observaciones
+        'H': 20,  # codigo_de_habilitacion
+        'I': 15,  # fecha_acuerdo
+        'J': 20,  # numero_contrato_año
+        'K': 15   # origen_tarifa
+    }
+
+    def __init__(
+        self,
+        carpeta_salida: str,
+        nombre_base: str,
+        formato: str = 'xlsx',
+        filas_por_fragmento: int = None
+    ):
+        """
+        Prepara el escritor e inicia el hilo de escritura
+
+        Args:
+            carpeta_salida: Carpeta donde se generan los fragmentos y el manifiesto
+            nombre_base: Nombre base de los archivos
+            formato: Formato de los fragmentos (xlsx, csv.gz o parquet)
+            filas_por_fragmento: Filas de datos por fragmento (en xlsx no puede
+                superar FILAS_POR_FRAGMENTO)
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        self.carpeta = carpeta_salida
+        self.prefijo = f"CONSOLIDADO_{nombre_base}_{timestamp}"
+        self.formato = formato
+        self.filas_por_fragmento = max(1, filas_por_fragmento or self.FILAS_POR_FRAGMENTO)
+        if formato == 'xlsx':
+            self.filas_por_fragmento = min(self.filas_por_fragmento, self.FILAS_POR_FRAGMENTO)
+
+        self.fragmentos = []
+        self.contratos = {}
+        self.total_filas = 0
+        self.max_en_espera = 0
+
+        self._escritor = None
+        self._estilos = None
+        self._filas_fragmento = 0
+        self._siguiente = 0
+        self._en_espera = {}
+        self._error = None
+
+        self._cola = queue.Queue(maxsize=self.MAX_EN_COLA)
+        self._hilo = threading.Thread(target=self._ejecutar, name='t25-escritor', daemon=True)
+        self._hilo.start()
+
+    def agregar(self, posicion: int, numero_contrato: str, servicios: List[Dict[str, any]]):
+        """
+        Entrega los servicios de un contrato para escribirlos en su turno
+
+        Cada posición (0, 1, 2...) debe entregarse una vez; un contrato
+        fallido se entrega con servicios vacíos para no detener a los siguientes.
+
+        Args:
+            posicion: Orden del contrato en la salida
+            numero_contrato: Número del contrato
+            servicios: Servicios consolidados del contrato
+        """
+        if self._error is not None:
+            raise self._error
+        self._cola.put((posicion, numero_contrato, servicios))
+
+    def cerrar(self) -> Dict[str, any]:
+        """
+        Escribe lo que quede en espera (saltando posiciones no entregadas),
+        cierra el último fragmento y guarda el manifiesto
+
+        Returns:
+            Manifiesto: fragmentos, rangos de filas por contrato y totales
+        """
+        self._cola.put(None)
+        self._hilo.join()
+
+        if self._error is not None:
+            raise self._error
+
+        manifiesto = {
+            'formato': self.formato,
+            'filas_por_fragmento': self.filas_por_fragmento,
+            'total_filas': self.total_filas,
+            'total_contratos': len(self.contratos),
+            'max_contratos_en_espera': self.max_en_espera,
+            'fragmentos': self.fragmentos,
+            'contratos': self.contratos,
+            'manifiesto': None
+        }
+
+        if self.fragmentos:
+            nombre = f"{self.prefijo}_manifiesto.json"
+            manifiesto['manifiesto'] = nombre
+
+            ruta = os.path.join(self.carpeta, nombre)
+            temporal = f"{ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(manifiesto, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(temporal, ruta)
+
+        return manifiesto
+
+    def _ejecutar(self):
+        """Hilo de escritura: reordena los contratos y los escribe en su turno"""
+        fin = False
+        try:
+            while True:
+                entrega = self._cola.get()
+                if entrega is None:
+                    fin = True
+                    break
+
+                posicion, numero_contrato, servicios = entrega
+                self._en_espera[posicion] = (numero_contrato, servicios)
+                self.max_en_espera = max(self.max_en_espera, len(self._en_espera))
+
+                while self._siguiente in self._en_espera:
+                    self._escribir_contrato(*self._en_espera.pop(self._siguiente))
+                    self._siguiente += 1
+
+            # Cierre: lo que quedó en espera va en orden, saltando los huecos
+            for posicion in sorted(self._en_espera):
+                self._escribir_contrato(*self._en_espera.pop(posicion))
+
+            if self._escritor is not None:
+                self._cerrar_fragmento()
+
+        except Exception as e:
+            self._error = e
+            # Seguir consumiendo la cola hasta el cierre para no bloquear a quien entrega
+            while not fin:
+                fin = self._cola.get() is None
+
+    def _escribir_contrato(self, numero_contrato: str, servicios: List[Dict[str, any]]):
+        """
+        Escribe los servicios de un contrato (ordenados por origen de tarifa),
+        pasando a un nuevo fragmento cuando el actual se llena
+        """
+        ordenados = sorted(
+            servicios,
+            key=lambda servicio: (servicio.get('origen_tarifa') is None, str(servicio.get('origen_tarifa') or ''))
+        )
+        inicio = 0
+
+        while inicio < len(ordenados):
+            if self._escritor is None or self._filas_fragmento >= self.filas_por_fragmento:
+                if self._escritor is not None:
+                    self._cerrar_fragmento()
+                self._abrir_fragmento()
+
+            bloque = ordenados[inicio:inicio + self.filas_por_fragmento - self._filas_fragmento]
+
+            # Filas del archivo: la 1 es el encabezado
+            fila_inicial = self._filas_fragmento + 2
+            for servicio in bloque:
+                self._escribir_fila(servicio)
+
+            self.contratos.setdefault(str(numero_contrato), []).append({
+                'archivo': self.fragmentos[-1]['archivo'],
+                'fila_inicial': fila_inicial,
+                'fila_final': fila_inicial + len(bloque) - 1
+            })
+            inicio += len(bloque)
+
+    def _escribir_fila(self, servicio: Dict[str, any]):
+        """Escribe un servicio en el fragmento actual (NaN como vacío)"""
+        fila = []
+        for columna in self.COLUMNAS:
+            valor = servicio.get(columna)
+            fila.append(None if valor is None or valor != valor else valor)
+
+        if self.formato == 'xlsx':
+            self._escritor.agregar_fila(fila, self._estilos)
+        else:
+            self._escritor.agregar_fila(fila)
+
+        self._filas_fragmento += 1
+        self.total_filas += 1
+
+    def _abrir_fragmento(self):
+        """Crea el siguiente archivo fragmento y escribe su encabezado"""
+        nombre = f"{self.prefijo}_parte{len(self.fragmentos) + 1:03d}{FORMATOS_SALIDA[self.formato]['extension']}"
+        ruta = os.path.join(self.carpeta, nombre)
+
+        if self.formato == 'xlsx':
+            self._escritor = ExcelStreamWriter(ruta, 'Consolidado', anchos=self.ANCHOS_COLUMNAS)
+            self._escritor.agregar_fila(self.COLUMNAS, ['positiva_encabezado'] * len(self.COLUMNAS))
+            self._estilos = ['positiva_ajustado'] * len(self.COLUMNAS)
+        else:
+            self._escritor = crear_escritor(self.formato, ruta, self.COLUMNAS)
+
+        self._filas_fragmento = 0
+        self.fragmentos.append({'archivo': nombre, 'filas': 0})
+
+        print(f"Fragmento de consolidado iniciado: {nombre}")
+
+    def _cerrar_fragmento(self):
+        """Guarda el fragmento actual"""
+        tamano = self._escritor.guardar()
+        self.fragmentos[-1]['filas'] = self._filas_fragmento
+        self.fragmentos[-1]['bytes'] = tamano
+        self._escritor = None
@@ -8,6 +8,7 @@ let isConnected = false;
 let maestraCargada = false;
 let contratoSeleccionado = null;
 let archivoConsolidado = null;
+let temporizadorSugerencias = null;
 
 // ============================================================================
 // INICIALIZACIÓN
@@ -47,6 +48,7 @@ function setupEventListeners() {
             buscarContrato();
         }
     });
+    document.getElementById('input-numero-contrato').addEventListener('input', sugerirContratos);
     
     // Procesamiento
     document.getElementById('btn-procesar').addEventListener('click', procesarContrato);
@@ -281,10 +283,17 @@ async function buscarContrato() {
         
         const data = await response.json();
         
-        if (data.success && data.contratos.length > 0) {
+        // Solo la coincidencia exacta se selecciona; las demás quedan como sugerencias
+        const sugerencias = data.success ? data.contratos : (data.sugerencias || []);
+        
+        if (data.success && data.exacto) {
             contratoSeleccionado = data.contratos[0];
             mostrarDetalleContrato(contratoSeleccionado);
             showNotification('Contrato encontrado', 'success');
+        } else if (sugerencias.length > 0) {
+            mostrarSugerenciasContrato(sugerencias);
+            showNotification(`Sin coincidencia exacta para ${numeroContrato}: elige uno de los ${sugerencias.length} contratos sugeridos`, 'warning');
+            limpiarDetalleContrato();
         } else {
             showNotification(data.error || 'Contrato no encontrado', 'error');
             limpiarDetalleContrato();
@@ -301,6 +310,52 @@ async function buscarContrato() {
     }
 }
 
+function sugerirContratos() {
+    const input = document.getElementById('input-numero-contrato');
+    const termino = input.value.trim();
+    
+    clearTimeout(temporizadorSugerencias);
+    if (!maestraCargada || termino.length < 2) {
+        return;
+    }
+    
+    // Esperar a que el usuario deje de escribir
+    temporizadorSugerencias = setTimeout(async () => {
+        try {
+            const response = await fetch(`/modulos/consolidador-t25/buscar-contrato/sugerencias?q=${encodeURIComponent(termino)}`);
+            const data = await response.json();
+            
+            if (!data.success || input.value.trim() !== termino) {
+                return;
+            }
+            
+            mostrarSugerenciasContrato(data.sugerencias);
+        } catch (error) {
+            console.error('Error:', error);
+        }
+    }, 150);
+}
+
+function mostrarSugerenciasContrato(sugerencias) {
+    const input = document.getElementById('input-numero-contrato');
+    
+    let lista = document.getElementById('sugerencias-contrato');
+    if (!lista) {
+        lista = document.createElement('datalist');
+        lista.id = 'sugerencias-contrato';
+        document.body.appendChild(lista);
+        input.setAttribute('list', lista.id);
+    }
+    
+    lista.innerHTML = '';
+    sugerencias.forEach(s => {
+        const opcion = document.createElement('option');
+        opcion.value = s.numero_contrato;
+        opcion.label = [s.razon_social, s.nit].filter(Boolean).join(' - ');
+        lista.appendChild(opcion);
+    });
+}
+
 function mostrarDetalleContrato(contrato) {
     const detalleCard = document.getElementById('detalle-contrato-card');
     const detalleContent = document.getElementById('detalle-contrato-content');
@@ -0,0 +1 @@
+#Pruebas del Consolidador T25
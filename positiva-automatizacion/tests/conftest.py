@@ -0,0 +1,30 @@
+"""
+Configuración compartida de las pruebas
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.servidor_sftp import iniciar_servidor
+
+
+@pytest.fixture
+def servidor_sftp(tmp_path):
+    """Servidor SFTP local sobre una carpeta vacía (la raíz está en .raiz)"""
+    raiz = tmp_path / 'sftp'
+    raiz.mkdir()
+    servidor = iniciar_servidor(str(raiz))
+    yield servidor
+    servidor.detener()
+
+
+@pytest.fixture
+def carpeta_trabajo(tmp_path, monkeypatch):
+    """Ejecuta la prueba con el directorio actual en una carpeta temporal (temp/, output/, data/)"""
+    carpeta = tmp_path / 'trabajo'
+    carpeta.mkdir()
+    monkeypatch.chdir(carpeta)
+    return carpeta
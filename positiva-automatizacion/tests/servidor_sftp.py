@@ -0,0 +1,272 @@
+"""
+Servidor SFTP local (paramiko) y datos sintéticos para pruebas y benchmarks
+
+Expone una carpeta local en modo solo lectura, con latencia opcional por
+operación y la posibilidad de cortar las conexiones abiertas para simular
+caídas del servidor
+"""
+import csv
+import os
+import queue
+import random
+import socket
+import threading
+import time
+
+import paramiko
+
+
+USUARIO = 'benchmark'
+CLAVE = 'benchmark'
+
+
+class ServidorSFTP(paramiko.ServerInterface):
+    """Acepta cualquier canal y la clave de pruebas"""
+
+    def check_auth_password(self, username, password):
+        if username == USUARIO and password == CLAVE:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+
+class ArchivoSFTP(paramiko.SFTPHandle):
+    """Archivo abierto en modo lectura"""
+
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+class CarpetaSFTP(paramiko.SFTPServerInterface):
+    """Expone la carpeta raíz del servidor en modo solo lectura"""
+
+    servidor = None
+
+    def _local(self, ruta):
+        return os.path.join(self.servidor.raiz, self.canonicalize(ruta).lstrip('/'))
+
+    def _operacion(self):
+        self.servidor.registrar_operacion()
+
+    def canonicalize(self, ruta):
+        return os.path.normpath('/' + ruta).replace('//', '/')
+
+    def list_folder(self, ruta):
+        self._operacion()
+        try:
+            carpeta = self._local(ruta)
+            items = []
+            for nombre in os.listdir(carpeta):
+                attr = paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(carpeta, nombre)))
+                attr.filename = nombre
+                items.append(attr)
+            return items
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, ruta):
+        self._operacion()
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local(ruta)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, ruta, flags, attr):
+        self._operacion()
+        try:
+            archivo = open(self._local(ruta), 'rb')
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        handle = ArchivoSFTP(flags)
+        handle.readfile = archivo
+        handle.filename = self._local(ruta)
+        return handle
+
+
+class ServidorLocal:
+    """Servidor SFTP en un hilo propio, escuchando en un puerto libre de 127.0.0.1"""
+
+    def __init__(self, raiz, latencia_segundos=0.0):
+        """
+        Args:
+            raiz: Carpeta local que se expone como '/'
+            latencia_segundos: Espera antes de atender cada listado, stat o apertura
+        """
+        self.raiz = raiz
+        self.latencia_segundos = latencia_segundos
+        self.operaciones = 0
+        self.conexiones = 0
+
+        self._lock = threading.Lock()
+        self._transportes = []
+        self._clave_host = paramiko.RSAKey.generate(2048)
+        self._carpeta = type('CarpetaSFTP', (CarpetaSFTP,), {'servidor': self})
+
+        self._oyente = socket.socket()
+        self._oyente.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._oyente.bind(('127.0.0.1', 0))
+        self._oyente.listen(64)
+        self.puerto = self._oyente.getsockname()[1]
+
+        threading.Thread(target=self._aceptar, daemon=True).start()
+
+    def _aceptar(self):
+        while True:
+            try:
+                conexion, _ = self._oyente.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+
+    def _atender(self, conexion):
+        transporte = paramiko.Transport(conexion)
+        transporte.add_server_key(self._clave_host)
+        transporte.set_subsystem_handler('sftp', paramiko.SFTPServer, self._carpeta)
+        transporte.start_server(server=ServidorSFTP())
+        with self._lock:
+            self._transportes.append(transporte)
+            self.conexiones += 1
+
+    def registrar_operacion(self):
+        """Cuenta una operación y aplica la latencia configurada"""
+        with self._lock:
+            self.operaciones += 1
+        if self.latencia_segundos:
+            time.sleep(self.latencia_segundos)
+
+    def cortar_conexiones(self):
+        """Cierra todas las conexiones abiertas (simula una caída del servidor)"""
+        with self._lock:
+            transportes = self._transportes
+            self._transportes = []
+        for transporte in transportes:
+            transporte.close()
+
+    def detener(self):
+        """Deja de aceptar conexiones y cierra las abiertas"""
+        self._oyente.close()
+        self.cortar_conexiones()
+
+
+def iniciar_servidor(raiz, latencia_segundos=0.0):
+    """Inicia el servidor SFTP local sobre raiz y lo retorna (el puerto está en .puerto)"""
+    return ServidorLocal(raiz, latencia_segundos)
+
+
+def iniciar_proxy_latencia(puerto_destino, latencia_ms):
+    """
+    Inicia un proxy TCP que retrasa cada sentido la mitad de la latencia
+    (ida y vuelta = latencia_ms) y retorna su puerto
+    """
+    retraso = latencia_ms / 2000
+
+    def bombear(origen, destino):
+        pendientes = queue.Queue()
+
+        def enviar():
+            while True:
+                momento, datos = pendientes.get()
+                if datos is None:
+                    break
+                espera = momento - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                try:
+                    destino.sendall(datos)
+                except OSError:
+                    break
+            try:
+                destino.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+        threading.Thread(target=enviar, daemon=True).start()
+        while True:
+            try:
+                datos = origen.recv(65536)
+            except OSError:
+                datos = b''
+            if not datos:
+                pendientes.put((0, None))
+                break
+            pendientes.put((time.monotonic() + retraso, datos))
+
+    oyente = socket.socket()
+    oyente.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    oyente.bind(('127.0.0.1', 0))
+    oyente.listen(64)
+
+    def aceptar():
+        while True:
+            cliente, _ = oyente.accept()
+            servidor = socket.create_connection(('127.0.0.1', puerto_destino))
+            for socket_ in (cliente, servidor):
+                socket_.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=bombear, args=(cliente, servidor), daemon=True).start()
+            threading.Thread(target=bombear, args=(servidor, cliente), daemon=True).start()
+
+    threading.Thread(target=aceptar, daemon=True).start()
+    return oyente.getsockname()[1]
+
+
+def filas_anexo(servicios, semilla, sedes=2):
+    """Filas de un ANEXO 1 sintético con formato POSITIVA"""
+    rnd = random.Random(semilla)
+    filas = [['ANEXO 1 PACTADO DEL PRESTADOR'] + [''] * 7, [''] * 8]
+    for sede in range(sedes):
+        filas.append(['DEPARTAMENTO', 'MUNICIPIO', 'CODIGO DE HABILITACIÓN', 'SEDE', 'NOMBRE', '', '', ''])
+        filas.append(['ANTIOQUIA', 'MEDELLIN', str(500010000 + sede), str(sede + 1), f'SEDE {sede}', '', '', ''])
+        filas.append(['ITEM', 'CODIGO CUPS', 'CODIGO HOMOLOGO', 'DESCRIPCION', 'TARIFA', 'MANUAL', 'PORCENTAJE', 'OBSERVACIONES'])
+        for item in range(servicios):
+            filas.append([
+                str(item + 1), str(rnd.randint(100000, 999999)), '',
+                f'PROCEDIMIENTO QUIRURGICO {rnd.randint(1, 5000)}', str(rnd.randint(1000, 900000)),
+                rnd.choice(['SOAT', 'ISS 2001', 'PROPIO']), rnd.choice(['', '10', '25']), ''
+            ])
+    return filas
+
+
+def generar_anexo(ruta, servicios, semilla, sedes=2):
+    """Genera un ANEXO 1 sintético en CSV"""
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(filas_anexo(servicios, semilla, sedes))
+
+
+def generar_contratos(raiz, cantidad, servicios=5):
+    """
+    Crea en raiz carpetas de contrato con TARIFAS, un ANEXO 1 inicial y un
+    acta de negociación, y retorna los contratos con el formato de la maestra
+
+    Args:
+        raiz: Carpeta local que expone el servidor
+        cantidad: Contratos a generar
+        servicios: Servicios por sede del anexo inicial
+
+    Returns:
+        Lista de contratos (numero_contrato, fecha_inicial, otrosi, actas, fila)
+    """
+    contratos = []
+    for indice in range(cantidad):
+        numero = f'{100 + indice}-2024'
+        tarifas = os.path.join(raiz, f'CONTRATO {numero} PRESTADOR {indice}', 'TARIFAS')
+        actas = os.path.join(tarifas, 'ACTAS DE NEGOCIACION')
+        os.makedirs(actas)
+
+        generar_anexo(os.path.join(tarifas, 'ANEXO 1 inicial.csv'), servicios, indice)
+        generar_anexo(os.path.join(actas, 'ANEXO 1 acta 1.csv'), 3, 1000 + indice, sedes=1)
+
+        contratos.append({
+            'numero_contrato': numero,
+            'fecha_inicial': '01/01/2024',
+            'otrosi': [],
+            'actas': [{'numero': 1, 'fecha': '02/02/2024'}],
+            'fila': indice + 2
+        })
+    return contratos
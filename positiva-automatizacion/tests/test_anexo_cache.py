@@ -0,0 +1,111 @@
+"""
+Caché de parseo: guardados concurrentes del mismo anexo, desalojo por tamaño
+y tipos de tarifa que se recuperan tal cual
+"""
+import contextlib
+import io
+import os
+import threading
+from datetime import date, datetime
+
+import pandas as pd
+
+from modules.consolidador_t25.anexo_cache import ParsedAnexoCache
+from modules.consolidador_t25.anexo_processor import AnexoProcessor
+from tests.servidor_sftp import generar_anexo
+
+
+def procesar(ruta):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return AnexoProcessor().procesar_archivo_completo(ruta)
+
+
+def bytes_en_disco(carpeta):
+    return sum(entrada.stat().st_size for entrada in os.scandir(carpeta))
+
+
+def test_guardados_concurrentes_del_mismo_anexo(tmp_path):
+    ruta = str(tmp_path / 'ANEXO 1.csv')
+    generar_anexo(ruta, 200, 1)
+    resultado = procesar(ruta)
+
+    cache = ParsedAnexoCache(str(tmp_path / 'cache'))
+    hash_contenido = cache.hash_archivo(ruta)
+    errores = []
+
+    def guardar():
+        try:
+            cache._guardar(cache._ruta(hash_contenido), resultado)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=guardar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert os.listdir(tmp_path / 'cache') == [os.path.basename(cache._ruta(hash_contenido))]
+    assert cache._total_bytes == bytes_en_disco(tmp_path / 'cache')
+
+    _, desde_cache = cache.buscar(ruta, 'ANEXO 1.csv')
+    assert desde_cache['sedes_info'] == resultado['sedes_info']
+
+
+def test_desalojo_mantiene_el_total_bajo_el_limite(tmp_path):
+    rutas = []
+    for numero in range(6):
+        ruta = str(tmp_path / f'ANEXO 1 {numero}.csv')
+        generar_anexo(ruta, 100, numero)
+        rutas.append(ruta)
+
+    carpeta = tmp_path / 'cache'
+    cache = ParsedAnexoCache(str(carpeta))
+    cache.procesar(rutas[0], AnexoProcessor())
+    limite = int(os.path.getsize(next(os.scandir(carpeta)).path) * 2.5)
+
+    cache = ParsedAnexoCache(str(carpeta), max_bytes=limite)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for ruta in rutas[1:]:
+            cache.procesar(ruta, AnexoProcessor())
+            # El primero se sigue usando: es el último en desalojarse
+            cache.procesar(rutas[0], AnexoProcessor())
+
+    assert cache._total_bytes == bytes_en_disco(carpeta) <= limite
+    assert len(os.listdir(carpeta)) == 2
+    assert cache._ruta(cache.hash_archivo(rutas[0])) in cache._entradas
+
+
+def test_tarifas_none_y_fechas_conservan_su_tipo(tmp_path):
+    ruta = str(tmp_path / 'ANEXO 1.csv')
+    generar_anexo(ruta, 20, 1)
+    resultado = procesar(ruta)
+
+    servicios = resultado['sedes_info'][0]['servicios']
+    servicios[0]['tarifa_unitaria'] = None
+    servicios[1]['tarifa_unitaria'] = pd.Timestamp('2024-03-01 08:30')
+    servicios[2]['tarifa_unitaria'] = datetime(2024, 3, 1, 8, 30)
+
+    cache = ParsedAnexoCache(str(tmp_path / 'cache'))
+    cache.guardar_resultado(cache.hash_archivo(ruta), resultado, 'ANEXO 1.csv')
+
+    _, desde_cache = cache.buscar(ruta, 'ANEXO 1.csv')
+    tarifas = [servicio['tarifa_unitaria'] for servicio in desde_cache['sedes_info'][0]['servicios'][:3]]
+    assert tarifas[0] is None
+    assert type(tarifas[1]) is pd.Timestamp and tarifas[1] == pd.Timestamp('2024-03-01 08:30')
+    assert type(tarifas[2]) is datetime and tarifas[2] == datetime(2024, 3, 1, 8, 30)
+    assert desde_cache['sedes_info'] == resultado['sedes_info']
+
+
+def test_tarifa_de_tipo_no_soportado_no_se_guarda(tmp_path):
+    ruta = str(tmp_path / 'ANEXO 1.csv')
+    generar_anexo(ruta, 20, 1)
+    resultado = procesar(ruta)
+    resultado['sedes_info'][0]['servicios'][0]['tarifa_unitaria'] = date(2024, 3, 1)
+
+    cache = ParsedAnexoCache(str(tmp_path / 'cache'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        cache.guardar_resultado(cache.hash_archivo(ruta), resultado, 'ANEXO 1.csv')
+
+    assert os.listdir(tmp_path / 'cache') == []
@@ -0,0 +1,112 @@
+"""
+Equivalencia entre las rutas de extracción de AnexoProcessor: la máquina
+de estados fila a fila (XLSB en streaming) y la ruta vectorizada sobre
+DataFrame (XLSX, XLS, ODS, CSV) deben dar el mismo resultado
+"""
+import io
+import random
+
+import pandas as pd
+import pytest
+
+from modules.consolidador_t25.anexo_processor import AnexoProcessor
+from tests.servidor_sftp import filas_anexo, generar_anexo
+
+
+HOJAS_ALEATORIAS = 3000
+
+PALABRAS_CLAVE = [
+    'CODIGO DE HABILITACIÓN', 'CODIGO DE HABILITACION', 'ITEM', 'CODIGO CUPS', 'CUPS', 'TOTAL',
+    'DESCRIPCION', 'TARIFA', 'ANEXO 1 PACTADO', 'MANUAL', 'HABILITACION', 'CODIGO', 'CÓDIGO CUPS'
+]
+
+
+def celda(rnd):
+    """Celda aleatoria: vacía, numérica, texto o palabra clave del formato"""
+    x = rnd.random()
+    if x < 0.35:
+        return ''
+    if x < 0.5:
+        return float(rnd.randint(0, 999999))
+    if x < 0.55:
+        return rnd.randint(0, 99) + 0.5
+    if x < 0.62:
+        return str(rnd.randint(1, 999))
+    if x < 0.72:
+        return rnd.choice(PALABRAS_CLAVE)
+    if x < 0.74:
+        return rnd.choice([True, 'nan', ' ', '  x  '])
+    return f'txt{rnd.randint(0, 50)}'
+
+
+def hoja_aleatoria(semilla, filas=80, columnas=8):
+    """Hoja con encabezados de sede y de servicios mezclados con ruido"""
+    rnd = random.Random(semilla)
+    hoja = [['ANEXO 1 PACTADO DEL PRESTADOR'] + [''] * (columnas - 1)]
+    for _ in range(filas):
+        tipo = rnd.random()
+        if tipo < 0.08:
+            fila = ['', '', 'CODIGO DE HABILITACIÓN', '', '', '', '', '']
+        elif tipo < 0.14:
+            fila = ['ITEM', 'CODIGO CUPS', 'DESCRIPCION', 'TARIFA', 'MANUAL', '', '', '']
+        elif tipo < 0.25:
+            fila = ['', 'MED', str(rnd.randint(1, 9) * 1000), rnd.choice([1.0, 2.0, '3', 1.5, '']), 'SEDE', '', '', '']
+        else:
+            fila = [celda(rnd) for _ in range(columnas)]
+        hoja.append(fila[:columnas])
+    return hoja
+
+
+@pytest.fixture(scope='module')
+def processor():
+    return AnexoProcessor()
+
+
+def test_filas_y_dataframe_equivalentes_en_hojas_aleatorias(processor):
+    diferencias = []
+
+    for semilla in range(HOJAS_ALEATORIAS):
+        filas = hoja_aleatoria(semilla)
+        df = pd.DataFrame(filas)
+
+        validacion_filas = processor._validar_filas(filas[:processor.FILAS_VALIDACION], 'anexo.xlsb')
+        validacion_df = processor.validar_formato_positiva(df, 'anexo.xlsb')
+        extraccion_filas = processor.extraer_servicios_de_filas(iter(filas))
+        extraccion_df = processor.extraer_servicios_de_anexo(df)
+
+        if repr(validacion_filas) != repr(validacion_df) or repr(extraccion_filas) != repr(extraccion_df):
+            diferencias.append(semilla)
+
+    assert diferencias == []
+
+
+def test_csv_con_celdas_vacias_equivale_a_las_filas(processor):
+    for semilla in range(300):
+        filas = hoja_aleatoria(semilla)
+        texto = io.StringIO()
+        pd.DataFrame(filas).to_csv(texto, header=False, index=False)
+        texto.seek(0)
+        df = pd.read_csv(texto, header=None)
+
+        filas_leidas = [[None if valor != valor else valor for valor in fila] for fila in df.values.tolist()]
+        assert repr(processor.extraer_servicios_de_anexo(df)) == repr(processor.extraer_servicios_de_filas(iter(filas_leidas))), semilla
+
+
+def test_procesar_archivo_completo_en_ruta_y_en_memoria(processor, tmp_path):
+    ruta = tmp_path / 'ANEXO 1 inicial.csv'
+    generar_anexo(str(ruta), 40, 7)
+
+    desde_ruta = processor.procesar_archivo_completo(str(ruta))
+    with open(ruta, 'rb') as f:
+        desde_memoria = processor.procesar_archivo_completo(io.BytesIO(f.read()), ruta.name)
+
+    assert desde_ruta['success']
+    assert desde_ruta['total_sedes'] == 2
+    assert desde_ruta['total_servicios'] == 80
+    assert repr(desde_ruta['sedes_info']) == repr(desde_memoria['sedes_info'])
+
+
+def test_anexo_sin_formato_positiva(processor):
+    filas = [fila for fila in filas_anexo(5, 0) if 'ANEXO 1 PACTADO' not in fila[0]]
+    resultado = processor._validar_filas(filas[:processor.FILAS_VALIDACION], 'otro.xlsb')
+    assert not resultado['valido']
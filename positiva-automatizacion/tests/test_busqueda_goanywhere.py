@@ -0,0 +1,77 @@
+"""
+Búsqueda de archivos en GoAnywhere: el resumen indica cuándo el tope de
+carpetas dejó parte del árbol sin recorrer
+"""
+import json
+import os
+
+import pytest
+from flask import Flask
+
+from modules.consolidador_t25.goanywhere import GoAnywhereWebClient
+from tests.servidor_sftp import USUARIO, CLAVE
+
+
+@pytest.fixture
+def cliente(servidor_sftp, carpeta_trabajo):
+    for numero in range(12):
+        carpeta = os.path.join(servidor_sftp.raiz, f'CONTRATO {numero}', 'TARIFAS')
+        os.makedirs(carpeta)
+        open(os.path.join(carpeta, f'ANEXO 1 {numero}.csv'), 'w').close()
+
+    cliente = GoAnywhereWebClient('127.0.0.1', servidor_sftp.puerto, USUARIO)
+    assert cliente.connect(CLAVE)['success']
+    yield cliente
+    cliente.disconnect()
+
+
+def test_recorrido_completo_no_esta_truncado(cliente):
+    resultado = cliente.search_files('ANEXO', '/')
+    assert resultado['total'] == 12
+    assert resultado['truncado'] is False
+
+
+def test_tope_de_carpetas_marca_truncado(cliente, monkeypatch):
+    monkeypatch.setattr(GoAnywhereWebClient, 'MAX_CARPETAS_BUSQUEDA', 5)
+    resultado = cliente.search_files('ANEXO', '/')
+    assert resultado['carpetas_visitadas'] == 5
+    assert resultado['truncado'] is True
+    assert resultado['total'] < 12
+
+
+def crear_cliente_http(cliente, monkeypatch):
+    from modules.consolidador_t25 import routes
+
+    monkeypatch.setattr(routes, 'clientes_sftp', {'prueba': cliente})
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(routes.consolidador_t25_bp)
+
+    cliente_http = app.test_client()
+    with cliente_http.session_transaction() as sesion:
+        sesion['session_id'] = 'prueba'
+    return cliente_http
+
+
+def test_evento_fin_incluye_truncado(cliente, monkeypatch):
+    monkeypatch.setattr(GoAnywhereWebClient, 'MAX_CARPETAS_BUSQUEDA', 5)
+    cliente_http = crear_cliente_http(cliente, monkeypatch)
+
+    cuerpo = cliente_http.get('/goanywhere/buscar?q=ANEXO&ruta=/').get_data(as_text=True)
+    fin = [bloque for bloque in cuerpo.split('\n\n') if bloque.startswith('event: fin')]
+    assert len(fin) == 1
+    assert json.loads(fin[0].split('data: ', 1)[1])['truncado'] is True
+
+
+@pytest.mark.parametrize('parametros', [
+    'max_resultados=abc',
+    'max_resultados=0',
+    'max_tiempo=-1',
+    'max_tiempo=1.5',
+])
+def test_limites_invalidos_responden_400(cliente, monkeypatch, parametros):
+    cliente_http = crear_cliente_http(cliente, monkeypatch)
+
+    respuesta = cliente_http.get(f'/goanywhere/buscar?q=ANEXO&ruta=/&{parametros}')
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['success'] is False
@@ -0,0 +1,39 @@
+"""
+Caché de descargas: los aciertos no reescriben el índice en cada consulta
+"""
+import json
+
+from modules.consolidador_t25.download_cache import DownloadCache
+
+
+def test_aciertos_se_guardan_al_final(tmp_path):
+    cache = DownloadCache(str(tmp_path / 'cache'))
+    descargado = tmp_path / 'anexo.csv'
+    descargado.write_bytes(b'contenido')
+    cache.registrar('/C/ANEXO 1.csv', 9, '2024-01-01', str(descargado))
+
+    indice = tmp_path / 'cache' / DownloadCache.INDEX_FILENAME
+    guardado = indice.stat().st_mtime_ns
+    acceso = json.loads(indice.read_text())
+
+    for _ in range(100):
+        assert cache.obtener('/C/ANEXO 1.csv', 9, '2024-01-01') is not None
+    assert indice.stat().st_mtime_ns == guardado
+
+    cache.guardar()
+    clave = DownloadCache.generar_clave('/C/ANEXO 1.csv', 9, '2024-01-01')
+    assert json.loads(indice.read_text())[clave]['ultimo_acceso'] > acceso[clave]['ultimo_acceso']
+
+    # Una instancia nueva ve la fecha de acceso guardada
+    assert DownloadCache(str(tmp_path / 'cache')).estadisticas()['entradas'] == 1
+
+
+def test_guardado_periodico(tmp_path, monkeypatch):
+    monkeypatch.setattr(DownloadCache, 'GUARDADO_SEGUNDOS', 0)
+    cache = DownloadCache(str(tmp_path / 'cache'))
+    descargado = tmp_path / 'anexo.csv'
+    descargado.write_bytes(b'contenido')
+    cache.registrar('/C/ANEXO 1.csv', 9, '2024-01-01', str(descargado))
+
+    cache.obtener('/C/ANEXO 1.csv', 9, '2024-01-01')
+    assert not cache._indice_pendiente
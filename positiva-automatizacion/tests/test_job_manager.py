@@ -0,0 +1,163 @@
+"""
+Trabajos en segundo plano: cancelar y reanudar un trabajo que sigue en
+cola no lo ejecuta dos veces
+"""
+import contextlib
+import io
+import threading
+import time
+
+import pytest
+
+from modules.consolidador_t25.goanywhere import GoAnywhereWebClient
+from modules.consolidador_t25.job_manager import JobManager
+from tests.servidor_sftp import USUARIO, CLAVE, generar_contratos
+
+
+class MaestraFija:
+    """Maestra con una lista fija de contratos"""
+
+    def __init__(self, contratos):
+        self.contratos = contratos
+
+    def obtener_contratos_prestadores(self):
+        return list(self.contratos)
+
+    def obtener_contrato(self, numero_contrato):
+        return next((c for c in self.contratos if c['numero_contrato'] == numero_contrato), None)
+
+
+@pytest.fixture
+def cliente(servidor_sftp, carpeta_trabajo):
+    contratos = generar_contratos(servidor_sftp.raiz, 2)
+    cliente = GoAnywhereWebClient('127.0.0.1', servidor_sftp.puerto, USUARIO)
+    assert cliente.connect(CLAVE)['success']
+    cliente.contratos = contratos
+    yield cliente
+    cliente.disconnect()
+
+
+def esperar_estado(manager, job_id, estado, segundos=60):
+    limite = time.monotonic() + segundos
+    while manager.obtener_job(job_id)['estado'] != estado:
+        assert time.monotonic() < limite, manager.obtener_job(job_id)
+        time.sleep(0.05)
+
+
+def test_cancelar_y_reanudar_en_cola_ejecuta_una_vez(cliente):
+    salidas = []
+
+    def generar_salida(servicios_por_contrato, nombre_base, formato):
+        salidas.append([numero for numero, _ in servicios_por_contrato])
+        return {'fragmentos': [], 'manifiesto': None, 'total_filas': 0}
+
+    manager = JobManager(MaestraFija(cliente.contratos), generar_salida)
+
+    # Ocupar el único cupo del executor para que el trabajo quede en cola
+    liberar = threading.Event()
+    manager.executor.submit(liberar.wait)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        job = manager.crear_job(cliente, num_workers=2)
+        assert manager.cancelar_job(job['id'])['estado'] == 'cancelado'
+        assert manager.reanudar_job(job['id'], cliente)['estado'] == 'en_cola'
+
+        liberar.set()
+        esperar_estado(manager, job['id'], 'completado')
+        manager.executor.shutdown(wait=True)
+
+    assert len(salidas) == 1
+    assert manager.obtener_job(job['id'])['completados'] == 2
+    assert [j['id'] for j in manager.listar_jobs()] == [job['id']]
+
+
+def test_reanudar_trabajo_inexistente_responde_404(carpeta_trabajo, monkeypatch):
+    from flask import Flask
+    from modules.consolidador_t25 import routes
+
+    monkeypatch.setattr(routes, 'clientes_sftp', {'prueba': None})
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(routes.consolidador_t25_bp)
+
+    cliente_http = app.test_client()
+    with cliente_http.session_transaction() as sesion:
+        sesion['session_id'] = 'prueba'
+
+    respuesta = cliente_http.post('/procesar-masivo/jobs/inexistente/reanudar')
+    assert respuesta.status_code == 404
+
+
+def test_trabajo_no_conserva_servicios_en_memoria(cliente, monkeypatch):
+    from modules.consolidador_t25.parallel_runner import ParallelRunner
+
+    ejecuciones = []
+    procesar = ParallelRunner.procesar
+
+    def procesar_registrando(self, *args, **kwargs):
+        ejecucion = procesar(self, *args, **kwargs)
+        ejecuciones.append(ejecucion)
+        return ejecucion
+
+    monkeypatch.setattr(ParallelRunner, 'procesar', procesar_registrando)
+
+    servicios_salida = []
+
+    def generar_salida(servicios_por_contrato, nombre_base, formato):
+        servicios_salida.extend(len(servicios) for _, servicios in servicios_por_contrato)
+        return {'fragmentos': [], 'manifiesto': None, 'total_filas': sum(servicios_salida)}
+
+    manager = JobManager(MaestraFija(cliente.contratos), generar_salida)
+    with contextlib.redirect_stdout(io.StringIO()):
+        job = manager.crear_job(cliente, num_workers=2)
+        esperar_estado(manager, job['id'], 'completado')
+        manager.executor.shutdown(wait=True)
+
+    ejecucion = ejecuciones[0]
+    assert ejecucion['servicios_totales'] == []
+    assert all(r['servicios_consolidados'] == [] for r in ejecucion['resultados'])
+
+    # Los servicios siguen llegando a la salida desde los checkpoints
+    assert all(servicios_salida) and len(servicios_salida) == 2
+    assert manager.obtener_job(job['id'])['total_servicios'] == sum(servicios_salida)
+
+
+def test_desconectar_con_trabajos_activos_responde_409(cliente, monkeypatch):
+    from flask import Flask
+    from modules.consolidador_t25 import routes
+
+    def generar_salida(servicios_por_contrato, nombre_base, formato):
+        return {'fragmentos': [], 'manifiesto': None, 'total_filas': 0}
+
+    manager = JobManager(MaestraFija(cliente.contratos), generar_salida)
+    monkeypatch.setattr(routes, 'job_manager', manager)
+    monkeypatch.setattr(routes, 'clientes_sftp', {'prueba': cliente})
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(routes.consolidador_t25_bp)
+
+    cliente_http = app.test_client()
+    with cliente_http.session_transaction() as sesion:
+        sesion['session_id'] = 'prueba'
+
+    # Ocupar el único cupo del executor para que el trabajo quede en cola
+    liberar = threading.Event()
+    manager.executor.submit(liberar.wait)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        job = manager.crear_job(cliente, num_workers=2)
+
+        respuesta = cliente_http.post('/goanywhere/desconectar')
+        assert respuesta.status_code == 409
+        assert routes.clientes_sftp == {'prueba': cliente}
+
+        liberar.set()
+        esperar_estado(manager, job['id'], 'completado')
+        manager.executor.shutdown(wait=True)
+
+    # Los contratos se procesaron con la conexión de la sesión abierta
+    assert manager.obtener_job(job['id'])['exitosos'] == 2
+
+    respuesta = cliente_http.post('/goanywhere/desconectar')
+    assert respuesta.status_code == 200
+    assert routes.clientes_sftp == {}
@@ -0,0 +1,151 @@
+"""
+El escaneo en una sola pasada de procesar_anexo1_xlsb debe dar el mismo
+consolidado que el recorrido original sobre la hoja completa en memoria
+"""
+import contextlib
+import io
+import random
+
+import pytest
+
+from modules.consolidador import logic
+
+
+HOJAS_ALEATORIAS = 3000
+
+RUIDO = [None, '', 'ITEM', 'CODIGO', 'x', 3.0, 'TOTAL', 'Código de habilitación']
+
+
+def consolidado_referencia(data):
+    """Recorrido original por índice sobre la hoja materializada (detección celda a celda)"""
+    sedes = []
+    sede_actual = None
+    servicios_actuales = []
+    en_seccion_servicios = False
+
+    for idx, row in enumerate(data):
+        if not row:
+            continue
+
+        es_nueva_sede = False
+        for cell in row:
+            if cell and isinstance(cell, str):
+                texto = cell.upper()
+                if 'CODIGO DE HABILITACIÓN' in texto or 'CÓDIGO DE HABILITACIÓN' in texto or 'CODIGO DE HABILITACION' in texto:
+                    es_nueva_sede = True
+                    break
+
+        if es_nueva_sede:
+            if sede_actual and servicios_actuales:
+                sedes.append((sede_actual, servicios_actuales))
+            servicios_actuales = []
+            en_seccion_servicios = False
+
+            if idx + 1 < len(data):
+                sede_row = data[idx + 1]
+                if sede_row and len(sede_row) > 4:
+                    codigo_hab = str(sede_row[2]).strip() if sede_row[2] else ""
+                    numero_sede = sede_row[3]
+                    if numero_sede is not None:
+                        if isinstance(numero_sede, float) and numero_sede.is_integer():
+                            numero_sede = int(numero_sede)
+                        numero_sede_str = str(numero_sede)
+                        if len(numero_sede_str) == 1:
+                            numero_sede_str = numero_sede_str.zfill(2)
+                    else:
+                        numero_sede_str = "01"
+                    sede_actual = f"{codigo_hab}-{numero_sede_str}"
+            continue
+
+        if not en_seccion_servicios:
+            for cell in row:
+                if cell and isinstance(cell, str):
+                    texto = cell.upper()
+                    if 'ITEM' in texto and ('CODIGO' in texto or idx + 1 < len(data)):
+                        if len(row) > 1 and row[1]:
+                            siguiente = str(row[1]).upper()
+                            if 'CODIGO' in siguiente or 'CUPS' in siguiente:
+                                en_seccion_servicios = True
+                                break
+            if en_seccion_servicios:
+                continue
+
+        if en_seccion_servicios and sede_actual and len(row) >= 8:
+            item, codigo_cups = row[0], row[1]
+            if item is None and codigo_cups is None:
+                continue
+            if item is not None:
+                try:
+                    int(float(item))
+                except (TypeError, ValueError):
+                    continue
+            if codigo_cups is None or str(codigo_cups).strip() == "":
+                continue
+            codigo = str(codigo_cups).strip()
+            if any(kw in codigo.upper() for kw in ['CODIGO', 'CUPS', 'DESCRIPCION', 'TARIFA', 'MANUAL']):
+                continue
+            servicios_actuales.append((codigo, str(row[3]).strip() if row[3] else "", row[4]))
+
+    if sede_actual and servicios_actuales:
+        sedes.append((sede_actual, servicios_actuales))
+
+    return [(codigo, descripcion, tarifa, sede) for sede, servicios in sedes for codigo, descripcion, tarifa in servicios]
+
+
+def hoja_aleatoria(rnd):
+    """Sedes, encabezados y servicios con filas cortas, vacías y de ruido"""
+    filas = []
+    for _ in range(rnd.randint(0, 4)):
+        if rnd.random() < 0.3:
+            ruido = [rnd.choice(RUIDO) for _ in range(rnd.choice([0, 3, 8]))]
+            if len(ruido) == 8:
+                # La vista previa formatea la tarifa como número
+                ruido[4] = rnd.choice([None, 3.0])
+            filas.append(ruido)
+        filas.append(['DEP', 'MUN', rnd.choice(['CODIGO DE HABILITACIÓN', 'codigo de habilitacion', 'HAB']), 'SEDE', 'N', None, None, None])
+        if rnd.random() < 0.9:
+            filas.append(['ANT', 'MED', rnd.choice(['5001', None, 5001.0]), rnd.choice([1.0, 12, None, '3']), 'S', None, None, None][:rnd.choice([8, 8, 4])])
+        if rnd.random() < 0.9:
+            filas.append([rnd.choice(['ITEM', 'item', 'ITEM CODIGO', 'X']), rnd.choice(['CODIGO CUPS', 'cups', None, 'Z']), 'H', 'D', 'T', 'M', 'P', 'O'])
+        for item in range(rnd.randint(0, 6)):
+            filas.append(rnd.choice([
+                [float(item + 1), str(rnd.randint(1, 999999)), rnd.choice(['', None, 'H1']), 'PROC', float(rnd.randint(1, 900000)), 'SOAT', rnd.choice([None, 0.1]), rnd.choice(['', None, 'ob'])],
+                [None, '123', '', 'P', 5.0, 'S', None],
+                [], [None] * 8, ['', 'TOTAL', '', '', '', '', '', ''], ['a', 'CUPS', '', '', '', '', '', '']
+            ]))
+    if filas and rnd.random() < 0.3:
+        filas[-1] = ['ITEM', 'CODIGO CUPS']
+    return filas
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    ruta = tmp_path / 'anexo.xlsb'
+    ruta.write_bytes(b'')
+    return str(ruta)
+
+
+def test_una_pasada_equivale_al_recorrido_original(archivo, monkeypatch):
+    rnd = random.Random(2)
+    diferencias = []
+    exitosos = 0
+
+    for numero in range(HOJAS_ALEATORIAS):
+        filas = hoja_aleatoria(rnd)
+        # Las filas se entregan como iterador de un solo uso, como en la lectura en streaming
+        monkeypatch.setattr(logic, 'leer_archivo_excel', lambda ruta, filas=filas: (iter(list(filas)), 'SERVICIOS', 'xlsb'))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = logic.procesar_anexo1_xlsb(archivo)
+
+        esperado = consolidado_referencia(filas)
+        obtenido = [
+            (r['codigo_cups'], r['descripcion_del_cups'], r['tarifa_unitaria_en_pesos'], r['codigo_de_habilitacion'])
+            for r in resultado.get('consolidado', [])
+        ]
+        if obtenido != esperado or resultado['success'] != bool(esperado):
+            diferencias.append(numero)
+        exitosos += resultado['success']
+
+    assert diferencias == []
+    assert exitosos > 0
@@ -0,0 +1,113 @@
+"""
+Corrida completa de contratos contra el servidor SFTP local: el resultado
+no depende del número de workers ni de la etapa de parseo en procesos
+"""
+import contextlib
+import io
+import itertools
+import threading
+
+import pytest
+
+from modules.consolidador_t25.goanywhere import GoAnywhereWebClient
+from modules.consolidador_t25.parallel_runner import ParallelRunner
+from tests.servidor_sftp import USUARIO, CLAVE, generar_contratos
+
+
+CONTRATOS = 8
+
+
+@pytest.fixture
+def contratos(servidor_sftp):
+    return generar_contratos(servidor_sftp.raiz, CONTRATOS)
+
+
+@pytest.fixture
+def cliente(servidor_sftp, contratos, carpeta_trabajo):
+    # Las carpetas deben existir antes de conectar: connect lista la raíz en segundo plano
+    cliente = GoAnywhereWebClient('127.0.0.1', servidor_sftp.puerto, USUARIO)
+    assert cliente.connect(CLAVE)['success']
+    yield cliente
+    cliente.disconnect()
+
+
+def correr(cliente, contratos, workers, procesos_parseo):
+    runner = ParallelRunner(cliente, num_workers=workers, procesos_parseo=procesos_parseo)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return runner.procesar(contratos)
+
+
+def test_resultado_independiente_de_workers_y_etapa_de_parseo(cliente, contratos):
+    secuencial = correr(cliente, contratos, workers=1, procesos_parseo=0)
+
+    assert [r['numero_contrato'] for r in secuencial['resultados']] == [c['numero_contrato'] for c in contratos]
+    assert all(r['success'] for r in secuencial['resultados']), [r.get('error') for r in secuencial['resultados']]
+    # ANEXO 1 inicial (2 sedes) y acta (1 sede) de cada contrato
+    assert all(len(r['servicios_consolidados']) > 0 for r in secuencial['resultados'])
+
+    for workers, procesos_parseo in [(4, 0), (4, 2)]:
+        paralelo = correr(cliente, contratos, workers, procesos_parseo)
+        assert paralelo['servicios_totales'] == secuencial['servicios_totales']
+        assert all(r['success'] for r in paralelo['resultados'])
+        assert paralelo['rendimiento']['total_contratos'] == CONTRATOS
+
+    etapas = paralelo['rendimiento']['etapas']
+    assert etapas['parseo']['enviados'] == 2 * CONTRATOS
+
+
+def test_callbacks_de_resultado_no_bloquean_a_los_demas_workers(cliente, contratos):
+    # Las dos primeras llamadas se esperan entre sí: solo terminan si corren a la vez
+    barrera = threading.Barrier(2, timeout=10)
+    llamadas = itertools.count()
+    errores = []
+
+    def on_resultado(idx, contrato, resultado):
+        if next(llamadas) < 2:
+            try:
+                barrera.wait()
+            except threading.BrokenBarrierError as e:
+                errores.append(e)
+
+    runner = ParallelRunner(cliente, num_workers=2, procesos_parseo=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ejecucion = runner.procesar(contratos, on_resultado=on_resultado)
+
+    assert errores == []
+    assert all(r['success'] for r in ejecucion['resultados'])
+
+
+def test_alertas_se_reinician_por_contrato(cliente, contratos):
+    from modules.consolidador_t25.consolidator import ConsolidadorT25
+
+    consolidador = ConsolidadorT25(cliente, maestra=object())
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultados = [
+            consolidador.procesar_contrato(dict(contratos[0], numero_contrato=f'9999-{numero}'))
+            for numero in range(3)
+        ]
+
+    for numero, resultado in enumerate(resultados):
+        assert not resultado['success']
+        assert [a['contrato'] for a in resultado['alertas']] == [f'9999-{numero}']
+    # Solo quedan en memoria las alertas del último contrato
+    assert consolidador.alertas is resultados[-1]['alertas']
+
+
+def test_checkpoint_que_no_se_puede_guardar_marca_el_contrato_fallido(cliente, contratos, tmp_path):
+    import os
+    from modules.consolidador_t25.checkpoint_manager import CheckpointManager
+
+    checkpoints = CheckpointManager(str(tmp_path / 'checkpoints'))
+    # Un directorio en la ruta del checkpoint hace fallar el reemplazo atómico
+    os.makedirs(checkpoints._ruta(contratos[0]['numero_contrato']))
+
+    runner = ParallelRunner(cliente, num_workers=2, checkpoints=checkpoints, procesos_parseo=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ejecucion = runner.procesar(contratos[:3])
+
+    fallido, *exitosos = ejecucion['resultados']
+    assert not fallido['success']
+    assert 'checkpoint' in fallido['error']
+    assert [a['tipo'] for a in fallido['alertas']] == ['error']
+    assert all(r['success'] for r in exitosos)
+    assert not [nombre for nombre in os.listdir(checkpoints.carpeta) if nombre.endswith('.tmp')]
@@ -0,0 +1,80 @@
+"""
+Búsqueda de contratos por la ruta /buscar-contrato: solo la coincidencia
+exacta se marca para seleccionarla; los aproximados son sugerencias
+"""
+import pytest
+from flask import Flask
+
+from modules.consolidador_t25.indice_contratos import IndiceContratos
+
+
+CONTRATOS = [
+    {'numero_contrato': '0035-2024', 'razon_social': 'CLINICA NORTE', 'nit': '900123456'},
+    {'numero_contrato': '1234-2024', 'razon_social': 'HOSPITAL SUR', 'nit': '800987654'},
+    {'numero_contrato': '0535-2023', 'razon_social': 'IPS CENTRO', 'nit': '901555222'}
+]
+
+
+@pytest.fixture
+def cliente_http(carpeta_trabajo, monkeypatch):
+    from modules.consolidador_t25 import routes
+    from modules.consolidador_t25.maestra_manager import MaestraManager
+
+    maestra = MaestraManager()
+    maestra.maestra = CONTRATOS
+    maestra._contratos = CONTRATOS
+    maestra._indice = IndiceContratos(CONTRATOS)
+    monkeypatch.setattr(routes, 'maestra_manager', maestra)
+
+    app = Flask(__name__)
+    app.register_blueprint(routes.consolidador_t25_bp)
+    return app.test_client()
+
+
+def buscar(cliente_http, termino):
+    respuesta = cliente_http.post('/buscar-contrato', json={'numero_contrato': termino})
+    return respuesta.status_code, respuesta.get_json()
+
+
+def test_coincidencia_exacta(cliente_http):
+    estado, datos = buscar(cliente_http, '0035-2024')
+    assert estado == 200
+    assert datos['exacto'] is True
+    assert datos['contratos'][0]['numero_contrato'] == '0035-2024'
+
+
+def test_termino_contenido_no_es_exacto(cliente_http):
+    estado, datos = buscar(cliente_http, 'clinica nort')
+    assert estado == 200
+    assert datos['exacto'] is False
+    assert datos['contratos'][0]['numero_contrato'] == '0035-2024'
+
+
+def test_solo_aproximados_se_devuelven_como_sugerencias(cliente_http):
+    # 0535-2024 no existe: 0035-2024 se parece pero no debe quedar seleccionado
+    estado, datos = buscar(cliente_http, '0535-2024')
+    assert estado == 404
+    assert datos['success'] is False
+    assert 'contratos' not in datos
+    assert '0035-2024' in [contrato['numero_contrato'] for contrato in datos['sugerencias']]
+
+
+@pytest.mark.parametrize('ruta', ['/buscar-contrato/sugerencias', '/goanywhere/sugerencias'])
+@pytest.mark.parametrize('limite', ['abc', '0', '-3'])
+def test_sugerencias_con_limite_invalido_responden_400(cliente_http, ruta, limite):
+    respuesta = cliente_http.get(f'{ruta}?q=0035&limite={limite}')
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['success'] is False
+
+
+def test_sugerencias_respetan_limite(cliente_http):
+    datos = cliente_http.get('/buscar-contrato/sugerencias?q=35&limite=1').get_json()
+    assert datos['success'] is True
+    assert len(datos['sugerencias']) == 1
+
+
+@pytest.mark.parametrize('limite', ['abc', 0, -5, [1]])
+def test_busqueda_con_limite_invalido_responde_400(cliente_http, limite):
+    respuesta = cliente_http.post('/buscar-contrato', json={'numero_contrato': '0035-2024', 'limite': limite})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['success'] is False
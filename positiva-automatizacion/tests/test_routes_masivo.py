@@ -0,0 +1,96 @@
+"""
+Procesamiento masivo por la ruta /procesar-masivo: la salida queda en
+orden de número de contrato sin que el escritor acumule contratos
+"""
+import contextlib
+import io
+import json
+import os
+import random
+
+import pytest
+from flask import Flask
+
+from modules.consolidador_t25.goanywhere import GoAnywhereWebClient
+from tests.servidor_sftp import USUARIO, CLAVE, generar_contratos
+
+
+CONTRATOS = 16
+WORKERS = 4
+
+
+class MaestraDesordenada:
+    """Maestra cargada cuyos contratos no vienen ordenados por número"""
+
+    def __init__(self, contratos):
+        self.maestra = contratos
+        self._contratos = list(contratos)
+        random.Random(7).shuffle(self._contratos)
+
+    def obtener_contratos_prestadores(self):
+        return list(self._contratos)
+
+
+@pytest.fixture
+def app(servidor_sftp, carpeta_trabajo, monkeypatch):
+    from modules.consolidador_t25 import routes
+    from modules.consolidador_t25.checkpoint_manager import CheckpointManager
+    from modules.consolidador_t25.download_cache import DownloadCache
+    from modules.consolidador_t25.anexo_cache import ParsedAnexoCache
+
+    contratos = generar_contratos(servidor_sftp.raiz, CONTRATOS)
+    cliente = GoAnywhereWebClient('127.0.0.1', servidor_sftp.puerto, USUARIO)
+    assert cliente.connect(CLAVE)['success']
+
+    salida = carpeta_trabajo / 'salida'
+    salida.mkdir()
+    monkeypatch.setattr(routes, 'OUTPUT_FOLDER', str(salida))
+    monkeypatch.setattr(routes, 'maestra_manager', MaestraDesordenada(contratos))
+    monkeypatch.setattr(routes, 'checkpoint_manager', CheckpointManager(str(carpeta_trabajo / 'checkpoints')))
+    monkeypatch.setattr(routes, 'download_cache', DownloadCache(str(carpeta_trabajo / 'descargas')))
+    monkeypatch.setattr(routes, 'parsed_anexo_cache', ParsedAnexoCache(str(carpeta_trabajo / 'parseo')))
+    monkeypatch.setattr(routes, 'clientes_sftp', {'prueba': cliente})
+
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(routes.consolidador_t25_bp)
+    app.config['SALIDA'] = salida
+    yield app
+    cliente.disconnect()
+
+
+def test_maestra_desordenada_no_acumula_contratos_en_el_escritor(app):
+    cliente_http = app.test_client()
+    with cliente_http.session_transaction() as sesion:
+        sesion['session_id'] = 'prueba'
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        respuesta = cliente_http.post('/procesar-masivo', json={'workers': WORKERS, 'formato': 'csv.gz'})
+
+    datos = respuesta.get_json()
+    assert respuesta.status_code == 200, datos
+    assert datos['total_contratos_procesados'] == CONTRATOS
+
+    with open(os.path.join(app.config['SALIDA'], datos['manifiesto']), encoding='utf-8') as f:
+        manifiesto = json.load(f)
+
+    assert list(manifiesto['contratos']) == sorted(manifiesto['contratos'])
+    assert len(manifiesto['contratos']) == CONTRATOS
+    assert manifiesto['max_contratos_en_espera'] <= WORKERS
+
+
+@pytest.mark.parametrize('ruta, datos', [
+    ('/procesar-masivo', {'workers': 'cuatro'}),
+    ('/procesar-masivo', {'workers': 0}),
+    ('/procesar-masivo', {'filas_por_archivo': 'mil'}),
+    ('/procesar-masivo', {'filas_por_archivo': -5}),
+    ('/procesar-masivo/jobs', {'workers': 'cuatro'})
+])
+def test_parametros_numericos_invalidos_responden_400(app, ruta, datos):
+    cliente_http = app.test_client()
+    with cliente_http.session_transaction() as sesion:
+        sesion['session_id'] = 'prueba'
+
+    respuesta = cliente_http.post(ruta, json=datos)
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['success'] is False
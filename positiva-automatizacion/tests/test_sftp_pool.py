@@ -0,0 +1,83 @@
+"""
+Pruebas del pool de canales SFTP contra el servidor local
+"""
+import os
+import threading
+
+import paramiko
+import pytest
+
+from modules.consolidador_t25.sftp_pool import SFTPPool
+from tests.servidor_sftp import USUARIO, CLAVE
+
+
+def crear_pool(servidor, **kwargs):
+    pool = SFTPPool('127.0.0.1', servidor.puerto, USUARIO, CLAVE, **kwargs)
+    # Sin esperas largas entre reintentos
+    pool.ESPERA_INICIAL = 0.01
+    pool.iniciar()
+    return pool
+
+
+def test_reconecta_y_reintenta_tras_caida_del_servidor(servidor_sftp):
+    os.makedirs(os.path.join(servidor_sftp.raiz, 'TARIFAS'))
+    pool = crear_pool(servidor_sftp, tamano=2)
+    try:
+        assert pool.ejecutar(lambda sftp: sftp.listdir('/')) == ['TARIFAS']
+
+        servidor_sftp.cortar_conexiones()
+
+        assert pool.ejecutar(lambda sftp: sftp.listdir('/')) == ['TARIFAS']
+        metricas = pool.metricas()
+        assert metricas['reintentos'] >= 1
+        assert metricas['reconexiones'] >= 1
+        assert metricas['operaciones'] == 2
+    finally:
+        pool.cerrar()
+
+
+def test_errores_de_la_operacion_no_se_reintentan(servidor_sftp):
+    pool = crear_pool(servidor_sftp)
+    try:
+        with pytest.raises(FileNotFoundError):
+            pool.ejecutar(lambda sftp: sftp.listdir('/NO EXISTE'))
+        assert pool.metricas()['reintentos'] == 0
+
+        # El canal sigue sirviendo
+        assert pool.ejecutar(lambda sftp: sftp.listdir('/')) == []
+    finally:
+        pool.cerrar()
+
+
+def test_credenciales_invalidas_no_se_reintentan(servidor_sftp):
+    pool = SFTPPool('127.0.0.1', servidor_sftp.puerto, USUARIO, 'otra clave')
+    with pytest.raises(paramiko.AuthenticationException):
+        pool.iniciar()
+
+
+def test_operaciones_concurrentes_respetan_el_tamano(servidor_sftp):
+    servidor_sftp.latencia_segundos = 0.02
+    pool = crear_pool(servidor_sftp, tamano=3, canales_por_transporte=2)
+    errores = []
+
+    def listar():
+        try:
+            pool.ejecutar(lambda sftp: sftp.listdir('/'))
+        except Exception as e:
+            errores.append(e)
+
+    try:
+        hilos = [threading.Thread(target=listar) for _ in range(20)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        metricas = pool.metricas()
+        assert errores == []
+        assert metricas['operaciones'] == 20
+        assert metricas['abiertos'] <= 3
+        assert metricas['transportes'] == 2
+        assert metricas['en_uso'] == 0
+    finally:
+        pool.cerrar()
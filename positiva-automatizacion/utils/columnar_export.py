@@ -0,0 +1,309 @@
+"""
+Exportación de consolidados en formatos columnares (CSV comprimido y Parquet)
+"""
+import csv
+import gzip
+import mimetypes
+import os
+import threading
+from datetime import date, datetime
+
+# Parquet requiere pyarrow (opcional)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# Extensión y tipo MIME de cada formato de salida
+FORMATOS_SALIDA = {
+    'xlsx': {
+        'extension': '.xlsx',
+        'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    },
+    'csv.gz': {
+        'extension': '.csv.gz',
+        'mimetype': 'application/gzip'
+    },
+    'parquet': {
+        'extension': '.parquet',
+        'mimetype': 'application/vnd.apache.parquet'
+    }
+}
+
+# Nombres alternativos aceptados en las peticiones
+ALIAS_FORMATOS = {
+    'excel': 'xlsx',
+    'csv': 'csv.gz',
+    'csvgz': 'csv.gz',
+    'gz': 'csv.gz'
+}
+
+mimetypes.add_type(FORMATOS_SALIDA['parquet']['mimetype'], '.parquet')
+
+# Columnas del consolidado con tipo propio en Parquet (las demás van como texto)
+COLUMNAS_DECIMALES = {'tarifa_unitaria_en_pesos'}
+COLUMNAS_FECHA = {'fecha_acuerdo'}
+
+# Formatos de fecha que llegan en fecha_acuerdo
+FORMATOS_FECHA = ['%d/%m/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%m-%Y']
+
+# Filas por grupo de filas (row group) de Parquet
+FILAS_POR_GRUPO = 50000
+
+
+def normalizar_formato(formato):
+    """
+    Valida el formato pedido
+
+    Args:
+        formato: Formato solicitado (xlsx, csv.gz, parquet o un alias); vacío = xlsx
+
+    Returns:
+        Nombre canónico del formato o None si no es válido o no está disponible
+    """
+    formato = (formato or 'xlsx').strip().lower().lstrip('.')
+    formato = ALIAS_FORMATOS.get(formato, formato)
+
+    if formato not in FORMATOS_SALIDA:
+        return None
+    if formato == 'parquet' and not PYARROW_AVAILABLE:
+        return None
+
+    return formato
+
+
+def formatos_disponibles():
+    """Formatos de salida que se pueden generar en este entorno"""
+    return [formato for formato in FORMATOS_SALIDA if normalizar_formato(formato)]
+
+
+def formato_de_archivo(filename):
+    """Formato de salida según la extensión del archivo (None si no se reconoce)"""
+    for formato, info in FORMATOS_SALIDA.items():
+        if filename.lower().endswith(info['extension']):
+            return formato
+    return None
+
+
+def mimetype_de_archivo(filename):
+    """Tipo MIME para descargar un archivo de salida"""
+    formato = formato_de_archivo(filename)
+    if formato:
+        return FORMATOS_SALIDA[formato]['mimetype']
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def _a_decimal(valor):
+    """Convierte a float (None si está vacío o no es numérico)"""
+    if valor is None or valor == '':
+        return None
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if numero != numero else numero
+
+
+def _a_fecha(valor):
+    """Convierte a date (None si está vacía o no se reconoce el formato)"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    if not isinstance(valor, str) or not valor.strip():
+        return None
+
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(valor.strip(), formato).date()
+        except ValueError:
+            continue
+
+    return None
+
+
+def _a_texto(valor):
+    """Convierte a texto conservando los vacíos como nulos"""
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return None
+    return str(valor)
+
+
+class CsvGzStreamWriter:
+    """
+    Escribe un CSV comprimido con gzip fila a fila (misma interfaz que
+    ExcelStreamWriter)
+    """
+
+    def __init__(self, output_path, columnas):
+        """
+        Abre el archivo y escribe el encabezado
+
+        Args:
+            output_path: Ruta del archivo .csv.gz
+            columnas: Nombres de las columnas
+        """
+        self.output_path = output_path
+        self._archivo = gzip.open(output_path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+        self._writer = csv.writer(self._archivo)
+        self._writer.writerow(columnas)
+        self.filas_escritas = 0
+
+    def agregar_fila(self, valores):
+        """Escribe una fila (None y NaN quedan vacíos)"""
+        self._writer.writerow(['' if valor is None or valor != valor else valor for valor in valores])
+        self.filas_escritas += 1
+
+    def guardar(self):
+        """
+        Cierra el archivo
+
+        Returns:
+            int: Tamaño del archivo generado en bytes
+        """
+        self._archivo.close()
+        return os.path.getsize(self.output_path)
+
+
+def esquema_parquet(columnas):
+    """Esquema Parquet: tarifa decimal, fecha_acuerdo fecha y el resto texto"""
+    campos = []
+    for columna in columnas:
+        if columna in COLUMNAS_DECIMALES:
+            campos.append(pa.field(columna, pa.float64()))
+        elif columna in COLUMNAS_FECHA:
+            campos.append(pa.field(columna, pa.date32()))
+        else:
+            campos.append(pa.field(columna, pa.string()))
+    return pa.schema(campos)
+
+
+class ParquetStreamWriter:
+    """
+    Escribe un Parquet con columnas tipadas por grupos de filas; solo se
+    mantiene en memoria un grupo de filas a la vez
+    """
+
+    def __init__(self, output_path, columnas, filas_por_grupo=FILAS_POR_GRUPO):
+        """
+        Abre el archivo con el esquema del consolidado
+
+        Args:
+            output_path: Ruta del archivo .parquet
+            columnas: Nombres de las columnas
+            filas_por_grupo: Filas por row group
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError('pyarrow no está instalado: no se puede generar Parquet')
+
+        self.output_path = output_path
+        self.filas_por_grupo = filas_por_grupo
+        self._esquema = esquema_parquet(columnas)
+        self._conversores = [
+            _a_decimal if columna in COLUMNAS_DECIMALES else _a_fecha if columna in COLUMNAS_FECHA else _a_texto
+            for columna in columnas
+        ]
+        self._writer = pq.ParquetWriter(output_path, self._esquema, compression='snappy')
+        self._lote = []
+        self.filas_escritas = 0
+
+    def _escribir_lote(self):
+        """Convierte el lote pendiente a columnas y lo escribe como un row group"""
+        arreglos = [
+            pa.array([conversor(fila[i]) for fila in self._lote], type=self._esquema.field(i).type)
+            for i, conversor in enumerate(self._conversores)
+        ]
+        self._writer.write_table(pa.Table.from_arrays(arreglos, schema=self._esquema))
+        self._lote = []
+
+    def agregar_fila(self, valores):
+        """Agrega una fila al lote pendiente"""
+        self._lote.append(valores)
+        self.filas_escritas += 1
+
+        if len(self._lote) >= self.filas_por_grupo:
+            self._escribir_lote()
+
+    def guardar(self):
+        """
+        Escribe el último lote y cierra el archivo
+
+        Returns:
+            int: Tamaño del archivo generado en bytes
+        """
+        if self._lote or not self.filas_escritas:
+            self._escribir_lote()
+        self._writer.close()
+        return os.path.getsize(self.output_path)
+
+
+def crear_escritor(formato, output_path, columnas):
+    """
+    Crea el escritor fila a fila de un formato columnar (csv.gz o parquet)
+
+    Returns:
+        CsvGzStreamWriter o ParquetStreamWriter
+    """
+    if formato == 'csv.gz':
+        return CsvGzStreamWriter(output_path, columnas)
+    if formato == 'parquet':
+        return ParquetStreamWriter(output_path, columnas)
+    raise ValueError(f'Formato no soportado: {formato}')
+
+
+def escribir_columnar(filas, columnas, output_path, formato):
+    """
+    Escribe las filas en el formato columnar indicado (csv.gz o parquet)
+
+    Args:
+        filas: Iterable de filas (secuencias en el orden de columnas)
+        columnas: Nombres de las columnas
+        output_path: Ruta del archivo a generar
+        formato: csv.gz o parquet
+
+    Returns:
+        int: Cantidad de filas escritas
+    """
+    escritor = crear_escritor(formato, output_path, columnas)
+    for fila in filas:
+        escritor.agregar_fila(fila)
+    escritor.guardar()
+    return escritor.filas_escritas
+
+
+def convertir_xlsx(origen, destino, formato, fila_encabezado=1):
+    """
+    Convierte un consolidado .xlsx ya generado a un formato columnar,
+    leyendo la hoja en modo de solo lectura
+
+    Args:
+        origen: Ruta del .xlsx
+        destino: Ruta del archivo a generar
+        formato: csv.gz o parquet
+        fila_encabezado: Fila con los nombres de columna (los datos empiezan en la siguiente)
+
+    Returns:
+        int: Cantidad de filas escritas
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(origen, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        filas = ws.iter_rows(min_row=fila_encabezado, values_only=True)
+        encabezado = next(filas, ())
+        columnas = [str(nombre) for nombre in encabezado if nombre is not None]
+        ancho = len(columnas)
+
+        datos = (fila[:ancho] for fila in filas if any(valor is not None for valor in fila))
+
+        # Se escribe a un temporal para no dejar archivos a medias
+        temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+        total = escribir_columnar(datos, columnas, temporal, formato)
+        os.replace(temporal, destino)
+        return total
+    finally:
+        wb.close()
@@ -0,0 +1,140 @@
+"""
+Exportación de consolidados a Excel en modo de solo escritura (streaming)
+"""
+import os
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle, DEFAULT_FONT
+
+
+BORDE_DELGADO = Border(
+    left=Side(style='thin', color="000000"),
+    right=Side(style='thin', color="000000"),
+    top=Side(style='thin', color="000000"),
+    bottom=Side(style='thin', color="000000")
+)
+
+# Estilos con nombre del formato POSITIVA (se registran una vez por libro
+# y todas las celdas los comparten)
+ESTILOS_POSITIVA = {
+    'positiva_titulo': {
+        'fill': PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+        'font': Font(color="FFFFFF", bold=True, size=11, name="Calibri"),
+        'alignment': Alignment(horizontal="center", vertical="center", wrap_text=True),
+        'border': BORDE_DELGADO
+    },
+    'positiva_subtitulo': {
+        'fill': PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid"),
+        'font': Font(bold=True, size=10, name="Calibri"),
+        'alignment': Alignment(horizontal="center", vertical="center", wrap_text=True),
+        'border': BORDE_DELGADO
+    },
+    'positiva_encabezado': {
+        'fill': PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+        'font': Font(bold=True, color="FFFFFF", size=11),
+        'alignment': Alignment(horizontal="center", vertical="center")
+    },
+    'positiva_centro': {
+        'alignment': Alignment(horizontal="center", vertical="center"),
+        'border': BORDE_DELGADO
+    },
+    'positiva_izquierda': {
+        'alignment': Alignment(horizontal="left", vertical="center"),
+        'border': BORDE_DELGADO
+    },
+    'positiva_derecha': {
+        'alignment': Alignment(horizontal="right", vertical="center"),
+        'border': BORDE_DELGADO
+    },
+    'positiva_moneda': {
+        'alignment': Alignment(horizontal="right", vertical="center"),
+        'border': BORDE_DELGADO,
+        'number_format': '#,##0.00'
+    },
+    'positiva_porcentaje': {
+        'alignment': Alignment(horizontal="right", vertical="center"),
+        'border': BORDE_DELGADO,
+        'number_format': '0.00%'
+    },
+    'positiva_ajustado': {
+        'alignment': Alignment(vertical="center", wrap_text=True)
+    }
+}
+
+
+class ExcelStreamWriter:
+    """
+    Escribe una hoja de Excel fila a fila con un libro write-only de openpyxl
+
+    Las filas se envían al archivo a medida que se agregan, así que la
+    memoria no crece con la cantidad de registros. Anchos de columna,
+    altos de fila y celdas combinadas deben definirse antes de escribir
+    las filas a las que aplican.
+    """
+
+    def __init__(self, output_path, titulo_hoja, anchos=None, estilos=None):
+        """
+        Crea el libro y registra los estilos con nombre
+
+        Args:
+            output_path: Ruta del archivo .xlsx a generar
+            titulo_hoja: Nombre de la hoja
+            anchos: Dict letra de columna -> ancho
+            estilos: Dict nombre -> atributos de estilo (por defecto ESTILOS_POSITIVA)
+        """
+        self.output_path = output_path
+        self.wb = Workbook(write_only=True)
+
+        # Los estilos sin fuente usan la fuente por defecto del libro
+        for nombre, atributos in (estilos or ESTILOS_POSITIVA).items():
+            self.wb.add_named_style(NamedStyle(name=nombre, **{'font': DEFAULT_FONT, **atributos}))
+
+        self.ws = self.wb.create_sheet(titulo_hoja)
+        self.filas_escritas = 0
+
+        for letra, ancho in (anchos or {}).items():
+            self.ws.column_dimensions[letra].width = ancho
+
+    def combinar(self, rango):
+        """Combina un rango de celdas (ej. 'A1:H1')"""
+        self.ws.merged_cells.add(rango)
+
+    def alto_fila(self, fila, alto):
+        """Define el alto de una fila que aún no se ha escrito"""
+        self.ws.row_dimensions[fila].height = alto
+
+    def agregar_fila(self, valores, estilos=None):
+        """
+        Escribe una fila al final de la hoja
+
+        Args:
+            valores: Valores de la fila
+            estilos: Nombre de estilo por columna (None deja la celda sin estilo)
+        """
+        if estilos is None:
+            self.ws.append(list(valores))
+        else:
+            fila = []
+            for valor, estilo in zip(valores, estilos):
+                if estilo is None:
+                    fila.append(valor)
+                else:
+                    # El valor va después del estilo para conservar el formato de fechas
+                    celda = WriteOnlyCell(self.ws)
+                    celda.style = estilo
+                    celda.value = valor
+                    fila.append(celda)
+            self.ws.append(fila)
+
+        self.filas_escritas += 1
+
+    def guardar(self):
+        """
+        Cierra la hoja y guarda el libro
+
+        Returns:
+            int: Tamaño del archivo generado en bytes
+        """
+        self.wb.save(self.output_path)
+        return os.path.getsize(self.output_path)